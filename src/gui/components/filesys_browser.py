@@ -2,9 +2,10 @@ from __future__ import annotations
 
 from ..helpers.qt_helper import QtHelper
 from ..helpers.file_filter import FileFilter
+from ..helpers.file_watcher import FileWatcher
 from ..helpers.simple_dialogs import textinput_dialog
 from .path_bar import PathBar
-from lib import AppPaths, PathExt, Settings, is_ext_supported_file, is_ext_supported_archive, find_files_in_archive, natural_sort_key, get_callstack_str, FileConfig
+from lib import AppPaths, PathExt, Settings, is_ext_supported_file, is_ext_supported_archive, find_files_in_archive, scan_directory, get_callstack_str, FileConfig
 
 from PyQt6 import QtCore, QtGui, QtWidgets
 from PyQt6.QtCore import *
@@ -16,11 +17,26 @@ import os
 import re
 import logging
 import enum
+import concurrent.futures
 from typing import Callable, overload, override, Any
 from types import SimpleNamespace
 
 
 
+def _scan_directory_with_stats(path: str) -> tuple[list[PathExt],list[PathExt],list[PathExt],dict[PathExt,tuple[int,int]|None]]:
+    """Like scan_directory(), plus (modification time, size) of each file, to tell later which files were modified"""
+    files, archives, dirs = scan_directory(path)
+    file_stats = {}
+    for file in files:
+        try:
+            stat = os.stat(str(file))
+            file_stats[file] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            file_stats[file] = None
+    return files, archives, dirs, file_stats
+
+
+
 class FilesysBrowserItemType(enum.Enum):
     File = enum.auto()
     Dir = enum.auto()
@@ -57,6 +73,12 @@ class FilesysBrowser(QWidget):
             self._has_children = type in [FilesysBrowserItemType.Dir, FilesysBrowserItemType.Arch]
             self._first_file: PathExt|None = None
             self._children_added = False
+            self._scanned = False
+            self._file_stats: dict[PathExt,tuple[int,int]|None] = {}
+            self._status_item: QStandardItem|None = None
+            self._placeholder_item: QStandardItem|None = None
+            self._pending_scan: tuple[concurrent.futures.Future,bool]|None = None
+            self._pending_rows: list[tuple[PathExt,FilesysBrowserItemType,str|None]] = []
             
             if type == FilesysBrowserItemType.Dir:
                 icon = FilesysBrowser._icon_dir
@@ -109,7 +131,11 @@ class FilesysBrowser(QWidget):
         @property
         def type(self) -> FilesysBrowserItemType:
             return self._type
-    
+        
+        @property
+        def status_item(self) -> QStandardItem|None:
+            return self._status_item
+        
         def add_children_to_tree(self, support_archives: bool) -> bool:
             if self._children_added:
                 return False
@@ -118,46 +144,134 @@ class FilesysBrowser(QWidget):
             if self._type == FilesysBrowserItemType.File or self._type == FilesysBrowserItemType.Elision:
                 return False
 
-            if self._type == FilesysBrowserItemType.Dir:
-                children = [PathExt(p) for p in self._path.iterdir()]
-            elif self._type == FilesysBrowserItemType.Arch:
-                children = [p for p in find_files_in_archive(str(self._path)) if is_ext_supported_file(p.arch_path_suffix)] if support_archives else []
-            else:
-                children = []
-            
-            self._has_children = len(children) > 0
-
             if self._type == FilesysBrowserItemType.Arch:
-                filtered_out_any = False
-                for path in children:
-                    if not self._filter.matches(path):
-                        filtered_out_any = True
-                        continue
-                    if self._first_file is None:
-                        self._first_file = path
-                    super().appendRow((FilesysBrowser.MyFileItem(self._model, path, FilesysBrowserItemType.File), QStandardItem('')))
-                if filtered_out_any:
-                    super().appendRow((FilesysBrowser.MyFileItem(self._model, self._path, FilesysBrowserItemType.Elision), QStandardItem('Some files were hidden by filtering')))
+                self.scan_archive(support_archives)
+                self._model.insert_pending_rows(self)
             else:
-                dirs = [p for p in children if p.is_dir()]
-                files = [p for p in children if p.is_file()]
-                filtered_out_any = False
-                for file in sorted([p for p in files if is_ext_supported_file(p.suffix)], key=lambda p: natural_sort_key(p.final_name)):
-                    if not self._filter.matches(file):
-                        filtered_out_any = True
-                        continue
-                    if self._first_file is None:
-                        self._first_file = file
-                    super().appendRow((FilesysBrowser.MyFileItem(self._model, file, FilesysBrowserItemType.File), QStandardItem('')))
-                if filtered_out_any:
-                    super().appendRow((FilesysBrowser.MyFileItem(self._model, self._path, FilesysBrowserItemType.Elision), QStandardItem('Some files were hidden by filtering')))
-                if support_archives:
-                    for arch in sorted([p for p in files if is_ext_supported_archive(p.suffix)], key=lambda p: natural_sort_key(p.final_name)):
-                        super().appendRow(FilesysBrowser.MyFileItem(self._model, arch, FilesysBrowserItemType.Arch, filter=self._filter))
-                for dir in sorted(dirs, key=lambda p: natural_sort_key(p.final_name)):
-                    super().appendRow(FilesysBrowser.MyFileItem(self._model, dir, FilesysBrowserItemType.Dir, filter=self._filter))
+                self._model.scan_children(self, support_archives)
             
             return self._has_children
+        
+        def scan_archive(self, support_archives: bool) -> bool:
+            files = [p for p in find_files_in_archive(str(self._path)) if is_ext_supported_file(p.arch_path_suffix)] if support_archives else []
+            try:
+                stat = os.stat(str(self._path))
+                archive_stat = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                archive_stat = None
+            return self.set_scan_result(files, [], [], {file: archive_stat for file in files})  # when the archive changes, all its files may have changed
+        
+        def set_scan_result(self, files: list[PathExt], archives: list[PathExt], dirs: list[PathExt], file_stats: dict[PathExt,tuple[int,int]|None]) -> bool:
+            """
+            Converts the contents of the directory or archive to rows. After the first scan, the rows are queued, so that the model
+            inserts them in batches. After a re-scan, only the rows that differ are inserted or removed right away, and files that were
+            modified in the meantime are reported. Returns True if any rows were changed right away.
+            """
+            rows: list[tuple[PathExt,FilesysBrowserItemType,str|None]] = []
+            self._first_file = None
+            filtered_out_any = False
+            for file in files:
+                if not self._filter.matches(file):
+                    filtered_out_any = True
+                    continue
+                if self._first_file is None:
+                    self._first_file = file
+                rows.append((file, FilesysBrowserItemType.File, ''))
+            if filtered_out_any:
+                rows.append((self._path, FilesysBrowserItemType.Elision, 'Some files were hidden by filtering'))
+            rows.extend([(arch, FilesysBrowserItemType.Arch, None) for arch in archives])
+            rows.extend([(dir, FilesysBrowserItemType.Dir, None) for dir in dirs])
+            self._has_children = len(rows) > 0
+
+            modified_files = [path for path,stat in file_stats.items() if path in self._file_stats and self._file_stats[path] != stat]
+            self._file_stats = file_stats
+            if len(modified_files) > 0:
+                self._model.filesModified.emit(modified_files)
+            
+            if not self._scanned:
+                self._scanned = True
+                self._model.queue_rows(self, rows)
+                return False
+            return self.update_child_rows(rows)
+        
+        def update_file_stat(self, path: PathExt):
+            if path not in self._file_stats:
+                return
+            try:
+                stat = os.stat(str(path))
+                self._file_stats[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                self._file_stats[path] = None
+        
+        def update_child_rows(self, rows: list[tuple[PathExt,FilesysBrowserItemType,str|None]]) -> bool:
+            """Makes the rows match <rows> (which must be sorted like the existing rows), by only removing and inserting the differences"""
+            new_keys = set([(path,type) for path,type,_ in rows])
+            any_changed = False
+            for row_index in reversed(range(self.rowCount())):
+                child = self.child(row_index, 0)
+                if isinstance(child, FilesysBrowser.MyFileItem) and (child.path,child.type) not in new_keys:
+                    super().removeRow(row_index)
+                    any_changed = True
+            
+            existing_keys = set()
+            for row_index in range(self.rowCount()):
+                child = self.child(row_index, 0)
+                if isinstance(child, FilesysBrowser.MyFileItem):
+                    existing_keys.add((child.path,child.type))
+            row_index = 0
+            while row_index < len(rows):
+                if (rows[row_index][0],rows[row_index][1]) in existing_keys:
+                    row_index += 1
+                    continue
+                run_end = row_index + 1
+                while run_end < len(rows) and (rows[run_end][0],rows[run_end][1]) not in existing_keys:
+                    run_end += 1
+                self.insert_child_rows(rows[row_index:run_end], row_index)
+                any_changed = True
+                row_index = run_end
+            return any_changed
+        
+        def insert_child_rows(self, rows: list[tuple[PathExt,FilesysBrowserItemType,str|None]], first_row_index: int|None = None):
+            """Inserts rows of (path, type, status) with a single insertRows(), so that the view only has to update once"""
+            if len(rows) < 1:
+                return
+            model = self._model
+            if first_row_index is None:
+                first_row_index = self.rowCount() - (1 if self._placeholder_item is not None else 0)  # the placeholder stays at the end
+            if self.columnCount() < 2:
+                self.setColumnCount(2)
+            
+            try:
+                model.blockSignals(True)  # new items are unchecked, which is not worth notifying anyone
+                items = [FilesysBrowser.MyFileItem(model, path, type, filter=self._filter) for path,type,_ in rows]
+            finally:
+                model.blockSignals(False)
+            
+            super().insertRows(first_row_index, items)
+            
+            try:
+                model.blockSignals(True)  # the status column is updated with a single dataChanged-signal below
+                for row_index,(item,(_,_,status)) in enumerate(zip(items, rows), start=first_row_index):
+                    if status is not None:
+                        item._status_item = QStandardItem(status)
+                        super().setChild(row_index, 1, item._status_item)
+                    model.register_item(item)
+            finally:
+                model.blockSignals(False)
+            model.dataChanged.emit(model.indexFromItem(self.child(first_row_index, 0)).siblingAtColumn(1), model.indexFromItem(self.child(first_row_index+len(items)-1, 0)).siblingAtColumn(1))
+        
+        def show_placeholder(self):
+            if self._placeholder_item is not None:
+                return
+            self._placeholder_item = QStandardItem('Scanning...')
+            self._placeholder_item.setFlags(Qt.ItemFlag.NoItemFlags)
+            super().appendRow(self._placeholder_item)
+        
+        def remove_placeholder(self):
+            if self._placeholder_item is None:
+                return
+            super().removeRow(self._placeholder_item.row())
+            self._placeholder_item = None
                 
         @override
         def hasChildren(self) -> bool:
@@ -177,10 +291,147 @@ class FilesysBrowser(QWidget):
         
         checkedChanged = pyqtSignal()
         filesChanged = pyqtSignal()
+        filesModified = pyqtSignal(list)
+
+        SCAN_WAIT_S = 0.1  # directories that can be scanned within this time are shown right away, without a placeholder
+        INSERT_BATCH_SIZE = 1000
+        INSERT_INTERVAL_MS = 10
     
         def __init__(self, parent):
             super().__init__(parent)
             self.show_archives = False
+            # index of all items in the tree, so that an item can be found without walking the tree; the same path
+            #   may appear more than once (e.g. in overlapping top-level directories)
+            self._items_by_path: dict[PathExt,list[FilesysBrowser.MyFileItem]] = {}
+            self.rowsAboutToBeRemoved.connect(self._on_rows_about_to_be_removed)
+            # directories are scanned in a worker thread, and the resulting rows are inserted in batches from a timer, so that
+            #   the GUI stays responsive when a directory (e.g. on a network share) is slow to scan or has many entries
+            self._scan_executor: concurrent.futures.ThreadPoolExecutor|None = None
+            self._busy_items: list[FilesysBrowser.MyFileItem] = []  # items with a pending scan, or rows that are not inserted yet
+            self._insert_timer = QTimer(self)
+            self._insert_timer.setInterval(FilesysBrowser.MyFileItemModel.INSERT_INTERVAL_MS)
+            self._insert_timer.timeout.connect(self._on_insert_timer)
+        
+        @property
+        def busy(self) -> bool:
+            return len(self._busy_items) > 0
+        
+        def _update_busy(self, item: FilesysBrowser.MyFileItem):
+            is_busy = item._pending_scan is not None or len(item._pending_rows) > 0
+            if is_busy and item not in self._busy_items:
+                self._busy_items.append(item)
+                self._insert_timer.start()
+            elif not is_busy and item in self._busy_items:
+                self._busy_items.remove(item)
+        
+        def scan_children(self, item: FilesysBrowser.MyFileItem, support_archives: bool):
+            if self._scan_executor is None:
+                self._scan_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix='FilesysBrowserScan')
+            future = self._scan_executor.submit(_scan_directory_with_stats, str(item.path))
+            concurrent.futures.wait([future], timeout=FilesysBrowser.MyFileItemModel.SCAN_WAIT_S)
+            if future.done():
+                self._on_scan_done(item, future, support_archives)
+                self.insert_pending_rows(item)
+            else:
+                item.show_placeholder()
+                item._pending_scan = (future, support_archives)
+                self._update_busy(item)
+        
+        def rescan_children(self, item: FilesysBrowser.MyFileItem) -> bool:
+            """Updates the children of an item after its directory or archive has changed; returns False if the item is busy, and the caller should try again later"""
+            if not item._scanned or item.type not in [FilesysBrowserItemType.Dir, FilesysBrowserItemType.Arch]:
+                return True
+            if item in self._busy_items:
+                return False
+            if item.type == FilesysBrowserItemType.Arch:
+                if item.scan_archive(self.show_archives):
+                    self.filesChanged.emit()
+                return True
+            item._pending_scan = (self._scan_executor.submit(_scan_directory_with_stats, str(item.path)), self.show_archives)
+            self._update_busy(item)
+            return True
+        
+        def _on_scan_done(self, item: FilesysBrowser.MyFileItem, future: concurrent.futures.Future, support_archives: bool) -> bool:
+            try:
+                files, archives, dirs, file_stats = future.result()
+            except Exception as ex:
+                logging.warning(f'Unable to scan directory <{item.path}> ({ex})')
+                files, archives, dirs, file_stats = [], [], [], {}
+            return item.set_scan_result(files, archives if support_archives else [], dirs, file_stats)
+        
+        def queue_rows(self, item: FilesysBrowser.MyFileItem, rows: list[tuple[PathExt,FilesysBrowserItemType,str|None]]):
+            item._pending_rows.extend(rows)
+            self._update_busy(item)
+        
+        def insert_pending_rows(self, item: FilesysBrowser.MyFileItem) -> bool:
+            """Inserts the next batch of queued rows of an item; returns True if anything was inserted"""
+            batch_size = FilesysBrowser.MyFileItemModel.INSERT_BATCH_SIZE
+            rows, item._pending_rows = item._pending_rows[:batch_size], item._pending_rows[batch_size:]
+            item.insert_child_rows(rows)
+            if item._pending_scan is None and len(item._pending_rows) < 1:
+                item.remove_placeholder()
+            else:
+                item.show_placeholder()
+            self._update_busy(item)
+            return len(rows) > 0
+        
+        def _on_insert_timer(self):
+            anything_changed = False
+            for item in list(self._busy_items):
+                if item not in self._busy_items:
+                    continue  # removed in the meantime
+                if item._pending_scan is not None:
+                    future, support_archives = item._pending_scan
+                    if not future.done():
+                        continue
+                    item._pending_scan = None
+                    anything_changed |= self._on_scan_done(item, future, support_archives)
+                anything_changed |= self.insert_pending_rows(item)
+            
+            if not self.busy:
+                self._insert_timer.stop()
+            if anything_changed:
+                self.filesChanged.emit()
+        
+        def _cancel_pending(self, item: FilesysBrowser.MyFileItem):
+            if item._pending_scan is not None:
+                future, _ = item._pending_scan
+                future.cancel()
+                item._pending_scan = None
+            item._pending_rows = []
+            self._update_busy(item)
+
+        def register_item(self, item: FilesysBrowser.MyFileItem):
+            if item.type == FilesysBrowserItemType.Elision:
+                return  # has the same path as its parent
+            self._items_by_path.setdefault(item.path, []).append(item)
+
+        def _unregister_item(self, item: FilesysBrowser.MyFileItem):
+            self._cancel_pending(item)
+            for row_index in range(item.rowCount()):
+                child = item.child(row_index, 0)
+                if isinstance(child, FilesysBrowser.MyFileItem):
+                    self._unregister_item(child)
+            items = self._items_by_path.get(item.path)
+            if items is not None and item in items:
+                items.remove(item)
+                if len(items) == 0:
+                    del self._items_by_path[item.path]
+        
+        def _on_rows_about_to_be_removed(self, parent: QModelIndex, first: int, last: int):
+            parent_item = self.itemFromIndex(parent) if parent.isValid() else self.invisibleRootItem()
+            if parent_item is None:
+                return
+            for row_index in range(first, last+1):
+                item = parent_item.child(row_index, 0)
+                if isinstance(item, FilesysBrowser.MyFileItem):
+                    self._unregister_item(item)
+        
+        def items_from_path(self, path: PathExt) -> list[FilesysBrowser.MyFileItem]:
+            return list(self._items_by_path.get(path, []))
+        
+        def all_items(self) -> list[FilesysBrowser.MyFileItem]:
+            return [item for items in self._items_by_path.values() for item in items]
         
         @override
         def hasChildren(self, index: QModelIndex = ...):
@@ -283,6 +534,7 @@ class FilesysBrowser(QWidget):
 
     topLevelsChanged = pyqtSignal(list)
     filesChanged = pyqtSignal()
+    filesModified = pyqtSignal(list)
     selectionChanged = pyqtSignal()
     contextMenuRequested = pyqtSignal(PathExt, PathExt, FilesysBrowserItemType)
     elisionDoubleclick = pyqtSignal()
@@ -299,12 +551,17 @@ class FilesysBrowser(QWidget):
         self._show_archives = False
         self._filter: FileFilter = FileFilter()
         self._history: list[tuple[PathExt,PathExt]] = []
+        # requests for items that do not exist yet, because their directory is still being scanned
+        self._pending_selection: set[PathExt] = set()
+        self._pending_expansion: set[PathExt] = set()
+        self._pending_select_first = False
         
         self._ui_filesys_view = FilesysBrowser.MyTreeView()
         self._ui_filesys_model = FilesysBrowser.MyFileItemModel(self._ui_filesys_view)
         self._ui_filesys_model.setHorizontalHeaderLabels(['File', 'Info'])
         self._ui_filesys_model.checkedChanged.connect(self._on_checked_change)
         self._ui_filesys_model.filesChanged.connect(self._on_files_changed)
+        self._ui_filesys_model.filesModified.connect(self.filesModified.emit)
         self._ui_filesys_model.show_archives = self._show_archives
         self._ui_filesys_view.setToolTip('Select files to plot; right-click a directory to navigate')
         self._ui_filesys_view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
@@ -324,6 +581,13 @@ class FilesysBrowser(QWidget):
         self._ui_pathbar.pathClosed.connect(self._on_pathbar_close)
         self.setLayout(QtHelper.layout_v(self._ui_filesys_view, self._ui_pathbar))
 
+        # watch the expanded directories (and the checked files), so that changes are picked up without reloading everything
+        self._watcher = FileWatcher(self)
+        self._watcher.pathsChanged.connect(self._on_watched_paths_changed)
+        self._watched_paths: dict[str,PathExt] = {}
+        self.filesChanged.connect(self._update_watched_paths)
+        self.selectionChanged.connect(self._update_watched_paths)
+
         self.update_pathbar()
         self._inhibit_triggers = False
 
@@ -357,63 +621,39 @@ class FilesysBrowser(QWidget):
     
     @property
     def all_files(self) -> list[PathExt]:
-        result = set()
-        def recurse(parent: FilesysBrowser.MyFileItem):
-            nonlocal result
-            if parent is None:
-                return
-            for row_index in range(parent.rowCount()):
-                item = parent.child(row_index, 0)
-                if not isinstance(item, FilesysBrowser.MyFileItem):
-                    continue
-                if item.type == FilesysBrowserItemType.File:
-                    result.add(item.path)
-                recurse(item)
-        recurse(self._ui_filesys_model.invisibleRootItem())
-        return list(result)
+        model = self._ui_filesys_model
+        return list(set([item.path for item in model.all_items() if item.type == FilesysBrowserItemType.File]))
 
     @property
     def selected_files(self) -> list[PathExt]:
-        result = set()
-        def recurse(parent: FilesysBrowser.MyFileItem):
-            nonlocal result
-            if parent is None:
-                return
-            for row_index in range(parent.rowCount()):
-                item = parent.child(row_index, 0)
-                if not isinstance(item, FilesysBrowser.MyFileItem):
-                    continue
-                if item.checked:
-                    result.add(item.path)
-                recurse(item)
-        recurse(self._ui_filesys_model.invisibleRootItem())
-        return list(result)
+        model = self._ui_filesys_model
+        return list(set([item.path for item in model.all_items() if item.checked]))
     @selected_files.setter
     def selected_files(self, selected_paths: list[PathExt]):
-        def recurse(parent: FilesysBrowser.MyFileItem):
-            if parent is None:
-                return
-            for row_index in range(parent.rowCount()):
-                item = parent.child(row_index, 0)
-                if not isinstance(item, FilesysBrowser.MyFileItem):
-                    continue
-                if item.type == FilesysBrowserItemType.File:
-                    do_select = item.path in selected_paths
-                    item.checked = do_select
-                    if not do_select:
-                        # de-select, otherwise the next multi-selection that the user does might behave in an unexpected way
-                        self._ui_filesys_view.selectionModel().select(item.index(), QItemSelectionModel.SelectionFlag.Deselect | QItemSelectionModel.SelectionFlag.Rows)
-                else:
-                    if item.path in selected_paths:
-                        # request to select a dir/arch -> try to select 1st file instead
-                        if item._first_file is not None:
-                            selected_paths.append(item._first_file)  # add to list, will be checked during subsequent recursion
-                    recurse(item)
+        model = self._ui_filesys_model
+        selected_paths = set(selected_paths)
+        for path in list(selected_paths):
+            for item in model.items_from_path(path):
+                if item.type != FilesysBrowserItemType.File and item._first_file is not None:
+                    # request to select a dir/arch -> try to select 1st file instead
+                    selected_paths.add(item._first_file)
+        found_paths = set()
         try:
             self._inhibit_triggers = True
-            recurse(self._ui_filesys_model.invisibleRootItem())
+            for item in model.all_items():
+                if item.type != FilesysBrowserItemType.File:
+                    continue
+                do_select = item.path in selected_paths
+                item.checked = do_select
+                if do_select:
+                    found_paths.add(item.path)
+                else:
+                    # de-select, otherwise the next multi-selection that the user does might behave in an unexpected way
+                    self._ui_filesys_view.selectionModel().select(item.index(), QItemSelectionModel.SelectionFlag.Deselect | QItemSelectionModel.SelectionFlag.Rows)
         finally:
             self._inhibit_triggers = False
+        self._pending_selection = (selected_paths - found_paths) if model.busy else set()
+        self._pending_select_first = False
         self.selectionChanged.emit()
 
 
@@ -422,20 +662,15 @@ class FilesysBrowser(QWidget):
         if Settings.extract_zip:
             supported_types.append(FilesysBrowserItemType.Arch)
         
-        def recurse(parent: FilesysBrowser.MyFileItem):
-            if parent is None:
-                return
-            for row_index in range(parent.rowCount()):
-                item = parent.child(row_index, 0)
-                if not isinstance(item, FilesysBrowser.MyFileItem):
-                    continue
-                if (item.type in supported_types) and (item.path in paths):
-                    self._ui_filesys_view.expand(item.index())
-                else:
-                    recurse(item)
         try:
             self._inhibit_triggers = True
-            recurse(self._ui_filesys_model.invisibleRootItem())
+            for path in paths:
+                items = self._ui_filesys_model.items_from_path(path)
+                if len(items) < 1 and self._ui_filesys_model.busy:
+                    self._pending_expansion.add(path)
+                for item in items:
+                    if item.type in supported_types:
+                        self._ui_filesys_view.expand(item.index())
         finally:
             self._inhibit_triggers = False
     
@@ -463,28 +698,18 @@ class FilesysBrowser(QWidget):
                     item.checked = True
                     return True
                 if recurse(item):
-                    return
+                    return True
             return False
-        recurse(self._ui_filesys_model.invisibleRootItem())
+        found = recurse(self._ui_filesys_model.invisibleRootItem())
+        self._pending_select_first = not found and self._ui_filesys_model.busy
     
 
     def update_status(self, path: PathExt, status: str):
-        def recurse(parent: FilesysBrowser.MyFileItem):
-            if parent is None:
-                return
-            for row_index in range(parent.rowCount()):
-                item = parent.child(row_index, 0)
-                if not isinstance(item, FilesysBrowser.MyFileItem):
-                    continue
-                if item.path == path:
-                    status_item = parent.child(row_index, 1)
-                    if not isinstance(status_item, QStandardItem):
-                        continue
-                    status_item.setText(status)
-                recurse(item)
         try:
             self._inhibit_triggers = True
-            recurse(self._ui_filesys_model.invisibleRootItem())
+            for item in self._ui_filesys_model.items_from_path(path):
+                if item.status_item is not None:
+                    item.status_item.setText(status)
         finally:
             self._inhibit_triggers = False
     
@@ -570,26 +795,11 @@ class FilesysBrowser(QWidget):
     
 
     def _get_item_from_path(self, path: PathExt) -> FilesysBrowser.MyFileItem:
-        def recurse(parent: FilesysBrowser.MyFileItem):
-            if parent is None:
-                return
-            for row_index in range(parent.rowCount()):
-                item = parent.child(row_index, 0)
-                if not isinstance(item, FilesysBrowser.MyFileItem):
-                    continue
-                if item.path == path:
-                    item = parent.child(row_index, 0)
-                    if not isinstance(item, QStandardItem):
-                        continue
-                    return item
-                item = recurse(item)
-                if item:
-                    return item
-            return None
-        result = recurse(self._ui_filesys_model.invisibleRootItem())
-        if not result:
+        items = self._ui_filesys_model.items_from_path(path)
+        if len(items) < 1:
             logging.error(f'Cannot find item from path <{path}>')
-        return result
+            return None
+        return items[0]
     
     
     def relabel_item(self, path: PathExt):
@@ -695,7 +905,9 @@ class FilesysBrowser(QWidget):
         else:
             return  # files cannot be a top-lvel item; ignore
         
-        self._ui_filesys_model.insertRow(row_index, (new_item, QStandardItem(str(path.parent))))
+        new_item._status_item = QStandardItem(str(path.parent))
+        self._ui_filesys_model.insertRow(row_index, (new_item, new_item._status_item))
+        self._ui_filesys_model.register_item(new_item)
         new_item_index = self._ui_filesys_model.indexFromItem(new_item)
         if new_item_index:
             self._ui_filesys_view.expand(new_item_index)
@@ -720,6 +932,10 @@ class FilesysBrowser(QWidget):
 
     def _check_items(self, items: list[FilesysBrowser.MyFileItem], toggle: bool = False, toggle_common: bool = False, toggle_exclusive: bool = False, modify_to = None):
 
+        # the user made a choice, which overrides any selection that was still waiting for its directory to be scanned
+        self._pending_selection.clear()
+        self._pending_select_first = False
+
         if toggle and toggle_common:
 
             def get_number_of_checked_items_recursively(parent: FilesysBrowser.MyFileItem):
@@ -812,7 +1028,76 @@ class FilesysBrowser(QWidget):
             self._check_items(selected_items)
         
     
+    def _apply_pending_requests(self):
+        model = self._ui_filesys_model
+
+        if len(self._pending_expansion) > 0:
+            paths = [path for path in self._pending_expansion if len(model.items_from_path(path)) > 0]
+            self._pending_expansion.difference_update(paths)
+            self.expand_items(paths)
+        
+        if len(self._pending_selection) > 0:
+            items = [item for path in self._pending_selection for item in model.items_from_path(path) if item.type == FilesysBrowserItemType.File]
+            if len(items) > 0:
+                try:
+                    self._inhibit_triggers = True
+                    for item in items:
+                        item.checked = True
+                finally:
+                    self._inhibit_triggers = False
+                self._pending_selection.difference_update([item.path for item in items])
+                self.selectionChanged.emit()
+        
+        if self._pending_select_first:
+            self.select_first_file()
+        
+        if not model.busy:
+            self._pending_selection.clear()
+            self._pending_expansion.clear()
+            self._pending_select_first = False
+
+
+    def _update_watched_paths(self):
+        watched_paths: dict[str,PathExt] = {}
+        for item in self._ui_filesys_model.all_items():
+            if item.type in [FilesysBrowserItemType.Dir, FilesysBrowserItemType.Arch]:
+                do_watch = item._scanned
+            elif item.type == FilesysBrowserItemType.File:
+                do_watch = item.checked and not item.path.is_in_arch()  # other files are covered by watching their directory
+            else:
+                do_watch = False
+            if do_watch:
+                watched_paths[str(item.path)] = item.path
+        self._watched_paths = watched_paths
+        self._watcher.set_paths(watched_paths.keys())
+
+
+    def _on_watched_paths_changed(self, changed_paths: list[str]):
+        model = self._ui_filesys_model
+        modified_files, busy_paths = [], []
+        for changed_path in changed_paths:
+            path = self._watched_paths.get(changed_path)
+            if path is None:
+                continue
+            for item in model.items_from_path(path):
+                if item.type == FilesysBrowserItemType.File:
+                    modified_files.append(item.path)
+                    parent = item.parent()
+                    if isinstance(parent, FilesysBrowser.MyFileItem):
+                        parent.update_file_stat(item.path)  # so that a re-scan of the directory does not report it again
+                elif not model.rescan_children(item):
+                    busy_paths.append(changed_path)
+        
+        if len(modified_files) > 0:
+            self.filesModified.emit(list(set(modified_files)))
+        if len(busy_paths) > 0:
+            QTimer.singleShot(FileWatcher.DEBOUNCE_MS, lambda: self._on_watched_paths_changed(busy_paths))
+        self._update_watched_paths()  # a file that was replaced is no longer being watched
+
+
     def _on_files_changed(self):
+        self._apply_pending_requests()
+        self._update_watched_paths()
         if self._inhibit_triggers:
             return
         self._ui_filesys_view.header().resizeSections(QHeaderView.ResizeMode.ResizeToContents)
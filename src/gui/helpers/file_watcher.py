@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from PyQt6.QtCore import QObject, QTimer, QFileSystemWatcher, pyqtSignal
+
+import os
+import logging
+from typing import Iterable
+
+
+
+class FileWatcher(QObject):
+    """
+    Watches files and directories, and reports changes in batches.
+
+    Uses a QFileSystemWatcher, so that nothing has to be done while nothing changes. Paths that the QFileSystemWatcher
+    refuses to watch (e.g. because the OS ran out of watches) are polled instead, by comparing modification time and size.
+    Changes are collected for a short time before they are reported, because a file that is being written usually triggers
+    several events.
+    """
+
+
+    pathsChanged = pyqtSignal(list)
+
+    DEBOUNCE_MS = 300
+    POLL_INTERVAL_MS = 2000
+
+
+    def __init__(self, parent: QObject|None = None):
+        super().__init__(parent)
+        self._paths: set[str] = set()
+        self._polled_paths: dict[str,tuple[int,int]|None] = {}
+        self._changed_paths: set[str] = set()
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._on_path_changed)
+        self._watcher.directoryChanged.connect(self._on_path_changed)
+
+        self._debounce_timer = QTimer(self)
+        self._debounce_timer.setSingleShot(True)
+        self._debounce_timer.setInterval(FileWatcher.DEBOUNCE_MS)
+        self._debounce_timer.timeout.connect(self._on_debounce_timeout)
+
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(FileWatcher.POLL_INTERVAL_MS)
+        self._poll_timer.timeout.connect(self._on_poll_timeout)
+
+
+    @staticmethod
+    def _get_stat(path: str) -> tuple[int,int]|None:
+        try:
+            stat = os.stat(path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+
+    @property
+    def paths(self) -> set[str]:
+        return set(self._paths)
+
+
+    def set_paths(self, paths: Iterable[str]):
+        """Watches exactly the given paths"""
+        paths = set(paths)
+
+        # the QFileSystemWatcher silently stops watching a file that was removed or replaced, so compare against what it actually watches
+        watched_paths = set(self._watcher.files()) | set(self._watcher.directories())
+        paths_to_remove = list(watched_paths - paths)
+        if len(paths_to_remove) > 0:
+            self._watcher.removePaths(paths_to_remove)
+        for path in list(self._polled_paths.keys()):
+            if path not in paths:
+                del self._polled_paths[path]
+
+        paths_to_add = [path for path in paths if path not in watched_paths and path not in self._polled_paths and os.path.exists(path)]
+        if len(paths_to_add) > 0:
+            failed_paths = self._watcher.addPaths(paths_to_add)
+            if len(failed_paths) > 0:
+                logging.debug(f'Unable to watch {len(failed_paths)} path(s), polling them instead')
+            for path in failed_paths:
+                self._polled_paths[path] = FileWatcher._get_stat(path)
+
+        self._paths = paths
+        if len(self._polled_paths) > 0:
+            if not self._poll_timer.isActive():
+                self._poll_timer.start()
+        else:
+            self._poll_timer.stop()
+
+
+    def clear(self):
+        self.set_paths([])
+        self._changed_paths.clear()
+        self._debounce_timer.stop()
+
+
+    def _on_path_changed(self, path: str):
+        if path not in self._paths:
+            return
+        self._changed_paths.add(path)
+        self._debounce_timer.start()  # (re-)start, so that a burst of events is only reported once
+
+
+    def _on_poll_timeout(self):
+        for path, last_stat in list(self._polled_paths.items()):
+            stat = FileWatcher._get_stat(path)
+            if stat != last_stat:
+                self._polled_paths[path] = stat
+                self._on_path_changed(path)
+
+
+    def _on_debounce_timeout(self):
+        changed_paths = list(sorted(self._changed_paths))
+        self._changed_paths.clear()
+        if len(changed_paths) > 0:
+            self.pathsChanged.emit(changed_paths)
@@ -1,7 +1,7 @@
 from .log_dialog_ui import LogDialogUi
 from .helpers.log_handler import LogHandler
 from .helpers.simple_dialogs import okcancel_dialog
-from lib import Settings, AppPaths
+from lib import Settings, AppPaths, TDR
 import logging
 
 
@@ -30,6 +30,7 @@ class LogDialog(LogDialogUi):
 
     def show_dialog(self):
         LogHandler.inst().attach(self.on_log_entry)
+        self.update_cache_stats()
         super().ui_show()
 
 
@@ -42,6 +43,15 @@ class LogDialog(LogDialogUi):
         self.ui_set_logtext(text)
 
 
+    def update_cache_stats(self):
+        n_entries, size_bytes, hits, misses = TDR.get_cache_stats()
+        self.ui_set_cache_stats(f'TDR cache: {n_entries} entries ({size_bytes/1024/1024:.1f} MB), {hits} hits, {misses} misses')
+
+
+    def on_refresh_timer(self):
+        self.update_cache_stats()
+
+
     def on_select_level(self):
         for name,level in LogDialog.Levels.items():
             if name == self.ui_level_str:
@@ -40,11 +40,18 @@ class LogDialogUi(QDialog):
         self._ui_clear_button = QPushButton('Clear Log')
         self._ui_clear_button.clicked.connect(self.on_clear)
 
+        self._ui_cache_stats_label = QLabel()
+        self._ui_cache_stats_label.setToolTip('Statistics of internal caches')
+
         self.setLayout(QtHelper.layout_v(
             self._ui_logtext,
-            QtHelper.layout_h('Level:', self._ui_level_combo, self._ui_linewrap_check, ..., self._ui_clear_button)
+            QtHelper.layout_h('Level:', self._ui_level_combo, self._ui_linewrap_check, ..., self._ui_cache_stats_label, self._ui_clear_button)
         ))
 
+        self._ui_refresh_timer = QTimer(self)
+        self._ui_refresh_timer.setInterval(1000)
+        self._ui_refresh_timer.timeout.connect(self.on_refresh_timer)
+
         self.resize(800, 600)
     
 
@@ -55,6 +62,12 @@ class LogDialogUi(QDialog):
 
     def ui_show(self):
         self.show()
+        self._ui_refresh_timer.start()
+
+
+    def hideEvent(self, event: QHideEvent):
+        self._ui_refresh_timer.stop()
+        super().hideEvent(event)
 
     
     @property
@@ -67,6 +80,10 @@ class LogDialogUi(QDialog):
 
     def ui_set_logtext(self, text: str):
         self._ui_logtext.setPlainText(text)
+
+
+    def ui_set_cache_stats(self, text: str):
+        self._ui_cache_stats_label.setText(text)
     
 
     def _on_linewrap_toggled(self):
@@ -81,3 +98,5 @@ class LogDialogUi(QDialog):
         pass
     def on_clear(self):
         pass
+    def on_refresh_timer(self):
+        pass
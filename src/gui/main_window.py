@@ -6,7 +6,7 @@ from .helpers.help import show_help
 from .components.param_selector import ParamSelector
 from .components.plot_widget import PlotWidget
 from .components.filesys_browser import FilesysBrowserItemType
-from .tabular_dialog import TabularDialog
+from .tabular_dialog import TabularDialog, TabularDatasetQualityReport
 from .rl_dialog import RlDialog
 from .settings_dialog import SettingsDialog, SettingsTab
 from .filter_dialog import FilterDialog, FilterDialogUi
@@ -17,11 +17,11 @@ from .about_dialog import AboutDialog
 from lib.si import SiFormat
 from lib import Clipboard
 from lib import AppPaths
-from lib import group_delay, v2db, start_process, shorten_path, is_ext_supported_archive, is_ext_supported_file, find_files_in_archive, get_unique_id, any_common_elements, string_to_enum, enum_to_string, is_running_from_binary, choose_smart_db_scale, open_file_in_default_viewer, shorten_string_list, natural_sort_key
+from lib import group_delay, v2db, start_process, shorten_path, is_ext_supported_archive, is_ext_supported_file, find_files_in_archive, get_unique_id, any_common_elements, string_to_enum, enum_to_string, is_running_from_binary, choose_smart_db_scale_from_summaries, open_file_in_default_viewer, shorten_string_list, natural_sort_key
 from lib import SiValue
-from lib import SParamFile
+from lib import SParamFile, SParamFileLoader, ArchivePool
 from lib import PlotHelper
-from lib import ExpressionParser, DefaultAction
+from lib import ExpressionParser, DefaultAction, Networks
 from lib import PathExt
 from lib import Settings, PlotType, PhaseProcessing, PhaseUnit, CursorSnap, ColorAssignment, Parameters, YQuantity, TdrResponse, SmithNorm, LegendPos, FileConfig, TdrResponse
 from lib import TDR
@@ -55,6 +55,8 @@ class MainWindow(MainWindowUi):
     TIMER_PLOT_UPDATE_ID, TIMER_PLOT_UPDATE_TIMEOUT_S = get_unique_id(), 10e-3
     TIMER_CLEAR_LOAD_COUNTER_ID, TIMER_CLEAR_LOAD_COUNTER_TIMEOUT_S = get_unique_id(), 0.5
     TIMER_RESCALE_GUI_ID, TIMER_RESCALE_GUI_TIMEOUT_S = get_unique_id(), 0.5
+    TIMER_FILE_LOADER_ID, TIMER_FILE_LOADER_TIMEOUT_S = get_unique_id(), 50e-3
+    TIMER_SAVE_SETTINGS_ID = get_unique_id()
 
     COLOR_ASSIGNMENT_NAMES = {
         ColorAssignment.Default: 'Individual',
@@ -82,6 +84,7 @@ class MainWindow(MainWindowUi):
         self.ready = False
         self.directories: list[str] = []
         self.files: dict[PathExt,SParamFile] = {}
+        self.file_loader = SParamFileLoader()
         self.generated_expressions = ''
         self.plot_mouse_down = False
         self.plot_axes_are_valid = False
@@ -109,6 +112,11 @@ class MainWindow(MainWindowUi):
         SParamFile.before_load = before_load_sparamfile
         SParamFile.after_load = after_load_sparamfile
 
+        # settings change at UI rates (e.g. paths, axis ranges); do not write them to disk on every single change
+        def schedule_settings_save(delay_s: float, callback: Callable[[],None]):
+            self.ui_schedule_oneshot_timer(MainWindow.TIMER_SAVE_SETTINGS_ID, delay_s, callback)
+        Settings.save_scheduler = schedule_settings_save
+
         self.ui_set_window_title(Info.AppName)
         self.ui_set_color_assignment_options(list(MainWindow.COLOR_ASSIGNMENT_NAMES.values()))
         self.ui_set_legend_pos_options(list(MainWindow.LEGEND_POS_NAMES.values()))
@@ -171,13 +179,17 @@ class MainWindow(MainWindowUi):
     
 
     def on_close(self):
+        self.file_loader.shutdown()
         dim = self.ui_get_dimensions()
         if dim.is_windowed:  # only save if not maximized or minimized
-            Settings.main_win_width = dim.width
-            Settings.main_win_height = dim.height
-            Settings.main_win_splitter_pos = dim.splitter_pos
-            Settings.last_screen_width = dim.screen_width
-            Settings.last_screen_height = dim.screen_height
+            with Settings.batch():
+                Settings.main_win_width = dim.width
+                Settings.main_win_height = dim.height
+                Settings.main_win_splitter_pos = dim.splitter_pos
+                Settings.last_screen_width = dim.screen_width
+                Settings.last_screen_height = dim.screen_height
+        Settings.save_scheduler = None  # the timers stop with the main window
+        Settings.flush()
 
 
     def apply_settings_to_ui(self, attributes: list[str]|EllipsisType = ...):
@@ -319,6 +331,7 @@ class MainWindow(MainWindowUi):
 
 
     def clear_load_counter(self):
+        ArchivePool.close_idle()  # don't keep archives open (and locked) when nothing is being loaded
         self.ui_show_abort_button(False)
         self.sparamfile_load_t_start = -1
         self.sparamfile_load_aborted = False
@@ -744,6 +757,7 @@ class MainWindow(MainWindowUi):
     def reload_all_files(self):
         try:
             self.ready = False
+            self.file_loader.cancel()
             self.ui_filesys_browser.refresh()
             self.files.clear()
             self.update_params_size()
@@ -755,6 +769,8 @@ class MainWindow(MainWindowUi):
     def get_file_prop_str(self, file: "SParamFile|None") -> str:
         try:
             if file:
+                if self.file_loader.is_pending(file):
+                    return '[loading...]'
                 if file.loaded:
                     return f'{file.nw.number_of_ports}-port, {SiValue(min(file.nw.f),"Hz")} to {SiValue(max(file.nw.f),"Hz")}'
                 elif file.error:
@@ -783,6 +799,26 @@ class MainWindow(MainWindowUi):
         RlDialog(self).show_modal_dialog(self.files.values(), selected_file)
 
 
+    def on_quality_report(self):
+        if len(self.files) < 1:
+            error_dialog('No Files', 'No files to check.', 'Open some files first.')
+            return
+        
+        files = list(sorted(self.files.values(), key=lambda file: file.path))
+        def progress_fn(n_done: int, n_total: int) -> bool:
+            # same as loading, i.e. the abort button is shown if it takes long
+            return self.before_load_sparamfile(files[min(n_done, n_total-1)].path)
+        try:
+            results = Networks.quality_report(files, progress_fn)
+        finally:
+            self.clear_load_counter()
+        
+        for file,(_,error) in zip(files, results):
+            if error:
+                logging.warning(f'Unable to check quality of "{file.path}" ({error})')
+        TabularDialog(self).show_modal_dialog(datasets=[TabularDatasetQualityReport(files, [summary for summary,_ in results])])
+
+
     def on_show_log(self):
         self.log_dialog.show_dialog()
     
@@ -801,6 +837,7 @@ class MainWindow(MainWindowUi):
     
     def on_abort(self):
         self.sparamfile_load_aborted = True
+        self.file_loader.cancel()
     
 
     def on_about(self):
@@ -1397,12 +1434,54 @@ class MainWindow(MainWindowUi):
                 del self.files[available_path]
         
         # pre-load files that are newly displayed in the filebrowser
+        new_files = []
         for browser_path in browser_paths:
             if browser_path not in self.files:
                 # pre-load, so that expressions can find them
                 self.files[browser_path] = SParamFile(browser_path)
-                # show preliminary status
-                self.ui_filesys_browser.update_status(browser_path, self.get_file_prop_str(self.files[browser_path]))
+                new_files.append(self.files[browser_path])
+        
+        # load the new files in the background
+        self.file_loader.submit(new_files)
+        if self.file_loader.busy:
+            self.ui_schedule_oneshot_timer(MainWindow.TIMER_FILE_LOADER_ID, MainWindow.TIMER_FILE_LOADER_TIMEOUT_S, self.on_file_loader_poll)
+        
+        # show preliminary status
+        for file in new_files:
+            self.ui_filesys_browser.update_status(file.path, self.get_file_prop_str(file))
+    
+
+    def on_filesys_files_modified(self, paths: list[PathExt]):
+        # only re-load the modified files; the plot is updated once they are loaded (see on_file_loader_poll())
+        reloaded_files = []
+        for path in paths:
+            if path not in self.files:
+                continue
+            self.files[path] = SParamFile(path)
+            reloaded_files.append(self.files[path])
+        if len(reloaded_files) < 1:
+            return
+        
+        self.file_loader.submit(reloaded_files)
+        if self.file_loader.busy:
+            self.ui_schedule_oneshot_timer(MainWindow.TIMER_FILE_LOADER_ID, MainWindow.TIMER_FILE_LOADER_TIMEOUT_S, self.on_file_loader_poll)
+        for file in reloaded_files:
+            self.ui_filesys_browser.update_status(file.path, self.get_file_prop_str(file))
+    
+
+    def on_file_loader_poll(self):
+        finished_files = self.file_loader.poll()
+
+        if self.file_loader.busy:
+            self.ui_schedule_oneshot_timer(MainWindow.TIMER_FILE_LOADER_ID, MainWindow.TIMER_FILE_LOADER_TIMEOUT_S, self.on_file_loader_poll)
+        else:
+            self.ui_schedule_oneshot_timer(MainWindow.TIMER_CLEAR_LOAD_COUNTER_ID, MainWindow.TIMER_CLEAR_LOAD_COUNTER_TIMEOUT_S, self.clear_load_counter, retrigger_behavior='postpone')
+        
+        # plot whatever has finished so far
+        if len(finished_files) > 0:
+            selected_paths = self.ui_filesys_browser.selected_files
+            if any([file.path in selected_paths for file in finished_files]) or self.ui_param_selector.useExpressions():
+                self.schedule_plot_update()
     
 
     def on_filesys_toplevels_changed(self, paths: list[str]):
@@ -1750,9 +1829,8 @@ class MainWindow(MainWindowUi):
             log_entries = LogHandler.inst().get_records(logging.WARNING)
             last_log_entry_at_start = log_entries[-1] if log_entries else None
 
-            self.ui_plot.clear()
             self.generated_expressions = ''
-            self.plot = None
+            previous_plot, self.plot = self.plot, None  # axes and traces of the previous plot are re-used where possible
 
             def map_opacity(x):
                 return max(1e-3, min(1, x**2))  # tjis mapping makes adjustment of small values easier
@@ -1780,7 +1858,7 @@ class MainWindow(MainWindowUi):
             log_x, log_y = self.ui_logx, self.ui_logy
             default_trace_opacity = map_opacity(self.ui_trace_opacity)
             
-            common_plot_args = dict(show_legend=self.ui_show_legend, hide_single_item_legend=self.ui_hide_single_item_legend, shorten_legend=self.ui_shorten_legend, max_legend_items=self.ui_maxlegend)
+            common_plot_args = dict(show_legend=self.ui_show_legend, hide_single_item_legend=self.ui_hide_single_item_legend, shorten_legend=self.ui_shorten_legend, max_legend_items=self.ui_maxlegend, previous=previous_plot)
 
             # initialize dummy data
             xq, xf, xl = '', SiFormat(), False
@@ -1951,7 +2029,10 @@ class MainWindow(MainWindowUi):
                 return self.ui_expr_slider(show, min, max)
             
             param_selector_is_in_use = True
-            expression_parser = ExpressionParser(self.files.values(), selected_files, actions, self.get_nw_name_for_template(self._ref_path_for_template), add_to_plot_list, slicer_fn_wrapper, slider_fn_wrapper)
+            # files that are still being loaded in the background are omitted; the plot is updated once they are loaded
+            available_files = [file for file in self.files.values() if not self.file_loader.is_pending(file)]
+            selected_files = [file for file in selected_files if not self.file_loader.is_pending(file)]
+            expression_parser = ExpressionParser(available_files, selected_files, actions, self.get_nw_name_for_template(self._ref_path_for_template), add_to_plot_list, slicer_fn_wrapper, slider_fn_wrapper)
             if use_expressions:
 
                 Settings.expression = self.ui_expression
@@ -1988,14 +2069,28 @@ class MainWindow(MainWindowUi):
                     self.ui_enable_trace_color_selector = True
                 color_assignment = string_to_enum(self.ui_color_assignment, MainWindow.COLOR_ASSIGNMENT_NAMES)
 
-            def add_to_plot(f, sp, z0, name, style: str = None, color: str = None, width: float = None, opacity: float = None, original_files: set[PathExt] = None, param_kind: str = None, number_type: NumberType = NumberType.VectorLike):
+            def is_valid_trace(sp) -> bool:
+                return not np.all(np.isnan(sp))
+
+            def get_number_type(number_type: NumberType) -> NumberType:
+                if Settings.treat_all_as_complex:
+                    return NumberType.VectorLike
+                return number_type
+
+            tdr_results: dict[int,tuple[np.ndarray,np.ndarray]] = {}
+            if plot_type == PlotType.TimeDomain:
+                # all traces are transformed at once, because traces that share a frequency grid can share one FFT
+                tdr_indices = [i for i,kwargs in enumerate(all_plot_kwargs) if is_valid_trace(kwargs['sp']) and get_number_type(kwargs['number_type']) == NumberType.VectorLike]
+                tdr_traces = [(all_plot_kwargs[i]['f'], all_plot_kwargs[i]['sp'], all_plot_kwargs[i]['z0']) for i in tdr_indices]
+                tdr_results = dict(zip(tdr_indices, tdr.get_many(tdr_traces)))
+
+            def add_to_plot(f, sp, z0, name, style: str = None, color: str = None, width: float = None, opacity: float = None, original_files: set[PathExt] = None, param_kind: str = None, number_type: NumberType = NumberType.VectorLike, tdr_result: tuple[np.ndarray,np.ndarray]|None = None):
                 nonlocal color_assignment, available_colors, next_color_index, color_mapping
 
-                if np.all(np.isnan(sp)):
+                if not is_valid_trace(sp):
                     return
 
-                if Settings.treat_all_as_complex:
-                    number_type = NumberType.VectorLike
+                number_type = get_number_type(number_type)
 
                 if style is None:
                     style = '-'
@@ -2062,7 +2157,7 @@ class MainWindow(MainWindowUi):
                             logging.info(f'The trace "{name}" is not vector-like; omitting from {chart_type_str} chart')
                 elif plot_type == PlotType.TimeDomain:
                     if number_type in [NumberType.VectorLike]:
-                        tdr_t, tdr_wave = tdr.get(f, sp, z0)
+                        tdr_t, tdr_wave = tdr_result if tdr_result is not None else tdr.get(f, sp, z0)
                         self.plot.add(tdr_t, tdr_wave, None, name, style, **kwargs)
                     else:
                         if Settings.verbose:
@@ -2111,8 +2206,8 @@ class MainWindow(MainWindowUi):
                             logging.info(f'The trace "{name}" is a plain scalar; just plotting the real value, ignoring decibel/magnitude/real/imag/phase/groupdelay')
                         self.plot.add(f, sp, None, name, style, **kwargs)
 
-            for kwargs in all_plot_kwargs:
-                add_to_plot(**kwargs)
+            for i,kwargs in enumerate(all_plot_kwargs):
+                add_to_plot(**kwargs, tdr_result=tdr_results.get(i))
             
             self.ui_param_selector.setDimParameters(not param_selector_is_in_use)
 
@@ -2138,15 +2233,16 @@ class MainWindow(MainWindowUi):
                     fixed_x_range, x_range_start, x_range_end = True, self.ui_xaxis_range.low, self.ui_xaxis_range.high
 
                 if plot_type == PlotType.Cartesian and y_qty == YQuantity.Decibels and smart_db_scaling and len(self.plot.plot_items)>=1:
-                    def get_y_range(x, y):
-                        if fixed_x_range:
-                            idx = (x >= x_range_start) & (x <= x_range_end)
-                            return y[idx]
-                        else:
-                            return y
-                    all_y_values = [get_y_range(plot.data.x.values,plot.data.y.values) for plot in self.plot.plot_items if plot.currently_used_axis==1]
-                    do_smart_scaling, smart_y0, smart_y = choose_smart_db_scale(all_y_values)
-                    if do_smart_scaling or fixed_x_range:  # when using a fixed X-range, then apply the smart scaling, because it best reflects the curreent X-range
+                    # the summaries are kept between plot updates, so they are only calculated again when the data or the X-range changes
+                    summaries = [plot.get_summaries().get(x_range_start, x_range_end) for plot in self.plot.plot_items if plot.currently_used_axis==1]
+                    summaries = [summary for summary in summaries if summary is not None]
+                    if len(summaries) > 0:
+                        do_smart_scaling, smart_y0, smart_y = choose_smart_db_scale_from_summaries(np.array(summaries))
+                        # when using a fixed X-range, then apply the smart scaling, because it best reflects the curreent X-range
+                        apply_smart_scaling = do_smart_scaling or fixed_x_range
+                    else:
+                        apply_smart_scaling = False  # no trace has any data in the X-range, so just use the default scale
+                    if apply_smart_scaling:
                         self.ui_yaxis_range.low, self.ui_yaxis_range.high = smart_y0, smart_y
                         self.plot.set_yaxis_range(smart_y0, smart_y)
                         self._smartscale_set_y = True
@@ -303,6 +303,7 @@ class MainWindowUi(QMainWindow):
         self._ui_filesys_browser.selectionChanged.connect(self.on_filesys_selection_changed)
         self._ui_filesys_browser.topLevelsChanged.connect(self.on_filesys_toplevels_changed)
         self._ui_filesys_browser.filesChanged.connect(self.on_filesys_files_changed)
+        self._ui_filesys_browser.filesModified.connect(self.on_filesys_files_modified)
         self._ui_filesys_browser.contextMenuRequested.connect(self.on_filesys_contextmenu)
         self._ui_filesys_browser.elisionDoubleclick.connect(self.on_filesys_elision_doubleclick)
         self._ui_files_tab.setLayout(QtHelper.layout_h(self._ui_filesys_browser))
@@ -540,6 +541,7 @@ class MainWindowUi(QMainWindow):
         self._ui_menuitem_open_ext = QtHelper.add_menuitem(self._ui_toolmenu, 'Open Selected Files Externally', self.on_open_externally, shortcut='Ctrl+E')
         self._ui_toolmenu.addSeparator()
         self._ui_menuitem_rlcalc = QtHelper.add_menuitem(self._ui_toolmenu, 'Return Loss Integrator...', self.on_rl_calc)
+        self._ui_menuitem_quality_report = QtHelper.add_menuitem(self._ui_toolmenu, 'Quality Report...', self.on_quality_report)
         self._ui_menuitem_log = QtHelper.add_menuitem(self._ui_toolmenu, 'Status Log', self.on_show_log, shortcut='Ctrl+L')
         self._ui_toolmenu_button.setMenu(self._ui_toolmenu)
         self._ui_toolmenu_button.setPopupMode(QToolButton.ToolButtonPopupMode.InstantPopup)
@@ -1255,6 +1257,8 @@ class MainWindowUi(QMainWindow):
         pass
     def on_rl_calc(self):
         pass
+    def on_quality_report(self):
+        pass
     def on_show_log(self):
         pass
     def on_settings(self):
@@ -1349,6 +1353,8 @@ class MainWindowUi(QMainWindow):
         pass
     def on_filesys_files_changed(self):
         pass
+    def on_filesys_files_modified(self, paths: list[PathExt]):
+        pass
     def on_filesys_selection_changed(self):
         pass
     def on_filesys_elision_doubleclick(self):
@@ -1,6 +1,6 @@
 from .rl_dialog_ui import RlDialogUi
 from .helpers.help import show_help
-from lib import SParamFile, BodeFano, SiFormat, SiValue, SiRange, v2db
+from lib import SParamFile, BodeFano, BodeFanoIntegrator, SiFormat, SiValue, SiRange, v2db
 
 import logging
 
@@ -14,6 +14,7 @@ class RlDialog(RlDialogUi):
 
     def __init__(self, parent):
         self.files: list[SParamFile] = []
+        self._integrators: dict[tuple[str,int],BodeFanoIntegrator] = {}
         super().__init__(parent)
         self.ui_intrange_presets([
             str(SiRange(..., ..., spec=RlDialog.SI_FORMAT_HZ)),
@@ -26,6 +27,7 @@ class RlDialog(RlDialogUi):
 
     def show_modal_dialog(self, files: "list[SParamFile]", initial_selection: SParamFile):
         self.files = files
+        self._integrators.clear()
         self.ui_set_files_list([file.name for file in files], initial_selection.name if initial_selection else None)
         super().ui_show_modal()
 
@@ -76,7 +78,11 @@ class RlDialog(RlDialogUi):
 
     def calculate(self, file: SParamFile, port: int, int0: float, int1: float, tgt0: float, tgt1: float, histogram: bool):
         
-        bodefano = BodeFano.from_network(file.nw, port, int0, int1, tgt0, tgt1)
+        # the integral only depends on file and port, so that editing the ranges is fast even for long traces
+        key = (file.name, port)
+        if key not in self._integrators:
+            self._integrators[key] = BodeFanoIntegrator(file.nw.f, file.nw.s[:,port-1,port-1])
+        bodefano = BodeFano(None, None, int0, int1, tgt0, tgt1, integrator=self._integrators[key])
 
         int0, int1 = bodefano.f_integration_actual_start_hz, bodefano.f_integration_actual_stop_hz
 
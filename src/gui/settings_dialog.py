@@ -2,7 +2,7 @@ from .settings_dialog_ui import SettingsDialogUi, SettingsTab
 from .helpers.simple_dialogs import okcancel_dialog, open_file_dialog, error_dialog
 from .helpers.qt_helper import QtHelper
 from .components.plot_widget import PlotWidget
-from lib import Settings, PhaseUnit, CsvSeparator, CursorSnap, ColorAssignment, LogNegativeHandling, MainWindowLayout, LargeMatrixBehavior, GuiColorScheme
+from lib import Settings, NetworkCache, PhaseUnit, CsvSeparator, CursorSnap, ColorAssignment, LogNegativeHandling, MainWindowLayout, LargeMatrixBehavior, GuiColorScheme
 from lib.utils import is_windows, window_has_argument, enum_to_string, string_to_enum, is_valid_binary, start_process, find_default_editors, is_valid_binary
 import pathlib
 import logging
@@ -82,6 +82,8 @@ class SettingsDialog(SettingsDialogUi):
             self.ui_comment_expr = Settings.comment_existing_expr
             self.ui_dynamic_template_ref = Settings.dynamic_template_references
             self.ui_extract_zip = Settings.extract_zip
+            self.ui_network_cache = Settings.network_cache
+            self.ui_network_cache_size = Settings.network_cache_maxsize_mb
             self.ui_warn_timeout = Settings.warn_timeout_s
             self.ui_ext_ed = Settings.ext_editor_cmd
             self.ui_plotstyle = Settings.plot_style
@@ -159,6 +161,18 @@ class SettingsDialog(SettingsDialogUi):
         Settings.extract_zip = self.ui_extract_zip
 
 
+    def on_network_cache_change(self):
+        Settings.network_cache = self.ui_network_cache
+
+
+    def on_network_cache_size_change(self):
+        Settings.network_cache_maxsize_mb = self.ui_network_cache_size
+
+
+    def on_network_cache_clear(self):
+        NetworkCache.clear()
+
+
     def on_cursor_snap_changed(self):
         Settings.cursor_snap = string_to_enum(self.ui_cursor_snap, SettingsDialog.CURSOR_SNAP_NAMES)
     
@@ -127,6 +127,16 @@ class SettingsDialogUi(QDialog):
         self._ui_extract_zip_check = QCheckBox('Extract .zip-Files')
         self._ui_extract_zip_check.setToolTip('Reads .zip-files, and allows to directly plot S-parameter files inside them. If disabled, .zip-files are not shown.')
         self._ui_extract_zip_check.toggled.connect(self.on_zip_change)
+        self._ui_network_cache_check = QCheckBox('Cache Loaded Files')
+        self._ui_network_cache_check.setToolTip('Keeps a copy of each loaded file in a fast binary format, so that unchanged files can be opened much faster next time.')
+        self._ui_network_cache_check.toggled.connect(self.on_network_cache_change)
+        self._ui_network_cache_size_spin = QSpinBox()
+        self._ui_network_cache_size_spin.setMinimum(1)
+        self._ui_network_cache_size_spin.setMaximum(1024*1024)
+        self._ui_network_cache_size_spin.setToolTip('Maximum size of the file cache; when exceeded, the least recently used files are removed from the cache.')
+        self._ui_network_cache_size_spin.valueChanged.connect(self.on_network_cache_size_change)
+        self._ui_network_cache_clear_btn = QtHelper.make_button(self, 'Clear Cache', self.on_network_cache_clear)
+        self._ui_network_cache_clear_btn.setToolTip('Remove all files from the file cache.')
         self._ui_warn_timeout_combo = QComboBox()
         self._ui_warn_timeout_combo.setToolTip('If loading files takes longer than the specified timeout, an "abort" button is shown in the toolbar. The user has then a chance to abort the operation and stop waiting. May be useful for slow network drives.')
         for secs in self._warn_timeout_values:
@@ -149,6 +159,7 @@ class SettingsDialogUi(QDialog):
         files_widget.setLayout(
             QtHelper.layout_v(
                 self._ui_extract_zip_check,
+                QtHelper.layout_h(self._ui_network_cache_check, 'Max. Size:', self._ui_network_cache_size_spin, 'MB', self._ui_network_cache_clear_btn, ...),
                 QtHelper.layout_h('Warn When Loading Takes Longer Than', self._ui_warn_timeout_combo, ...),
                 QtHelper.layout_h('CSV Separator:', self._ui_csvsep_combo, ...),
                 QtHelper.layout_h('Export Phase Unit:', self._ui_deg_radio, self._ui_rad_radio, ...),
@@ -466,6 +477,22 @@ class SettingsDialogUi(QDialog):
         self._ui_extract_zip_check.setChecked(value)
 
     
+    @property
+    def ui_network_cache(self) -> bool:
+        return self._ui_network_cache_check.isChecked()
+    @ui_network_cache.setter
+    def ui_network_cache(self, value: bool):
+        self._ui_network_cache_check.setChecked(value)
+
+    
+    @property
+    def ui_network_cache_size(self) -> int:
+        return self._ui_network_cache_size_spin.value()
+    @ui_network_cache_size.setter
+    def ui_network_cache_size(self, value: int):
+        self._ui_network_cache_size_spin.setValue(value)
+
+    
     @property
     def ui_restore_geometry(self) -> bool:
         return self._ui_restore_geometry_check.isChecked()
@@ -570,6 +597,12 @@ class SettingsDialogUi(QDialog):
         pass
     def on_zip_change(self):
         pass
+    def on_network_cache_change(self):
+        pass
+    def on_network_cache_size_change(self):
+        pass
+    def on_network_cache_clear(self):
+        pass
     def on_comment_change(self):
         pass
     def on_template_ref_changed(self):
@@ -3,7 +3,7 @@ from .helpers.simple_dialogs import save_file_dialog, error_dialog, exception_di
 from .settings_dialog import SettingsDialog, SettingsTab
 from .helpers.help import show_help
 from .text_dialog import TextDialog
-from lib import SParamFile, PlotData, SiValue, SiFormat, AppPaths, Clipboard, SiRange, SiFormat, start_process, Settings, PhaseUnit, CsvSeparator
+from lib import SParamFile, PlotData, SiValue, SiFormat, AppPaths, Clipboard, SiRange, SiFormat, start_process, Settings, PhaseUnit, CsvSeparator, Network
 import dataclasses
 import io
 import pathlib
@@ -76,7 +76,9 @@ class TabularDataset(TabularDatasetBase):
 
     @staticmethod
     def create(dataset: Any, display_number: int|None = None) -> "TabularDataset":
-        if isinstance(dataset, SParamFile):
+        if isinstance(dataset, TabularDataset):
+            return dataset
+        elif isinstance(dataset, SParamFile):
             return TabularDatasetSFile(dataset, f'{display_number} (File): {dataset.name}')
         elif isinstance(dataset, PlotData):
             return TabularDatasetPlot(dataset, f'{display_number} (Trace): {dataset.name}')
@@ -166,6 +168,16 @@ class TabularDatasetPlot(TabularDataset):
     
 
 
+class TabularDatasetQualityReport(TabularDataset):
+    """One row per file, with the worst case of each quality metric (see Network.quality_summary())"""
+    def __init__(self, files: list[SParamFile], summaries: list[dict[str,float]|None]):
+        names = np.array([file.name for file in files], dtype=object)
+        ycols = [metric.capitalize() for metric in Network.QUALITY_SUMMARY_METRICS]
+        ycol_datas = [np.array([summary[metric] if summary else math.nan for summary in summaries]) for metric in Network.QUALITY_SUMMARY_METRICS]
+        super().__init__('Quality Report', 'File', ycols, names, ycol_datas, False)
+
+
+
 class TabularDialog(TabularDialogUi):
 
     DISPLAY_PREC = 5
@@ -254,11 +266,20 @@ class TabularDialog(TabularDialogUi):
     def populate_table(self, dataset: "TabularDataset"):
         ds_fmt = self.format_dataset(self.filter_dataset(dataset), code_safe_names=False)
         headers = [ds_fmt.xcol, *ds_fmt.ycols]
+        if TabularDialog.is_numeric(ds_fmt.xcol_data):
+            xcol = [str(SiValue(x,spec=SiFormat(digits=TabularDialog.DISPLAY_PREC))) for x in ds_fmt.xcol_data]
+        else:
+            xcol = [str(x) for x in ds_fmt.xcol_data]  # e.g. file names
         columns = [
-            [str(SiValue(x,spec=SiFormat(digits=TabularDialog.DISPLAY_PREC))) for x in ds_fmt.xcol_data],
+            xcol,
             *[[f'{y:.{TabularDialog.DISPLAY_PREC}g}' for y in col] for col in ds_fmt.ycol_datas]
         ]
-        self.ui_populate_table(headers, columns)
+        self.ui_populate_table(headers, columns, sort_keys=[ds_fmt.xcol_data, *ds_fmt.ycol_datas])
+
+
+    @staticmethod
+    def is_numeric(data: np.ndarray) -> bool:
+        return np.asarray(data).dtype.kind in 'iufc'
 
         
     def create_csv(self, dataset: "TabularDataset"):
@@ -293,6 +314,8 @@ class TabularDialog(TabularDialogUi):
         def sanitize_class_name(name: str) -> str:
             return ''.join([w.capitalize() for w in split_words(name)])
         def format_value(x) -> str:
+            if isinstance(x, str):
+                return f'"{sanitize_str(x)}"'
             return f'{x:.{TabularDialog.DISPLAY_PREC}g}'
         py = 'import numpy as np\n\n'
         py += f'class {sanitize_class_name(dataset.name)}:\n'
@@ -324,6 +347,8 @@ class TabularDialog(TabularDialogUi):
         def sanitize_var_name(name: str) -> str:
             return '_'.join([w.lower() for w in split_words(name)])
         def format_value(x) -> str:
+            if isinstance(x, str):
+                return repr(x)
             return f'{x:.{TabularDialog.DISPLAY_PREC}g}'
         py = 'import pandas as pd\n\n'
         py += f'df_{sanitize_var_name(dataset.name)} = pd.DataFrame({{\n'
@@ -405,10 +430,11 @@ class TabularDialog(TabularDialogUi):
             ycols, ycol_datas = ycols_filtered, ycol_datas_filtered
         self.ui_indicate_param_filter_error(False)
         
-        mask = (xcol_data >= filter_x0) & (xcol_data <= filter_x1)
-        xcol_data = xcol_data[mask]
-        for i in range(len(ycol_datas)):
-            ycol_datas[i] = ycol_datas[i][mask]
+        if TabularDialog.is_numeric(xcol_data):
+            mask = (xcol_data >= filter_x0) & (xcol_data <= filter_x1)
+            xcol_data = xcol_data[mask]
+            for i in range(len(ycol_datas)):
+                ycol_datas[i] = ycol_datas[i][mask]
         
         return TabularDataset(dataset.name, dataset.xcol, ycols, xcol_data, ycol_datas, dataset.is_spar)
 
@@ -1,4 +1,5 @@
 from .helpers.qt_helper import QtHelper
+from lib import natural_sort_key
 from PyQt6 import QtCore, QtGui, QtWidgets
 from PyQt6.QtCore import *
 from PyQt6.QtGui import *
@@ -10,6 +11,7 @@ import enum
 import logging
 import os
 from typing import Callable, Union
+import numpy as np
 import pandas as pd
 
 
@@ -19,10 +21,11 @@ class TabularDialogUi(QDialog):
 
     class TableModel(QtCore.QAbstractTableModel):
 
-        def __init__(self, headers: list[str], columns: list[list[str]]):
+        def __init__(self, headers: list[str], columns: list[list[str]], sort_keys: list[np.ndarray]|None = None):
             super().__init__()
             self._headers = headers
             self._columns = columns
+            self._sort_keys = sort_keys  # e.g. the numeric values of the displayed strings
 
         def data(self, index, role):
             if role == Qt.ItemDataRole.DisplayRole:
@@ -44,6 +47,24 @@ class TabularDialogUi(QDialog):
                 elif orientation == Qt.Orientation.Vertical:
                     return str(section+1)
                 raise NotImplementedError()
+
+        def sort(self, column, order):
+            if column < 0 or column >= len(self._columns) or len(self._columns[column]) < 2:
+                return
+            keys = np.asarray(self._sort_keys[column] if self._sort_keys else self._columns[column])
+            if np.iscomplexobj(keys):
+                keys = np.abs(keys)
+            descending = order == Qt.SortOrder.DescendingOrder
+            if keys.dtype.kind in 'iuf':
+                rows = np.argsort(-keys if descending else keys, kind='stable')  # NaN is always last
+            else:
+                rows = np.array(sorted(range(len(keys)), key=lambda i: natural_sort_key(str(keys[i])), reverse=descending))
+            
+            self.layoutAboutToBeChanged.emit()
+            self._columns = [[col[i] for i in rows] for col in self._columns]
+            if self._sort_keys:
+                self._sort_keys = [np.asarray(col_keys)[rows] for col_keys in self._sort_keys]
+            self.layoutChanged.emit()
     
 
     def __init__(self, parent):
@@ -86,6 +107,8 @@ class TabularDialogUi(QDialog):
 
         self._ui_table = QTableView()
         self._ui_table.setMinimumSize(400, 100)
+        self._ui_table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)  # i.e. initially unsorted
+        self._ui_table.setSortingEnabled(True)
         main_layout.addWidget(self._ui_table)
 
         self.setLayout(main_layout)
@@ -179,9 +202,12 @@ class TabularDialogUi(QDialog):
         QtHelper.indicate_error(self._ui_param_filter_edit, apply_warning)
     
 
-    def ui_populate_table(self, headers: list[str], columns: list[list[str]]):
-        self._ui_table_model = TabularDialogUi.TableModel(headers, columns)
+    def ui_populate_table(self, headers: list[str], columns: list[list[str]], sort_keys: list[np.ndarray]|None = None):
+        self._ui_table_model = TabularDialogUi.TableModel(headers, columns, sort_keys)
         self._ui_table.setModel(self._ui_table_model)
+        header = self._ui_table.horizontalHeader()
+        if header.sortIndicatorSection() >= 0:
+            self._ui_table_model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())  # keep the order that the user has chosen
 
     
     @property
@@ -1,22 +1,26 @@
-from .sparam_helpers import get_sparam_name, get_port_index
+from .sparam_helpers import get_sparam_name, get_port_index, interpolate_polar
 from .si import SiValue, SiFormat, SiRange
 from .path_ext import PathExt
 from .sparam_file import SParamFile
+from .sparam_file_loader import SParamFileLoader
+from .network_cache import NetworkCache
+from .grid_alignment import GridAlignment, InterpolationPlan
+from .running_stats import RunningStats
 from .plot_data import PlotData, PlotDataQuantity
-from .plot import PlotHelper
+from .plot import PlotHelper, TraceIndex, TraceSummaries
 from .appsettings import AppSettings
 from .utils import get_unique_short_filename, shorten_path, is_ext_supported, is_ext_supported_file, is_ext_supported_archive
-from .utils import group_delay, v2db, db2v, choose_smart_db_scale
+from .utils import group_delay, v2db, db2v, choose_smart_db_scale, choose_smart_db_scale_from_summaries, get_db_trace_summary, decimate_minmax
 from .utils import get_unique_id, any_common_elements, window_has_argument, factorize_int
 from .utils import natural_sort_key, format_minute_seconds, string_to_enum, enum_to_string, strip_common
 from .utils import get_next_1_10_100, get_next_1_3_10, get_next_1_2_5_10
-from .utils import find_files_in_archive, load_file_from_archive
+from .utils import find_files_in_archive, load_file_from_archive, scan_directory
 from .utils import file_pattern_to_regex, make_filename_matcher
 from .utils import is_windows, get_callstack_str, open_file_in_default_viewer, start_process, is_running_from_binary, is_valid_binary, find_default_editors
-from .utils import ArchiveFileLoader
-from .expressions import ExpressionParser, DefaultAction
+from .utils import ArchiveFileLoader, ArchivePool
+from .expressions import ExpressionParser, DefaultAction, Network, Networks
 from .apppaths import AppPaths
-from .bodefano import BodeFano
+from .bodefano import BodeFano, BodeFanoIntegrator
 from .circles import StabilityCircle
 from .shortstr import shorten_string_list
 from .clipboard import Clipboard
@@ -26,4 +30,5 @@ from .file_config import FileConfig
 from .tdr import TDR
 from .network_ext import NetworkExt, NetworkExtPort, NetworkExtPortMode
 from .citi.citireader import CitiReader
+from .touchstone import TouchstoneReader
 from .citi.citiwriter import CitiWriter
@@ -88,6 +88,16 @@ class AppPaths:
         return os.path.join(AppPaths.get_settings_dir(settings_format_version_str), 'app_settings.json')
 
 
+    @staticmethod
+    def get_network_cache_dir() -> str:
+        return os.path.join(
+            QStandardPaths.writableLocation(QStandardPaths.StandardLocation.CacheLocation),
+            Info.Domain,
+            Info.AppName,
+            'networks'
+        )
+
+
     @staticmethod
     def get_default_file_dir() -> str:
         return QStandardPaths.writableLocation(QStandardPaths.StandardLocation.HomeLocation)
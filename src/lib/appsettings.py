@@ -1,11 +1,17 @@
 from .apppaths import AppPaths
 from logging import warning
-import os, json, logging
-from typing import Callable, Any
+import os, json, logging, atexit, contextlib
+from typing import Callable, Any, Iterator
 
 
 
 class AppSettings:
+    """
+    Settings that are persisted as a JSON file.
+
+    Changes are written behind: a change only marks the settings as dirty, and the file is written later, by the function
+    in save_scheduler (e.g. a GUI timer), or by flush(). Without a save_scheduler, every change is written right away.
+    """
 
 
     def __new__(cls, *args, **kwargs):
@@ -18,7 +24,14 @@ class AppSettings:
         self._file = AppPaths.get_settings_path(format_version_str)
         self._observers: list[Callable[None,None]] = []
         self._inhbit_listeners = False
+        self._dirty = False
+        self._save_scheduled = False
+        self._batch_depth = 0
+        self._batch_changes: list[str] = []
+        self.save_delay_s = 1.0
+        self.save_scheduler: Callable[[float,Callable[[],None]],None]|None = None  # called with (delay in seconds, callback)
         self._load()
+        atexit.register(self.flush)
     
 
     @property
@@ -51,8 +64,52 @@ class AppSettings:
                     return
         super().__setattr__(__name, __value)
         if is_setting:
-            self._save()
-            self._notify([__name])
+            self._mark_dirty()
+            if self._batch_depth > 0:
+                if __name not in self._batch_changes:
+                    self._batch_changes.append(__name)
+            else:
+                self._notify([__name])
+
+
+    @contextlib.contextmanager
+    def batch(self) -> "Iterator[AppSettings]":
+        """Context manager for bulk updates; observers are notified once, and the settings are saved once, at the end"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                changes, self._batch_changes = self._batch_changes, []
+                if self._dirty:
+                    self._mark_dirty()
+                if len(changes) > 0:
+                    self._notify(changes)
+
+
+    def flush(self):
+        """Writes the settings to the file, if they were changed since they were last written"""
+        if not self._dirty:
+            return
+        self._dirty = False
+        self._save()
+
+
+    def _mark_dirty(self):
+        self._dirty = True
+        if self._batch_depth > 0:
+            return  # saved at the end of the batch
+        if self.save_scheduler is None:
+            self.flush()
+        elif not self._save_scheduled:
+            self._save_scheduled = True
+            self.save_scheduler(self.save_delay_s, self._on_save_scheduled)
+
+
+    def _on_save_scheduled(self):
+        self._save_scheduled = False
+        self.flush()
 
     
     def _load(self):
@@ -91,8 +148,11 @@ class AppSettings:
             dir = os.path.dirname(self._file)
             os.makedirs(dir, exist_ok=True) 
 
-            with open(self._file, 'w') as fp:
+            # write to a temporary file first, so that the settings file is never left half-written
+            temp_path = f'{self._file}.{os.getpid()}.tmp'
+            with open(temp_path, 'w') as fp:
                 json.dump(data, fp, indent=4)
+            os.replace(temp_path, self._file)
         except Exception as ex:
             logging.warning(f'Unable to save settings ({ex})')
     
@@ -101,6 +161,7 @@ class AppSettings:
         self._inhbit_listeners = True
         for k,v in self._defaults.items():
             self.__dict__[k] = v
+        self._dirty = False
         self._save()
         self._inhbit_listeners = False
         self._notify([*self._defaults.keys()])
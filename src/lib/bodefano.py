@@ -2,39 +2,83 @@ from .network_ext import NetworkExt
 import numpy as np
 import math
 import skrf
-import scipy.integrate
+
+
+
+class BodeFanoIntegrator:
+    """
+    Cumulative Bode-Fano integral ∫ln(1/|Γ|)dω of one reflection coefficient, over a sorted frequency grid.
+
+    The cumulative integral is calculated once, so the integral over any frequency range is just a difference of two
+    values, after locating the range with a binary search. This makes it cheap to evaluate many ranges on the same trace
+    (e.g. while the range is edited in the return loss dialog).
+    """
+
+
+    def __init__(self, frequencies_hz: "np.ndarray", sparam_sii_term: "np.ndarray"):
+        self.f = np.asarray(frequencies_hz, dtype=float)
+        self.s = np.asarray(sparam_sii_term)
+        if len(self.f) != len(self.s):
+            raise ValueError(f'Expected frequency and S-parameter to have the same length, got {len(self.f)} and {len(self.s)}')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y = np.log(1/np.abs(self.s))
+            self._segments = np.diff(self.f*math.tau) * (y[1:]+y[:-1]) / 2
+        # a sample with |S|=0 gives an infinite segment, which would spoil every cumulative value after it; so those segments
+        #   are left out of the cumulative integral, and only counted, so that ranges that contain them can be integrated directly
+        finite = np.isfinite(self._segments)
+        self.cumulative_integral = np.concatenate([[0.0], np.cumsum(np.where(finite, self._segments, 0))])
+        self._cumulative_nonfinite = np.concatenate([[0], np.cumsum(~finite)])
+
+
+    def get_range(self, f_min: float = -1e99, f_max: float = +1e99) -> slice:
+        """Indices of all frequencies in the inclusive range f_min..f_max"""
+        return slice(int(np.searchsorted(self.f, f_min, side='left')), int(np.searchsorted(self.f, f_max, side='right')))
+
+
+    def integrate(self, f_min: float = -1e99, f_max: float = +1e99) -> float:
+        """Trapezoidal integral over all frequencies in the inclusive range f_min..f_max"""
+        r = self.get_range(f_min, f_max)
+        if r.stop - r.start < 2:
+            return 0.0
+        if self._cumulative_nonfinite[r.stop-1] != self._cumulative_nonfinite[r.start]:
+            return float(np.sum(self._segments[r.start:r.stop-1]))
+        return float(self.cumulative_integral[r.stop-1] - self.cumulative_integral[r.start])
+
 
 
 class BodeFano:
 
 
-    def __init__(self, freuqencies_hz: "np.ndarray", sparam_sii_term: "np.ndarray",
+    def __init__(self, freuqencies_hz: "np.ndarray|None", sparam_sii_term: "np.ndarray|None",
             f_integration_start_hz: float, f_integration_stop_hz: float,
-            f_target_start_hz: float, f_target_stop_hz: float):
-        
-        def crop_freq_range(freqs, sparam, f_min=-1e99, f_max=+1e99):
-            cropped = [(f,s) for f,s in zip(freqs,sparam) if f_min<=f<=f_max]
-            freqs_cropped = [f for (f,_) in cropped]
-            sparam_cropped = [s for (_,s) in cropped]
-            return np.array(freqs_cropped), np.array(sparam_cropped)
-
-        def bode_fano_integral(freqs, sparam):
-            return scipy.integrate.trapezoid(np.log(1/np.abs(sparam)), freqs*math.tau)
+            f_target_start_hz: float, f_target_stop_hz: float,
+            integrator: "BodeFanoIntegrator|None" = None):
+        """
+        Either pass frequencies and S-parameter, or an <integrator> that was created from them before (which is faster
+        when the same trace is evaluated for multiple ranges).
+        """
 
         def calc_avg_rl(integral_value, f_min, f_max):
             gamma = 1 / math.exp(integral_value / ((f_max-f_min)*math.tau))
             db = 20*math.log10(gamma)
             return db
 
-        self.nw_f_intrange, self.nw_s_intrange = crop_freq_range(freuqencies_hz, sparam_sii_term, f_integration_start_hz, f_integration_stop_hz)
-        self.nw_f_calcrange, self.nw_s_calcrange = crop_freq_range(freuqencies_hz, sparam_sii_term, f_target_start_hz, f_target_stop_hz)
-        
-        self.f_integration_actual_start_hz = min(self.nw_f_intrange)
-        self.f_integration_actual_stop_hz = max(self.nw_f_intrange)
-        
-        integral_intrange = bode_fano_integral(self.nw_f_intrange, self.nw_s_intrange)
-        integral_calcrange = bode_fano_integral(self.nw_f_calcrange, self.nw_s_calcrange)
-        
+        if integrator is None:
+            integrator = BodeFanoIntegrator(freuqencies_hz, sparam_sii_term)
+
+        intrange = integrator.get_range(f_integration_start_hz, f_integration_stop_hz)
+        calcrange = integrator.get_range(f_target_start_hz, f_target_stop_hz)
+        self.nw_f_intrange, self.nw_s_intrange = integrator.f[intrange], integrator.s[intrange]
+        self.nw_f_calcrange, self.nw_s_calcrange = integrator.f[calcrange], integrator.s[calcrange]
+        if len(self.nw_f_intrange) < 1:
+            raise ValueError('The integration range does not contain any frequency')
+
+        self.f_integration_actual_start_hz = float(self.nw_f_intrange[0])
+        self.f_integration_actual_stop_hz = float(self.nw_f_intrange[-1])
+
+        integral_intrange = integrator.integrate(f_integration_start_hz, f_integration_stop_hz)
+        integral_calcrange = integrator.integrate(f_target_start_hz, f_target_stop_hz)
+
         self.db_available = calc_avg_rl(integral_intrange, self.f_integration_actual_start_hz, self.f_integration_actual_stop_hz)
         self.db_current = calc_avg_rl(integral_calcrange, f_target_start_hz, f_target_stop_hz)
         self.db_achievable = calc_avg_rl(integral_intrange, f_target_start_hz, f_target_stop_hz)
@@ -1,2 +1,3 @@
 from .expressions import ExpressionParser
-from .helpers import DefaultAction
\ No newline at end of file
+from .helpers import DefaultAction
+from .networks import Network, Networks
\ No newline at end of file
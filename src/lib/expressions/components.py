@@ -1,7 +1,6 @@
 from __future__ import annotations
 import math
 import skrf
-import copy
 import numpy as np
 import scipy.constants
 from typing import override
@@ -26,15 +25,15 @@ class ParametricNetwork(Network):
         return NetworkExt(name=name, f=f, s=s, f_unit='Hz', z0=z0)
 
 
-    def interpolate(self, f_start_or_vector_or_reference: "np.ndarray|float|Network", f_stop: float = None, f_step: float = None, n: int = None, scale='lin', z0=50)-> "ParametricNetwork":
+    def interpolate(self, f_start_or_vector_or_reference: "np.ndarray|float|Network", f_stop: float = None, f_step: float = None, n: int = None, scale='lin', z0=50)-> "Network":
         f = Network._get_interpolation_frequency(f_start_or_vector_or_reference=f_start_or_vector_or_reference, f_stop=f_stop, f_step=f_step, n=n, scale=scale)
-        return self._calculate(self, f=f, z0=z0)
+        return self._interpolate(f, z0)
 
 
-    def _interpolate(self, f: np.ndarray) -> "ParametricNetwork":
-        result = copy.deepcopy(self)
-        result._calculate(f=f, z0=50)
-        return result
+    def _interpolate(self, f: np.ndarray, z0: float = 50) -> "Network":
+        # _calculate() always creates a new NetworkExt, so the result is not affected when this component is re-calculated later
+        self._calculate(f=f, z0=z0)
+        return Network(self._nw, name=self._name, original_files=set(self.original_files))
 
 
 
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+from ..network_ext import NetworkExt
+
+import skrf
+import functools
+import numpy as np
+
+
+
+class NetworkStack:
+    """
+    Several networks with identical frequency grid, ports and reference impedances, stored as one array of shape
+    (n_networks, n_frequencies, n_ports, n_ports).
+
+    The operations below are vectorized over all networks, i.e. they replace one call per network by a single call. If all
+    networks are the same object (e.g. a fixture that is broadcast to many DUTs), it is stored only once, and NumPy
+    broadcasting takes care of the rest. Intermediate products that several metrics need (e.g. Δ, or Sᴴ⋅S) are calculated
+    once per stack.
+    """
+
+
+    def __init__(self, nws: list[NetworkExt]):
+        assert NetworkStack.can_stack(nws), 'Networks cannot be stacked'
+        self.nws = nws
+        self.f: np.ndarray = nws[0].f
+        self.z0: np.ndarray = nws[0].z0
+        self.s_def: str = nws[0].s_def
+        if all([nw is nws[0] for nw in nws]):
+            self.s = nws[0].s[np.newaxis,...]
+        else:
+            self.s = np.stack([nw.s for nw in nws])
+
+
+    @staticmethod
+    def can_stack(nws: list[NetworkExt]) -> bool:
+        if len(nws) < 1:
+            return False
+        first = nws[0]
+        first_ports = [str(port) for port in first.ports]
+        for nw in nws[1:]:
+            if nw is first:
+                continue
+            if nw.s.shape != first.s.shape or nw.s_def != first.s_def:
+                return False
+            if not np.array_equal(nw.f, first.f) or not np.array_equal(nw.z0, first.z0):
+                return False
+            if [str(port) for port in nw.ports] != first_ports:
+                return False
+        return True
+
+
+    @staticmethod
+    def have_uniform_z0(nws: list[NetworkExt]) -> bool:
+        """Whether all ports of all networks have the same reference impedance, at all frequencies"""
+        z0 = np.concatenate([np.ravel(nw.z0) for nw in nws])
+        return bool(np.all(z0 == z0[0]))
+
+
+    @property
+    def n_ports(self) -> int:
+        return self.s.shape[-1]
+
+
+    def _ensure_2port(self, what: str):
+        if self.n_ports != 2:
+            raise ValueError(f'{what} is only defined for 2-port networks')
+
+
+    @staticmethod
+    def _apply_per_matrix(fn, s: np.ndarray) -> np.ndarray:
+        """Applies a function that expects an array of shape (n_frequencies, n_ports, n_ports) to all networks at once"""
+        return fn(s.reshape([-1, *s.shape[-2:]])).reshape(s.shape)
+
+
+    def invert(self) -> np.ndarray:
+        """See skrf.Network.inv, i.e. the result cascaded with the original network is a unity T-matrix"""
+        if self.n_ports < 2:
+            raise ValueError('1-port networks do not have inverses')
+        return NetworkStack._apply_per_matrix(skrf.network.inv, self.s)
+
+
+    def flip(self) -> tuple[np.ndarray,np.ndarray]:
+        """Swaps the first half of the ports with the second half, see skrf.Network.flipped; returns S-matrices and z0"""
+        if self.n_ports % 2 != 0:
+            raise ValueError('Only networks with an even number of ports can be flipped')
+        order = np.roll(np.arange(self.n_ports), self.n_ports//2)
+        return self.s[...,order,:][...,:,order], self.z0[...,order]
+
+
+    def renormalize(self, z_new: "complex|list[complex]") -> np.ndarray:
+        n_networks, n_f = self.s.shape[0], self.s.shape[1]
+        z_old = np.tile(self.z0, [n_networks,1])
+        z_new = np.broadcast_to(np.array(z_new, dtype=complex), [n_networks*n_f, self.n_ports])
+        return NetworkStack._apply_per_matrix(lambda s: skrf.network.renormalize_s(s, z_old, z_new, self.s_def), self.s)
+
+
+    def cascade(self, other: NetworkStack) -> np.ndarray:
+        """
+        Cascades port 2 of each network with port 1 of the corresponding other network, see skrf.Network.__pow__; only valid
+        if all ports of both stacks have the same reference impedance (see have_uniform_z0())
+        """
+        self._ensure_2port('Batched cascading')
+        a, b = self.s, other.s
+        a11, a12, a21, a22 = a[...,0,0], a[...,0,1], a[...,1,0], a[...,1,1]
+        b11, b12, b21, b22 = b[...,0,0], b[...,0,1], b[...,1,0], b[...,1,1]
+        inv_denom = 1 / (1 - a22*b11)
+        result = np.empty(np.broadcast_shapes(a.shape, b.shape), dtype=complex)
+        result[...,0,0] = a11 + a12*a21*b11*inv_denom
+        result[...,0,1] = a12*b12*inv_denom
+        result[...,1,0] = a21*b21*inv_denom
+        result[...,1,1] = b22 + b21*b12*a22*inv_denom
+        return result
+
+
+    @functools.cached_property
+    def _delta_magnitude(self) -> np.ndarray:
+        s = self.s
+        return np.abs(s[...,0,0]*s[...,1,1] - s[...,0,1]*s[...,1,0])
+
+
+    @functools.cached_property
+    def _gram(self) -> np.ndarray:
+        """Sᴴ⋅S, shape (n_networks, n_frequencies, n_ports, n_ports)"""
+        return np.matmul(np.conjugate(np.swapaxes(self.s, -1, -2)), self.s)
+
+
+    @functools.cached_property
+    def _diagonal(self) -> np.ndarray:
+        return np.diagonal(self.s, axis1=-2, axis2=-1)
+
+
+    def determinant_magnitude(self) -> np.ndarray:
+        """|Δ| = |S11⋅S22 - S12⋅S21|, shape (n_networks, n_frequencies)"""
+        self._ensure_2port('Δ')
+        return self._delta_magnitude
+
+
+    def stability_factor(self) -> np.ndarray:
+        """Rollet's K, see skrf.Network.stability"""
+        self._ensure_2port('Stability factor K')
+        s = self.s
+        denom = 2 * np.abs(s[...,0,1]) * np.abs(s[...,1,0])
+        num = 1 - np.abs(s[...,0,0])**2 - np.abs(s[...,1,1])**2 + self.determinant_magnitude()**2
+        return np.divide(num, denom, out=np.full(num.shape, np.inf), where=denom!=0)
+
+
+    def b1(self) -> np.ndarray:
+        self._ensure_2port('B1')
+        return 1 + np.abs(self.s[...,0,0]) - np.abs(self.s[...,1,1]) - self.determinant_magnitude()
+
+
+    def mu(self, mu: int) -> np.ndarray:
+        """Edwards-Sinsky stability factor µ (mu=1) or µ' (mu=2)"""
+        self._ensure_2port('Stability factor µ')
+        if mu!=1 and mu!=2:
+            raise ValueError('Argument mu must be 1 or 2')
+        s = self.s
+        p1, p2 = (0,1) if mu==1 else (1,0)
+        return (1 - np.abs(s[...,p1,p1]**2)) / (np.abs(s[...,p2,p2]-np.conjugate(s[...,p1,p1])*self.determinant_magnitude()) + np.abs(s[...,1,0]*s[...,0,1]))
+
+
+    def max_stable_gain(self) -> np.ndarray:
+        self._ensure_2port('Maximum stable gain')
+        return np.abs(self.s[...,1,0]) / np.abs(self.s[...,0,1])
+
+
+    def max_gain(self) -> np.ndarray:
+        """Maximum available gain for K > 1, and maximum stable gain otherwise, see skrf.Network.max_gain"""
+        k_clipped = np.clip(self.stability_factor(), 1, None)
+        return self.max_stable_gain() / (k_clipped + np.sqrt(np.square(k_clipped) - 1))
+
+
+    def unilateral_gain(self) -> np.ndarray:
+        """Mason's unilateral gain, see skrf.Network.unilateral_gain"""
+        ratio = self.s[...,1,0] / self.s[...,0,1]
+        return np.abs(ratio - 1)**2 / (2*self.stability_factor()*self.max_stable_gain() - 2*np.real(ratio))
+
+
+    def passivity(self) -> np.ndarray:
+        """
+        A network is passive if λ >= 0 for all eigenvalues λ of U - Sᴴ⋅S (see <https://ibis.org/summits/nov10b/tseng.pdf> and
+        <https://www.simberian.com/Presentations/Shlepnev_S_ParameterQualityMetrics_July2014_final.pdf>). Returns, per
+        frequency, max(0,-λ) of the lowest eigenvalue λ, i.e. zero if the network is passive.
+        """
+        # U - Sᴴ⋅S is Hermitian, so its eigenvalues are real, and all matrices can be handled by a single eigvalsh() call
+        eigenvalues = np.linalg.eigvalsh(np.eye(self.n_ports) - self._gram)  # in ascending order
+        return np.maximum(0, -eigenvalues[...,0])
+
+
+    def losslessness(self) -> np.ndarray:
+        """
+        A network is lossless if Sᵀ⋅S* = U (see e.g. Pozar, 4.3). Returns, per frequency, the highest element of |Sᵀ⋅S* - U|,
+        i.e. zero if the network is lossless.
+        """
+        # Sᵀ⋅S* is the complex conjugate of Sᴴ⋅S, and U is real, so the magnitudes are the same
+        return np.max(np.abs(self._gram - np.eye(self.n_ports)), axis=(-2,-1))
+
+
+    def reciprocity(self) -> np.ndarray:
+        """
+        A network is reciprocal if Sᵀ = S (see e.g. Pozar, 1.9). Returns, per frequency, the highest element of |Sᵀ - S|, i.e.
+        zero if the network is reciprocal.
+        """
+        if self.n_ports < 2:
+            raise ValueError('Reciprocity is only defined for networks with 2 or more ports')
+        i, j = np.triu_indices(self.n_ports, 1)  # |Sᵀ - S| is symmetric, and zero on the diagonal
+        return np.max(np.abs(self.s[...,i,j] - self.s[...,j,i]), axis=-1)
+
+
+    def symmetry(self) -> np.ndarray:
+        """
+        A network is symmetric if it is reciprocal, and additionally Sii=Sjj=Skk... Returns, per frequency, the highest element
+        of |Sᵀ - S|, plus the highest difference between any two diagonal elements, i.e. zero if the network is symmetric.
+        """
+        if self.n_ports < 2:
+            raise ValueError('Symmetry is only defined for networks with 2 or more ports')
+        i, j = np.triu_indices(self.n_ports, 1)
+        diagonal_spread = np.max(np.abs(self._diagonal[...,i] - self._diagonal[...,j]), axis=-1)
+        return self.reciprocity() + diagonal_spread
+
+
+    def quality_metrics(self) -> dict[str,np.ndarray]:
+        """
+        All metrics that apply to the number of ports of this stack, in one pass, so that they share the intermediate products;
+        each result has shape (n_networks, n_frequencies)
+        """
+        metrics = {'passivity': self.passivity(), 'losslessness': self.losslessness()}
+        if self.n_ports >= 2:
+            metrics |= {'reciprocity': self.reciprocity(), 'symmetry': self.symmetry()}
+        if self.n_ports == 2:
+            metrics |= {'k': self.stability_factor(), 'µ1': self.mu(1), 'µ2': self.mu(2), 'Δ': self.determinant_magnitude()}
+        return metrics
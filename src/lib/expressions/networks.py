@@ -4,34 +4,63 @@ import warnings
 from ..sparam_file import SParamFile, PathExt
 from ..bodefano import BodeFano
 from ..circles import StabilityCircle, NoiseCircle, BilateralPowerGainCircle
-from ..sparam_helpers import get_sparam_name, get_port_index, parse_quick_param
+from ..sparam_helpers import get_sparam_name, get_port_index, parse_quick_param, interpolate_polar
+from ..grid_alignment import GridAlignment
 from .sparams import SParam, SParams, NumberType
 from .helpers import format_call_signature, DefaultAction
+from .operation_cache import OperationCache
+from .network_stack import NetworkStack
 from ..utils import sanitize_filename, get_subset, p2db
 from ..citi import CitiWriter
 from ..si import SiValue
 from ..settings import Settings
 from ..network_ext import NetworkExt
+from ..network_cache import NetworkCache
+from ..tdr import TDR
 from info import Info
 
 import math
 import skrf
+import functools
 import numpy as np
 import logging
 import re
 import os
 import logging
 import warnings
+import multiprocessing
+import concurrent.futures
 from types import NoneType
 from typing import overload, Callable, Generator
 
 
 
+def _get_quality_summaries(paths: list[tuple[str,str|None]]) -> list[tuple[dict[str,float]|None,str|None]]:
+    """Runs in a worker process; returns (summary, error) for each (path, path within archive)"""
+    result = []
+    for path, arch_path in paths:
+        file = SParamFile(PathExt(path, arch_path=arch_path))
+        file._load_data(log_errors=False)
+        if file.error:
+            result.append((None, file.error_message))
+            continue
+        try:
+            result.append((Network(file).quality_summary(), None))
+        except Exception as ex:
+            result.append((None, str(ex)))
+    return result
+
+
+
 class Network:
 
+
+    QUALITY_SUMMARY_METRICS = ['passivity', 'reciprocity', 'losslessness', 'causality']
+
     
     def __init__(self, nw: "Network|NetworkExt|SParamFile" = None, name: str = None, original_files: "set[PathExt]" = None):
         self._nw: NetworkExt = None
+        self._key: tuple|None = None  # describes how this network was derived, for caching; None if it cannot be identified
         self.original_files: set[PathExt] = original_files or set()
         
         if isinstance(nw, SParamFile):
@@ -39,11 +68,15 @@ class Network:
             self.original_files.add(nw.path)
             if name is None:
                 name = nw.name
+            if original_files is None:
+                self._key = ('file', nw.uid, name)
         elif isinstance(nw, Network):
             self._nw = nw._nw
             self.original_files |= nw.original_files
             if name is None:
                 name = nw._name
+            if original_files is None and name == nw._name:
+                self._key = nw._key
         elif isinstance(nw, NetworkExt):
             self._nw = nw
             if name is None:
@@ -54,8 +87,6 @@ class Network:
             raise ValueError(f'Invalid type to init Network object (<{nw}>)')
         
         self._name = name
-        
-        self._postponed_operations = []
     
 
     def _ready(self) -> bool:
@@ -64,31 +95,105 @@ class Network:
 
     def _ensure_ready(self) -> bool:
         assert self._ready(), 'Network is not ready'
-        self._run_postponed_operations()
+        
+
+    def _postponable(method):
+        """
+        If neither this network nor any network argument is calculated yet, the operation is applied later, when they are
+        (see PostponedNetwork)
+        """
+        @functools.wraps(method)
+        def wrapper(self: "Network", *args, **kwargs):
+            networks = [self, *[arg for arg in [*args, *kwargs.values()] if isinstance(arg, Network)]]
+            if any([nw._ready() for nw in networks]):
+                return method(self, *args, **kwargs)
+            else:
+                return PostponedNetwork(self, method, args, kwargs)
+        return wrapper
 
 
-    def _run_postponed_operations(self):
-        assert self._ready(), 'Network is not ready'
+    @staticmethod
+    def _get_arg_key(arg) -> "tuple|None":
+        """Returns a hashable representation of an argument, or None if the argument cannot be identified"""
+        if isinstance(arg, Network):
+            if arg._key is None:
+                return None
+            return ('nw', arg._key)
+        elif arg is None or arg is Ellipsis or isinstance(arg, (bool,int,float,complex,str)):
+            return ('val', type(arg).__name__, arg)
+        elif isinstance(arg, np.ndarray):
+            if arg.dtype == object:
+                return None
+            return ('arr', arg.shape, arg.dtype.str, arg.tobytes())
+        elif isinstance(arg, (list,tuple)):
+            items = [Network._get_arg_key(item) for item in arg]
+            if any([item is None for item in items]):
+                return None
+            return ('seq', *items)
+        return None
 
-        # swap lists to avoid an infinite recursion...
-        operations_to_run, self._postponed_operations = self._postponed_operations, []
 
-        for method, args, kwargs in operations_to_run:
-            result = method(self, *args, **kwargs)
-            self._nw = result._nw
-            self._name = result._name
-            self.original_files = result.original_files
-        
+    @staticmethod
+    def _copy_cached_result(result):
+        """Cached results are shared, so every caller gets its own (shallow) copy"""
+        if isinstance(result, Network):
+            copy = Network(result._nw, name=result._name, original_files=set(result.original_files))
+            copy._key = result._key
+            return copy
+        elif isinstance(result, SParam):
+            return result._modified_copy(original_files=set(result.original_files))
+        elif isinstance(result, list):
+            return [Network._copy_cached_result(item) for item in result]
+        raise ValueError(f'Unexpected type of cached result ({type(result)})')
 
-    def _postponable(method):
+
+    @staticmethod
+    def _get_result_size(result) -> int:
+        if isinstance(result, Network):
+            return result._nw.s.nbytes + result._nw.f.nbytes
+        elif isinstance(result, SParam):
+            return np.asarray(result.s).nbytes + np.asarray(result.f).nbytes
+        elif isinstance(result, list):
+            return sum([Network._get_result_size(item) for item in result])
+        return 0
+
+
+    @staticmethod
+    def _get_operation_key(method: Callable, nw: "Network", args: tuple, kwargs: dict) -> "tuple|None":
+        self_key = Network._get_arg_key(nw) if nw._ready() else None
+        args_key = Network._get_arg_key([*args, *[v for _,v in sorted(kwargs.items())]])
+        if self_key is None or args_key is None:
+            return None
+        return (method.__name__, self_key, tuple(sorted(kwargs.keys())), args_key)
+
+
+    @staticmethod
+    def _put_in_cache(key: tuple, result):
+        if isinstance(result, Network):
+            if not result._ready():
+                return
+            result._key = key
+        OperationCache.put(key, Network._copy_cached_result(result), Network._get_result_size(result))
+
+
+    def _memoized(method):
+        """
+        Results are taken from the OperationCache, if this network and all arguments can be identified (i.e. they are derived
+        from files only); the underlying NetworkExt objects are shared between cached results, so they must not be modified.
+        """
+        @functools.wraps(method)
         def wrapper(self: "Network", *args, **kwargs):
-            if self._ready():
+            key = Network._get_operation_key(method, self, args, kwargs)
+            if key is None:
                 return method(self, *args, **kwargs)
-            else:
-                import copy
-                obj = copy.deepcopy(self)
-                obj._postponed_operations.append((method, args, kwargs))
-                return obj
+            
+            cached = OperationCache.get(key)
+            if cached is not None:
+                return Network._copy_cached_result(cached)
+            
+            result = method(self, *args, **kwargs)
+            Network._put_in_cache(key, result)
+            return result
         return wrapper
 
     
@@ -133,8 +238,7 @@ class Network:
             return a, b
 
         def interpolate_f(a: "NetworkExt", b: "NetworkExt") -> "tuple[NetworkExt,NetworkExt]":
-            all_freqs = np.array(sorted(list(set([*a.f, *b.f]))))
-            f_new = np.array(all_freqs)
+            f_new = GridAlignment.union(a.f, b.f)
             assert a.number_of_ports == b.number_of_ports, f'Expected both networks to have the same number of ports during interpolation step, got {a.number_of_ports} and {b.number_of_ports}'
             a_new = Network._get_interpolated_sparams(a, f_new)
             b_new = Network._get_interpolated_sparams(b, f_new)
@@ -150,17 +254,7 @@ class Network:
 
     @staticmethod
     def _get_interpolated_sparams(nw: NetworkExt, f: np.ndarray) -> NetworkExt:
-        
-        def interpolate_param(current_s: np.ndarray, current_f: np.ndarray, new_f: np.ndarray) -> np.ndarray:
-            current_mag, current_pha = np.abs(current_s), np.unwrap(np.angle(current_s))
-            interp_mag = np.interp(new_f, current_f, current_mag)
-            interp_pha = np.interp(new_f, current_f, current_pha)
-            return interp_mag * np.exp(1j*interp_pha)
-        
-        s_new = np.ndarray([len(f),nw.nports,nw.nports], dtype=complex)
-        for ep in range(nw.nports):
-            for ip in range(nw.nports):
-                s_new[:,ep,ip] = interpolate_param(nw.s[:,ep,ip], nw.f, f)
+        s_new = interpolate_polar(nw.f, nw.s, f)
         return NetworkExt(s=s_new, name=nw.name, z0=nw.z0[0,:], f=f, f_unit='Hz')
 
     
@@ -172,7 +266,7 @@ class Network:
         if isinstance(other,int) or isinstance(other,float) or isinstance(other,complex):
             self._calculate(None, None)
             nw = self.nw.copy()
-            nw.s = operation_fn(nw.s, other.s)
+            nw.s = operation_fn(nw.s, other)
             return Network(nw, f'{self.name}{operator_str}{other}', original_files=self.original_files)
         elif isinstance(other, Network):
             Network._calculate_with_respect_to(self, other)
@@ -185,22 +279,27 @@ class Network:
             raise ValueError(f'Expected operand of type float or Network, got <{other}>')
 
         
+    @_memoized
     def __add__(self, other: "Network|float") -> "Network":
         return self._smatrix_op_smatrix(other, lambda s1,s2: s1+s2, '+')
 
         
+    @_memoized
     def __sub__(self, other: "Network|float") -> "Network":
         return self._smatrix_op_smatrix(other, lambda s1,s2: s1-s2, '-')
 
         
+    @_memoized
     def __matmul__(self, other: "Network") -> "Network":
         return self._smatrix_op_smatrix(other, lambda s1,s2: s1@s2, '@')
 
         
+    @_memoized
     def __mul__(self, other: "Network|float") -> "Network":
         return self._smatrix_op_smatrix(other, lambda s1,s2: s1*s2, '*')
 
         
+    @_memoized
     def __truediv__(self, other: "Network|float") -> "Network":
         return self._smatrix_op_smatrix(other, lambda s1,s2: s1/s2, '/')
 
@@ -209,6 +308,8 @@ class Network:
         return self.invert()
 
 
+    @_postponable
+    @_memoized
     def __pow__(self, other: "Network") -> "Network":
         a_nw,b_nw = Network._get_adapted_networks(self, other)
         return Network(a_nw**b_nw, self.name+'∘'+other.name, original_files=self.original_files|other.original_files)
@@ -237,6 +338,7 @@ class Network:
         return self._get_param(egress_port, ingress_port, rl_only=rl_only, il_only=il_only, fwd_il_only=fwd_il_only, rev_il_only=rev_il_only, name=name, param_prefix='S')
     
 
+    @_memoized
     def z(self, egress_port = None, ingress_port = None, *, rl_only: bool = False, il_only: bool = False, fwd_il_only: bool = False, rev_il_only: bool = False, name: str = None) -> list[SParam]:
         nw_transformed = self.nw.copy()
         nw_transformed.s = self.nw.z
@@ -244,6 +346,7 @@ class Network:
         return obj_transformed._get_param(egress_port, ingress_port, rl_only=rl_only, il_only=il_only, fwd_il_only=fwd_il_only, rev_il_only=rev_il_only, name=name, param_prefix='Z')
     
 
+    @_memoized
     def y(self, egress_port = None, ingress_port = None, *, rl_only: bool = False, il_only: bool = False, fwd_il_only: bool = False, rev_il_only: bool = False, name: str = None) -> list[SParam]:
         nw_transformed = self.nw.copy()
         nw_transformed.s = self.nw.y
@@ -251,6 +354,7 @@ class Network:
         return obj_transformed._get_param(egress_port, ingress_port, rl_only=rl_only, il_only=il_only, fwd_il_only=fwd_il_only, rev_il_only=rev_il_only, name=name, param_prefix='Y')
     
 
+    @_memoized
     def abcd(self, egress_port = None, ingress_port = None, *, rl_only: bool = False, il_only: bool = False, fwd_il_only: bool = False, rev_il_only: bool = False, name: str = None) -> list[SParam]:
         nw_transformed = self.nw.copy()
         nw_transformed.s = self.nw.a
@@ -258,6 +362,7 @@ class Network:
         return obj_transformed._get_param(egress_port, ingress_port, rl_only=rl_only, il_only=il_only, fwd_il_only=fwd_il_only, rev_il_only=rev_il_only, name=name, param_prefix='ABCD')
     
 
+    @_memoized
     def t(self, egress_port = None, ingress_port = None, *, rl_only: bool = False, il_only: bool = False, fwd_il_only: bool = False, rev_il_only: bool = False, name: str = None) -> list[SParam]:
         nw_transformed = self.nw.copy()
         nw_transformed.s = self.nw.t
@@ -351,11 +456,13 @@ class Network:
         raise ValueError('Interpolate(): invalid argument')
     
     
+    @_memoized
     def interpolate(self, f_start_or_vector_or_reference: "np.ndarray|float|Network", f_stop: float = None, f_step: float = None, n: int = None, scale='lin')-> "Network":
         f = Network._get_interpolation_frequency(f_start_or_vector_or_reference=f_start_or_vector_or_reference, f_stop=f_stop, f_step=f_step, n=n, scale=scale)
         return self._interpolate(f)
 
 
+    @_memoized
     def crop_f(self, f_start: "float|None" = None, f_end: "float|None" = None) -> "Network":
         f_start = -1e99 if f_start is None else f_start
         f_end   = +1e99 if f_end   is None else f_end
@@ -374,6 +481,7 @@ class Network:
         return Network(new_nw, original_files=self.original_files)
     
 
+    @_memoized
     def at_f(self, f: float) -> "Network":
         idx = np.argmin(np.abs(f - self.nw.f))
         new_f = self.nw.f[idx]
@@ -400,6 +508,7 @@ class Network:
         
 
     @_postponable
+    @_memoized
     def shunt(self, gamma_term: complex = -1) -> "Network":
         """
         Example usage:
@@ -424,30 +533,33 @@ class Network:
         return Network(new_nw, original_files=self.original_files)
     
 
+    @_memoized
     def k(self):
         if self.nw.number_of_ports != 2:
             raise RuntimeError(f'Network.k(): cannot calculate stability factor of {self.name} (only valid for 2-port networks)')
         return SParam(f'{self.name} k', self.nw.f, self.nw.stability, self.nw.z0[0,0], original_files=self.original_files, param_type='k', number_type=NumberType.PlainScalar)
     
 
-    def _delta(self) -> np.ndarray:
-        assert self.nw.number_of_ports == 2
-        return np.abs(self.nw.s[:,0,0]*self.nw.s[:,1,1] - self.nw.s[:,0,1]*self.nw.s[:,1,0])
+    def _get_stack(self) -> NetworkStack:
+        """This network as a stack of one, so that the metrics below share the vectorized implementation with Networks"""
+        return NetworkStack([self.nw])
 
     
+    @_memoized
     def delta(self):
         if self.nw.number_of_ports != 2:
             raise RuntimeError(f'Network.delta(mu): cannot calculate determinant of {self.name} (only valid for 2-port networks)')
-        return SParam(f'{self.name} Δ', self.nw.f, np.abs(self._delta()), self.nw.z0[0,0], original_files=self.original_files, param_type='Δ', number_type=NumberType.PlainScalar)
+        return SParam(f'{self.name} Δ', self.nw.f, self._get_stack().determinant_magnitude()[0], self.nw.z0[0,0], original_files=self.original_files, param_type='Δ', number_type=NumberType.PlainScalar)
     
 
+    @_memoized
     def b1(self):
         if self.nw.number_of_ports != 2:
             raise RuntimeError(f'Network.b1(): cannot calculate determinant of {self.name} (only valid for 2-port networks)')
-        b1 = 1 + np.abs(self.nw.s[:,0,0]) - np.abs(self.nw.s[:,1,1]) - np.abs(self._delta())
-        return SParam(f'{self.name} B1', self.nw.f, b1, self.nw.z0[0,0], original_files=self.original_files, param_type='B1', number_type=NumberType.PlainScalar)
+        return SParam(f'{self.name} B1', self.nw.f, self._get_stack().b1()[0], self.nw.z0[0,0], original_files=self.original_files, param_type='B1', number_type=NumberType.PlainScalar)
     
 
+    @_memoized
     def nf(self, z: complex|None = None):
         if self.nw.number_of_ports != 2:
             raise RuntimeError(f'Network.nf(): cannot determine noise parameters of {self.name} (only valid for 2-port networks)')
@@ -456,6 +568,7 @@ class Network:
         return SParam(f'{self.name} NF', self.nw.f_noise.f, p2db(self.nw.nf(z)), self.nw.z0[0,0], original_files=self.original_files, param_type='NF', number_type=NumberType.PlainScalar)
     
 
+    @_memoized
     def noisefactor(self, z: complex|None = None):
         if self.nw.number_of_ports != 2:
             raise RuntimeError(f'Network.noisefactor(): cannot determine noise parameters of {self.name} (only valid for 2-port networks)')
@@ -464,18 +577,21 @@ class Network:
         return SParam(f'{self.name} F', self.nw.f_noise.f, self.nw.nf(z), self.nw.z0[0,0], original_files=self.original_files, param_type='F', number_type=NumberType.MagnitudeLike)
     
 
+    @_memoized
     def nf_min(self):
         if self.nw.number_of_ports != 2:
             raise RuntimeError(f'Network.nf_min(): cannot determine noise parameters of {self.name} (only valid for 2-port networks)')
         return SParam(f'{self.name} NFmin', self.nw.f, self.nw.nfmin_db, self.nw.z0[0,0], original_files=self.original_files, param_type='NFmin', number_type=NumberType.PlainScalar)
     
 
+    @_memoized
     def noisefactor_min(self):
         if self.nw.number_of_ports != 2:
             raise RuntimeError(f'Network.noisefactor_min(): cannot determine noise parameters of {self.name} (only valid for 2-port networks)')
         return SParam(f'{self.name} Fmin', self.nw.f, self.nw.nfmin, self.nw.z0[0,0], original_files=self.original_files, param_type='Fmin', number_type=NumberType.MagnitudeLike)
     
 
+    @_memoized
     def gamma_opt(self):
         if self.nw.number_of_ports != 2:
             raise RuntimeError(f'Network.gamma_opt(): cannot determine noise parameters of {self.name} (only valid for 2-port networks)')
@@ -483,12 +599,14 @@ class Network:
         return SParam(f'{self.name} Γopt', self.nw.f, gamma_opt, self.nw.z0[0,0], original_files=self.original_files, param_type='Γopt', number_type=NumberType.VectorLike)
     
 
+    @_memoized
     def z_opt(self):
         if self.nw.number_of_ports != 2:
             raise RuntimeError(f'Network.z_opt(): cannot determine noise parameters of {self.name} (only valid for 2-port networks)')
         return SParam(f'{self.name} Zopt', self.nw.f, self.nw.z_opt, self.nw.z0[0,0], original_files=self.original_files, param_type='Zopt', number_type=NumberType.VectorLike)
     
 
+    @_memoized
     def rn(self):
         if self.nw.number_of_ports != 2:
             raise RuntimeError(f'Network.rn(): cannot determine noise parameters of {self.name} (only valid for 2-port networks)')
@@ -590,114 +708,105 @@ class Network:
                 _plot_ga(f1, gp1)
     
 
+    @_memoized
     def mag(self):
         if self.nw.number_of_ports != 2:
             raise RuntimeError(f'Network.mag(): cannot calculate maximum available power gain of {self.name} (only valid for 2-port networks)')
         return SParam(f'{self.name} MAG', self.nw.f, self.nw.max_gain, self.nw.z0[0,0], original_files=self.original_files, param_type='MAG', number_type=NumberType.MagnitudeLike)
     
 
+    @_memoized
     def msg(self):
         if self.nw.number_of_ports != 2:
             raise RuntimeError(f'Network.msg(): cannot calculate maximum stable power gain of {self.name} (only valid for 2-port networks)')
         return SParam(f'{self.name} MSG', self.nw.f, self.nw.max_stable_gain, self.nw.z0[0,0], original_files=self.original_files, param_type='MSG', number_type=NumberType.MagnitudeLike)
     
 
+    @_memoized
     def u(self):
         if self.nw.number_of_ports != 2:
             raise RuntimeError(f'Network.u(): cannot calculate Mason\'s unilateral gain of {self.name} (only valid for 2-port networks)')
         return SParam(f'{self.name} U', self.nw.f, self.nw.unilateral_gain, self.nw.z0[0,0], original_files=self.original_files, param_type='U', number_type=NumberType.MagnitudeLike)
     
 
+    @_memoized
     def mu(self, mu: int = 1):
         if self.nw.number_of_ports != 2:
             raise RuntimeError(f'Network.mu(mu): cannot calculate stability factor of {self.name} (only valid for 2-port networks)')
         if mu!=1 and mu!=2:
             raise RuntimeError(f'Network.mu(mu): argument mu must be 1 or 2')
         # see https://eng.libretexts.org/Bookshelves/Electrical_Engineering/Electronics/Microwave_and_RF_Design_V%3A_Amplifiers_and_Oscillators_(Steer)/02%3A_Linear_Amplifiers/2.06%3A_Amplifier_Stability
-        if mu==1:
-            p1,p2 = 0,1
-        else:
-            p1,p2 = 1,0
-        stability_factor = (1 - np.abs(self.nw.s[:,p1,p1]**2)) / (np.abs(self.nw.s[:,p2,p2]-np.conjugate(self.nw.s[:,p1,p1])*self._delta()) + np.abs(self.nw.s[:,1,0]*self.nw.s[:,0,1]))
+        stability_factor = self._get_stack().mu(mu)[0]
         return SParam(f'{self.name} µ{mu}', self.nw.f, stability_factor, self.nw.z0[0,0], original_files=self.original_files, param_type=f'µ{mu}', number_type=NumberType.PlainScalar)
     
 
+    @_memoized
     def losslessness(self):
-        s = self.nw.s
-        
-        # A network is lossless if S^T x S* = U (see e.g. Pozar, 4.3). This function returns, per frequency,
-        #   the highest element of the matrix |S^T ⋅ S * - U|, i.e. if the result is 0, the network is lossless
-
-        st = np.transpose(s, (0,2,1))
-        sc = np.conjugate(s)
-        prod = np.matmul(st, sc)
-        target = np.eye(self.nw.nports)
-        errors = np.abs(prod - target)
-        result_metric = np.max(errors, axis=(1,2))  # should be zero if lossless
+        # see NetworkStack.losslessness(); zero if the network is lossless
+        result_metric = self._get_stack().losslessness()[0]
         
         return SParam(f'{self.name} Losslessness', self.nw.f, result_metric, self.nw.z0[0,0], original_files=self.original_files, param_type=f'losslessness', number_type=NumberType.PlainScalar)
     
 
+    @_memoized
     def passivity(self):
-        s = self.nw.s
-        
-        # A network is passive if λ >= 0 for all eigenvalues λ of U - S^H ⋅ S (see <https://ibis.org/summits/nov10b/tseng.pdf> and also
-        #   <https://www.simberian.com/Presentations/Shlepnev_S_ParameterQualityMetrics_July2014_final.pdf>)
-        # This function returns, per frequency, max(0,λ) of the highest eigenvector λ, i.e. if the result is zero, the network is reciprocal.
-        s_h = np.conjugate(np.transpose(s, (0,2,1)))
-        prod = np.eye(self.nw.nports) - np.matmul(s_h, s)
-
-        result_metric = np.zeros([len(self.nw.f)], dtype=float)
-        for idx in range(len(self.nw.f)):  # for each frequency
-            prod_submat = prod[idx,:,:]
-            eigenvalues = np.real(np.linalg.eigvals(prod_submat))
-            passivity_error = np.maximum(0, -eigenvalues)
-            worst_error = np.max(passivity_error)
-            result_metric[idx] = worst_error
+        # see NetworkStack.passivity(); zero if the network is passive
+        result_metric = self._get_stack().passivity()[0]
         
         return SParam(f'{self.name} Passivity', self.nw.f, result_metric, self.nw.z0[0,0], original_files=self.original_files, param_type=f'passivity', number_type=NumberType.PlainScalar)
     
 
+    @_memoized
     def reciprocity(self):
         if self.nw.nports < 2:
             raise RuntimeError(f'Network.reciprocity(): cannot calculate reciprocity of {self.name} (only valid for 2-port or higher networks)')
-        s = self.nw.s
-        
-        # A network is reciprocal if S^T = S (see e.g. Pozar, 1.9), This function returns, per frequency,
-        #   the highest element of the matrix |S^T-S|, i.e. if the result is zero, the network is reciprocal.
-
-        st = np.transpose(s, (0,2,1))
-        diff = st - s
-        absdiff = np.abs(diff)
-        result_metric = np.max(absdiff, axis=(1,2))  # should be zero if reciprocal
+        # see NetworkStack.reciprocity(); zero if the network is reciprocal
+        result_metric = self._get_stack().reciprocity()[0]
 
         return SParam(f'{self.name} Reciprocity', self.nw.f, result_metric, self.nw.z0[0,0], original_files=self.original_files, param_type=f'reciprocity', number_type=NumberType.PlainScalar)
     
 
+    @_memoized
     def symmetry(self):
         if self.nw.nports < 2:
             raise RuntimeError(f'Network.symmetry(): cannot calculate reciprocity of {self.name} (only valid for 2-port or higher networks)')
-        s = self.nw.s
-        
-        # I define a network as symmetric if it is reciprocal, and additionally Sii=Sjj=Skk..., This function returns, per frequency,
-        #   the highest element of the matrix |S^T-S|, plus the highest difference between any diagonal elements; i.e. if the result
-        #   is zero, the network is symmetric.
+        # see NetworkStack.symmetry(); zero if the network is symmetric
+        result_metric = self._get_stack().symmetry()[0]
 
-        st = np.transpose(s, (0,2,1))
-        diff = st - s
-        absdiff = np.abs(diff)
-        result_metric_ij = np.max(absdiff, axis=(1,2))  # should be zero if reciprocal
+        return SParam(f'{self.name} Symmetry', self.nw.f, result_metric, self.nw.z0[0,0], original_files=self.original_files, param_type=f'symmetry', number_type=NumberType.PlainScalar)
+    
 
-        result_metric_ii = np.zeros([len(self.nw.f)], dtype=float)
-        for i in range(self.nw.nports):
-            for j in range(self.nw.nports):
-                result_metric_ii = np.maximum(result_metric_ii, np.abs(s[:,i,i]-s[:,j,j]))
+    def _get_causality(self) -> tuple[np.ndarray,np.ndarray]:
+        # see TDR.get_causality(); zero if the network is causal; the window suppresses the ringing that is caused by the
+        #   limited bandwidth, which would otherwise look like a violation of causality
+        tdr = TDR()
+        tdr.window = 'hann'
+        return tdr.get_causality(self.nw.f, self.nw.s)
 
-        result_metric = result_metric_ij + result_metric_ii
 
-        return SParam(f'{self.name} Symmetry', self.nw.f, result_metric, self.nw.z0[0,0], original_files=self.original_files, param_type=f'symmetry', number_type=NumberType.PlainScalar)
+    @_memoized
+    def causality(self):
+        f, result_metric = self._get_causality()
+        return SParam(f'{self.name} Causality', f, result_metric, self.nw.z0[0,0], original_files=self.original_files, param_type=f'causality', number_type=NumberType.PlainScalar)
     
 
+    def quality_summary(self) -> dict[str,float]:
+        """
+        The worst case over frequency of each metric in QUALITY_SUMMARY_METRICS; NaN if a metric cannot be calculated
+        (e.g. the reciprocity of a 1-port)
+        """
+        summary = {metric: math.nan for metric in Network.QUALITY_SUMMARY_METRICS}
+        for metric, values in self._get_stack().quality_metrics().items():
+            if metric in summary:
+                summary[metric] = float(np.max(values[0]))
+        try:
+            summary['causality'] = float(np.max(self._get_causality()[1]))
+        except Exception as ex:
+            logging.debug(f'Unable to check causality of {self.name} ({ex})')
+        return summary
+    
+
+    @_memoized
     def half(self, method: str = 'IEEE370NZC', side: int = 1) -> "Network":
         if method=='IEEE370NZC':
             from skrf.calibration.deembedding import IEEEP370_SE_NZC_2xThru # don't import on top of file, as some older versions of the package don't provide this yet
@@ -721,11 +830,13 @@ class Network:
             raise ValueError(f'half(): Invalid method, must be <IEEE370NZC> or <ChopInHalf>')
     
 
+    @_memoized
     def flip(self) -> "Network":
         nwf = self.nw.flipped()
         return Network(NetworkExt(name=self.name, f=nwf.f, s=nwf.s, f_unit='Hz', z0=nwf.z0), name='~'+self.name, original_files=self.original_files)
     
 
+    @_memoized
     def invert(self) -> "Network":
         return Network(self.nw.inv, name='!'+self.name, original_files=self.original_files)
 
@@ -794,6 +905,7 @@ class Network:
             SParams(self.s(e,i)).plot()
     
     
+    @_memoized
     def def_ports(self, ports: list[str]|str) -> "Network":
         new_nw = self.nw.copy()
         
@@ -804,6 +916,7 @@ class Network:
         return Network(new_nw, original_files=self.original_files)
     
 
+    @_memoized
     def s2m(self, ports: list[str]|str = None) -> "Network":
         """
         Convert a single-ended network into a mixed-mode network.
@@ -827,6 +940,7 @@ class Network:
         return Network(nw_new_mix, original_files=self.original_files)
     
 
+    @_memoized
     def m2s(self, ports: list[str]|str) -> "Network":
         """
         Convert a mixed-mode network into a single-ended network.
@@ -850,12 +964,14 @@ class Network:
         return Network(nw_new_se, original_files=self.original_files)
 
 
+    @_memoized
     def renorm(self, z: "complex|list[complex]") -> "Network":
         nw = self.nw.copy()
         nw.renormalize(z)
         return Network(nw, original_files=self.original_files)
 
 
+    @_memoized
     def rewire(self, ports: list[int]) -> "Network":
         nw = self.nw.copy()
         if len(ports) != nw.nports:
@@ -897,6 +1013,41 @@ class Network:
 
 
 
+class PostponedNetwork(Network):
+    """
+    An operation on a network that cannot be calculated yet (e.g. a component, which gets its frequencies and reference
+    impedance from the network it is combined with).
+
+    The node only references its input and the operation, so chaining operations does not copy anything. The whole chain
+    is evaluated when _calculate() is called, and the result is kept for as long as the same frequencies and reference
+    impedance are requested (e.g. when a component is broadcast onto many networks that share a frequency grid).
+    """
+
+
+    def __init__(self, input: Network, method: Callable, args: tuple, kwargs: dict):
+        super().__init__(None)
+        self._input, self._method, self._args, self._kwargs = input, method, args, kwargs
+        self._calculated_for: tuple|None = None
+
+
+    def _calculate(self, f: np.ndarray, z0: float):
+        context = (GridAlignment.fingerprint(f) if f is not None else None, z0)
+        if self._ready() and context == self._calculated_for:
+            return
+        for nw in [self._input, *self._args, *self._kwargs.values()]:
+            if isinstance(nw, Network):
+                nw._calculate(f, z0)
+        result = self._method(self._input, *self._args, **self._kwargs)
+        self._nw, self._name, self.original_files = result._nw, result._name, set(result.original_files)
+        self._calculated_for = context
+
+
+    def _interpolate(self, f: np.ndarray) -> Network:
+        self._calculate(f, 50)
+        return Network(self._nw, name=self._name, original_files=set(self.original_files))
+
+
+
 class Networks:
 
     
@@ -912,6 +1063,41 @@ class Networks:
 
     _setup_complete: bool = False
 
+    MIN_NETWORKS_FOR_BATCHING = 4
+    MAX_METRICS_STACK_BYTES = 256*1024*1024  # metrics are calculated for chunks of networks, to limit the size of intermediate products
+    MIN_FILES_FOR_QUALITY_REPORT_PROCESSES = 8
+
+    # operations that can be applied to all networks at once (see NetworkStack); for each operation, a function that calculates
+    #   the stacked result (plus the reference impedance), and a function that returns the name of an individual result
+    _BATCHED_UNARY_OPS: "dict[Callable,tuple[Callable,Callable]]" = {
+        Network.invert: (lambda stack: (stack.invert(), stack.z0), lambda nw: '!'+nw._name),
+        Network.flip: (lambda stack: stack.flip(), lambda nw: '~'+nw._name),
+        Network.renorm: (lambda stack, z: (stack.renormalize(z), z), lambda nw, z: nw._nw.name),
+    }
+    # same for metrics; a function that calculates the stacked result, a function that returns the parameter type, and the
+    #   label of the result (None if it is the same as the parameter type)
+    _BATCHED_METRICS: "dict[Callable,tuple[Callable,Callable,NumberType,str|None]]" = {
+        Network.k: (lambda stack: stack.stability_factor(), lambda: 'k', NumberType.PlainScalar, None),
+        Network.delta: (lambda stack: stack.determinant_magnitude(), lambda: 'Δ', NumberType.PlainScalar, None),
+        Network.b1: (lambda stack: stack.b1(), lambda: 'B1', NumberType.PlainScalar, None),
+        Network.mu: (lambda stack, mu=1: stack.mu(mu), lambda mu=1: f'µ{mu}', NumberType.PlainScalar, None),
+        Network.mag: (lambda stack: stack.max_gain(), lambda: 'MAG', NumberType.MagnitudeLike, None),
+        Network.msg: (lambda stack: stack.max_stable_gain(), lambda: 'MSG', NumberType.MagnitudeLike, None),
+        Network.u: (lambda stack: stack.unilateral_gain(), lambda: 'U', NumberType.MagnitudeLike, None),
+        Network.passivity: (lambda stack: stack.passivity(), lambda: 'passivity', NumberType.PlainScalar, 'Passivity'),
+        Network.losslessness: (lambda stack: stack.losslessness(), lambda: 'losslessness', NumberType.PlainScalar, 'Losslessness'),
+        Network.reciprocity: (lambda stack: stack.reciprocity(), lambda: 'reciprocity', NumberType.PlainScalar, 'Reciprocity'),
+        Network.symmetry: (lambda stack: stack.symmetry(), lambda: 'symmetry', NumberType.PlainScalar, 'Symmetry'),
+    }
+    _BATCHED_BINARY_OPS: "dict[Callable,tuple[Callable,str]]" = {
+        Network.__add__: (np.add, '+'),
+        Network.__sub__: (np.subtract, '-'),
+        Network.__mul__: (np.multiply, '*'),
+        Network.__truediv__: (np.divide, '/'),
+        Network.__matmul__: (np.matmul, '@'),
+        Network.__pow__: (lambda stack, other_stack: stack.cascade(other_stack), '∘'),
+    }
+
 
     @staticmethod
     def setup(default_actions: list[DefaultAction] = [], slicer_fn: "Callable[[bool,list[str]], tuple[int,str]r]" = None):
@@ -955,7 +1141,7 @@ class Networks:
         if isinstance(a, (int,float,complex,np.ndarray)):
             return [a]*len(b.nws), b.nws
         if isinstance(b, (int,float,complex,np.ndarray)):
-            return a.nws, [a]*len(a.nws)
+            return a.nws, [b]*len(a.nws)
         
         assert isinstance(a,Networks) and isinstance(b,Networks), f'Unexpected objects for broadcasting: <{type(a)}> and <{type(b)}> (expected both to be Networks)'
         
@@ -969,7 +1155,96 @@ class Networks:
         raise ValueError(f'Cannot broadcast Networks of size {len(a.nws)} and {len(b.nws)}')
 
 
+    @staticmethod
+    def _batched_op(fn, nws: "list[Network]", others: "list|None", *args, **kwargs) -> "list|None":
+        """
+        Applies <fn> to all networks with a single vectorized calculation (see NetworkStack). Returns None if that is not
+        possible (e.g. because the networks have different frequency grids), so that the caller falls back to applying <fn>
+        to one network at a time.
+        """
+
+        if len(nws) < Networks.MIN_NETWORKS_FOR_BATCHING:
+            return None
+        if others is None and fn not in Networks._BATCHED_UNARY_OPS and fn not in Networks._BATCHED_METRICS:
+            return None
+        if others is not None and fn not in Networks._BATCHED_BINARY_OPS:
+            return None
+        
+        other_nws = [other for other in others if isinstance(other, Network)] if others is not None else []
+        if len(other_nws) not in [0, len(nws)]:
+            return None
+        if len(other_nws) == 0 and others is not None and not all([other is others[0] for other in others]):
+            return None
+        if fn is Network.__pow__ and (len(other_nws) == 0 or nws[0]._nw.nports != 2):
+            return None
+        if not all([type(nw) is Network and nw._ready() for nw in [*nws, *other_nws]]):
+            return None  # e.g. components, which are calculated with respect to the other operand
+        if not NetworkStack.can_stack([nw._nw for nw in [*nws, *other_nws]]):
+            return None
+        if fn is Network.__pow__ and not NetworkStack.have_uniform_z0([nws[0]._nw, other_nws[0]._nw]):
+            return None  # skrf renormalizes the connected ports, which the closed-form cascade does not
+        
+        keys = [Network._get_operation_key(fn, nw, args if others is None else (others[i], *args), kwargs) for i,nw in enumerate(nws)]
+        if all([key is not None and OperationCache.contains(key) for key in keys]):
+            return None  # cheaper to take the results from the cache, one by one
+        
+        def get_item(stacked: np.ndarray, i: int) -> np.ndarray:
+            return stacked[i if stacked.shape[0] > 1 else 0]  # a stack of identical networks is only stored once
+        
+        try:
+            results = []
+            
+            if fn in Networks._BATCHED_METRICS:
+                calculate, get_param_type, number_type, label = Networks._BATCHED_METRICS[fn]
+                param_type = get_param_type(*args, **kwargs)
+                label = label or param_type
+                # the results are much smaller than the S-matrices, so networks can be processed in chunks, without having to
+                #   hold the intermediate products (e.g. Sᴴ⋅S) of all networks in memory at once
+                chunk_size = max(1, Networks.MAX_METRICS_STACK_BYTES // max(1, nws[0]._nw.s.nbytes))
+                for i_start in range(0, len(nws), chunk_size):
+                    chunk = nws[i_start:i_start+chunk_size]
+                    values = calculate(NetworkStack([nw._nw for nw in chunk]), *args, **kwargs)
+                    for i,nw in enumerate(chunk):
+                        results.append(SParam(f'{nw._name} {label}', nw._nw.f, get_item(values, i), nw._nw.z0[0,0], param_type=param_type, number_type=number_type))
+            
+            else:
+                stack = NetworkStack([nw._nw for nw in nws])
+                if fn in Networks._BATCHED_UNARY_OPS:
+                    calculate, get_name = Networks._BATCHED_UNARY_OPS[fn]
+                    s, z0 = calculate(stack, *args, **kwargs)
+                    names = [get_name(nw, *args, **kwargs) for nw in nws]
+                else:
+                    operation, operator_str = Networks._BATCHED_BINARY_OPS[fn]
+                    if len(other_nws) > 0:
+                        other_stack = NetworkStack([nw._nw for nw in other_nws])
+                        s = operation(stack, other_stack) if fn is Network.__pow__ else operation(stack.s, other_stack.s)
+                        names = [f'{nw._name}{operator_str}{other._name}' for nw,other in zip(nws, other_nws)]
+                    else:
+                        s = operation(stack.s, others[0])
+                        names = [f'{nw._name}{operator_str}{others[0]}' for nw in nws]
+                    z0 = stack.z0
+                
+                for i,(nw,name) in enumerate(zip(nws, names)):
+                    result_nw = NetworkExt(s=get_item(s, i), f=nw._nw.f, f_unit='Hz', z0=z0, comments=nw._nw.comments, name=nw._nw.name)
+                    result_nw._ports = nw._nw.ports
+                    results.append(Network(result_nw, name=name))
+        
+        except Exception as ex:
+            logging.debug(f'Unable to apply <{fn.__name__}> to stacked networks ({ex}), applying it to each network instead')
+            return None
+        
+        for i,result in enumerate(results):
+            result.original_files = nws[i].original_files | (other_nws[i].original_files if len(other_nws) > 0 else set())
+            if keys[i] is not None:
+                Network._put_in_cache(keys[i], result)
+        return results
+
+
     def _unary_op(self, fn, return_type, *args, **kwargs):
+        result = Networks._batched_op(fn, self.nws, None, *args, **kwargs)
+        if result is not None:
+            return Networks._wrap_result(result, return_type)
+        
         result = []
         for nw in self.nws:
             try:
@@ -980,17 +1255,17 @@ class Networks:
                     result.append(r)
             except Exception as ex:
                 logging.warning(f'Method <{format_call_signature(fn,*args,**kwargs)})> on {nw} failed ({ex}), ignoring')
-        if return_type == Networks:
-            return Networks(nws=result)
-        elif return_type == SParams:
-            return SParams(sps=result)
-        else:
-            return result
+        return Networks._wrap_result(result, return_type)
 
 
     def _binary_op(self, fn, others, return_type, *args, **kwargs):
+        nws, others = Networks._broadcast(self, others)
+        result = Networks._batched_op(fn, nws, others, *args, **kwargs)
+        if result is not None:
+            return Networks._wrap_result(result, return_type)
+        
         result = []
-        for nw,other in zip(*Networks._broadcast(self, others)):
+        for nw,other in zip(nws, others):
             try:
                 r = fn(nw, other, *args, **kwargs)
                 if hasattr(r, '__len__'):
@@ -999,6 +1274,11 @@ class Networks:
                     result.append(r)
             except Exception as ex:
                 logging.warning(f'Method <{format_call_signature(fn,args,kwargs)}> on {nw} failed ({ex}), ignoring')
+        return Networks._wrap_result(result, return_type)
+
+
+    @staticmethod
+    def _wrap_result(result: list, return_type):
         if return_type == Networks:
             return Networks(nws=result)
         elif return_type == SParams:
@@ -1028,7 +1308,7 @@ class Networks:
 
 
     def __invert__(self) -> "Networks":
-        return self._unary_op(Network.__invert__, Networks)
+        return self._unary_op(Network.invert, Networks)
 
 
     def __pow__(self, other: "Networks") -> "Networks":
@@ -1217,6 +1497,66 @@ class Networks:
         return self._unary_op(Network.symmetry, SParams)
     
 
+    def causality(self):
+        return self._unary_op(Network.causality, SParams)
+
+
+    @staticmethod
+    def quality_report(files: "list[SParamFile]", progress_fn: "Callable[[int,int],bool]|None" = None, max_processes: int|None = None) -> "list[tuple[dict[str,float]|None,str|None]]":
+        """
+        Calculates Network.quality_summary() of each file, and returns (summary, error message) for each file.
+
+        Large sets of files are processed in a pool of worker processes; each process loads the files by itself, so that
+        only the summaries are transferred. <progress_fn> is called periodically with the number of processed files and
+        the total number of files; if it returns False, the remaining files are skipped (with a result of (None, None)).
+        """
+
+        results: list[tuple[dict[str,float]|None,str|None]] = [(None, None)] * len(files)
+        if max_processes is None:
+            max_processes = os.cpu_count() or 1
+        
+        if len(files) < Networks.MIN_FILES_FOR_QUALITY_REPORT_PROCESSES or max_processes <= 1:
+            for i,file in enumerate(files):
+                if progress_fn and not progress_fn(i, len(files)):
+                    break
+                try:
+                    results[i] = (Network(file).quality_summary(), None)
+                except Exception as ex:
+                    results[i] = (None, file.error_message if file.error else str(ex))
+            return results
+
+        # batches, so that each process gets several of them, but the overhead per task stays low
+        batch_size = max(1, math.ceil(len(files) / (max_processes*4)))
+        # spawn instead of fork, because forking a process that already runs threads (e.g. Qt) is unsafe
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_processes, mp_context=multiprocessing.get_context('spawn'),
+                initializer=NetworkCache.init_worker, initargs=(NetworkCache.get_worker_config(),)) as executor:
+            futures: dict[concurrent.futures.Future,range] = {}
+            for i_start in range(0, len(files), batch_size):
+                indices = range(i_start, min(i_start+batch_size, len(files)))
+                paths = [(str(files[i].path), files[i].path.arch_path) for i in indices]
+                futures[executor.submit(_get_quality_summaries, paths)] = indices
+            
+            pending, n_done = set(futures.keys()), 0
+            while len(pending) > 0:
+                done, pending = concurrent.futures.wait(pending, timeout=0.1, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    indices = futures[future]
+                    try:
+                        for i,result in zip(indices, future.result()):
+                            results[i] = result
+                    except Exception as ex:
+                        for i in indices:
+                            results[i] = (None, str(ex))
+                    n_done += len(indices)
+                if len(done) > 0 and Settings.network_cache:
+                    NetworkCache.enforce_limit()  # the worker processes do not do that by themselves
+                if progress_fn and not progress_fn(n_done, len(files)):
+                    # do not wait for the running batches; leaving the with-block does not wait after this either
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    break
+        return results
+    
+
     def half(self, method: str = 'IEEE370NZC', side: int = 1) -> "Networks":
         return self._unary_op(Network.half, Networks, method=method, side=side)
 
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import collections
+import logging
+from typing import Any
+
+
+
+class OperationCache:
+    """
+    Bounded LRU cache for the results of operations on networks (e.g. `nw.invert()` or `nw1 ** nw2`).
+
+    The cache is kept between evaluations of the expressions, so that unchanged sub-expressions do not have to be
+    re-calculated on every plot update. Keys must uniquely describe how a result was derived, i.e. the operation, its
+    arguments, and the identity of the source files.
+    """
+
+
+    max_entries: int = 256
+    max_size_bytes: int = 512 * 1024 * 1024
+
+    _entries: collections.OrderedDict[tuple,tuple[Any,int]] = collections.OrderedDict()  # key -> (result, size)
+    _size_bytes: int = 0
+    hits: int = 0
+    misses: int = 0
+
+
+    @staticmethod
+    def get(key: tuple) -> Any|None:
+        entry = OperationCache._entries.get(key)
+        if entry is None:
+            OperationCache.misses += 1
+            return None
+        OperationCache._entries.move_to_end(key)
+        OperationCache.hits += 1
+        return entry[0]
+
+
+    @staticmethod
+    def contains(key: tuple) -> bool:
+        """Like get(), but without marking the entry as used, and without counting a hit or a miss"""
+        return key in OperationCache._entries
+
+
+    @staticmethod
+    def put(key: tuple, result: Any, size_bytes: int):
+        if size_bytes > OperationCache.max_size_bytes:
+            return
+        if key in OperationCache._entries:
+            OperationCache._size_bytes -= OperationCache._entries.pop(key)[1]
+        OperationCache._entries[key] = (result, size_bytes)
+        OperationCache._size_bytes += size_bytes
+        
+        while len(OperationCache._entries) > OperationCache.max_entries or OperationCache._size_bytes > OperationCache.max_size_bytes:
+            _, (_, evicted_size) = OperationCache._entries.popitem(last=False)
+            OperationCache._size_bytes -= evicted_size
+
+
+    @staticmethod
+    def clear():
+        OperationCache._entries.clear()
+        OperationCache._size_bytes = 0
+        OperationCache.hits, OperationCache.misses = 0, 0
+        logging.debug('Cleared cache for expressions')
+
+
+    @staticmethod
+    def count() -> int:
+        return len(OperationCache._entries)
@@ -1,25 +1,28 @@
 from __future__ import annotations
 
 from ..sparam_file import SParamFile, PathExt
-from ..bodefano import BodeFano
+from ..bodefano import BodeFano, BodeFanoIntegrator
 from ..circles import StabilityCircle
 from ..utils import sanitize_filename, db2v, v2db
 from ..citi import CitiWriter
 from ..settings import Settings
 from ..file_config import FileConfig
 from ..sparam_helpers import interpolate_equidistant_freq, extrapolate_to_dc, ensure_equidistant_to_dc
+from ..grid_alignment import GridAlignment, InterpolationPlan
+from ..running_stats import RunningStats
 from ..network_ext import NetworkExt
 from .helpers import format_call_signature
 
 import skrf, math, os
 import numpy as np
 import fnmatch
+import itertools
 import logging
 import scipy.signal, scipy.stats
 import os
 import re
 import enum
-from typing import Callable, Any
+from typing import Callable, Iterator, Any
 from types import EllipsisType
 
 
@@ -76,6 +79,11 @@ class SParam:
         )
     
 
+    def _interpolate_polar(self) -> bool:
+        """Complex S-parameters are interpolated by magnitude and phase; anything else (e.g. dB values) linearly"""
+        return self.number_type == NumberType.VectorLike and np.iscomplexobj(self.s)
+
+
     @staticmethod
     def _adapt(*sparams: SParam) -> "tuple[np.ndarray,list[np.ndarray]]":
         if len(sparams) < 1:
@@ -104,13 +112,9 @@ class SParam:
                 logging.debug(f'The selected networks do not have any overlapping frequency range, returning empty objects')
             return np.array([]), [np.array([]) for _ in range(len(sparams))]
 
-        f_all = np.unique(np.concatenate([sparam.f for sparam in sparams]))
-        f_new = np.array([f for f in f_all if f_min<=f<=f_max])
-
-        freq_new = skrf.Frequency.from_f(f_new, unit='Hz')
-        nws_new = [NetworkExt(f=sparam.f, s=sparam.s, f_unit='Hz').interpolate(freq_new) for sparam in sparams]
-        s_new = [np.array(np.ndarray.flatten(nw.s)) for nw in nws_new]
-        return freq_new.f, s_new
+        f_new = GridAlignment.overlap(*[sparam.f for sparam in sparams])
+        s_new = [GridAlignment.get_plan(sparam.f, f_new).apply(np.ndarray.flatten(sparam.s), polar=sparam._interpolate_polar()) for sparam in sparams]
+        return f_new, s_new
     
 
     @staticmethod
@@ -254,16 +258,20 @@ class SParam:
         if f_integrate_end is ...:
             f_integrate_end = +1e99
         
+        integrator = BodeFanoIntegrator(self.f, self.s)
+        
         if f_target_start is ... or f_target_end is ...:
             
-            bodefano = BodeFano(self.f, self.s, f_integrate_start, f_integrate_end, f_integrate_start, f_integrate_end)
+            intrange = integrator.get_range(f_integrate_start, f_integrate_end)
+            if intrange.stop <= intrange.start:
+                raise ValueError('The integration range does not contain any frequency')
 
             if f_target_start is ...:
-                f_target_start = bodefano.f_integration_actual_start_hz
+                f_target_start = float(integrator.f[intrange.start])
             if f_target_end is ...:
-                f_target_end = bodefano.f_integration_actual_stop_hz
+                f_target_end = float(integrator.f[intrange.stop-1])
         
-        bodefano = BodeFano(self.f, self.s, f_integrate_start, f_integrate_end, f_target_start, f_target_end)
+        bodefano = BodeFano(None, None, f_integrate_start, f_integrate_end, f_target_start, f_target_end, integrator=integrator)
         s11_linear = pow(10, bodefano.db_achievable/20)
 
         f = np.array([f_target_start, f_target_end])
@@ -495,16 +503,28 @@ class SParams:
     def _interpolate(self, f: np.ndarray):
         if len(self.sps) < 1:
             return SParams(sps=[])
-        result = []
-        for sp in self.sps:
+        
+        # parameters that share the same frequency grid (e.g. from the same network) are interpolated in one go
+        groups: dict[tuple,list[int]] = {}
+        for i,sp in enumerate(self.sps):
+            groups.setdefault((GridAlignment.fingerprint(sp.f), sp.s.shape, sp._interpolate_polar()), []).append(i)
+        
+        result: list[SParam|None] = [None] * len(self.sps)
+        for (_, _, polar), indices in groups.items():
+            sps = [self.sps[i] for i in indices]
             try:
-                mag, pha = np.abs(sp.s), np.unwrap(np.angle(sp.s))
-                mag_int, pha_int = np.interp(f, sp.f, mag), np.interp(f, sp.f, pha)
-                s_int = mag_int * np.exp(1j*pha_int)
-                result.append(sp._modified_copy(f=f, s=s_int))
+                plan = GridAlignment.get_plan(sps[0].f, f)
+                if plan.is_identity:
+                    for i,sp in zip(indices, sps):
+                        result[i] = sp._modified_copy(f=f)
+                    continue
+                s_int = plan.apply(np.stack([sp.s for sp in sps], axis=-1), polar=polar)
+                for j,(i,sp) in enumerate(zip(indices, sps)):
+                    result[i] = sp._modified_copy(f=f, s=s_int[...,j])
             except Exception as ex:
-                logging.warning(f'Interpolating <{sp.name}> failed ({ex}), ignoring')
-        return SParams(sps=result)
+                for sp in sps:
+                    logging.warning(f'Interpolating <{sp.name}> failed ({ex}), ignoring')
+        return SParams(sps=[sp for sp in result if sp is not None])
 
 
     def interpolate_lin(self, f_start: float|None = None, f_end: float|None = None, n: int|None = None) -> SParams:
@@ -555,26 +575,103 @@ class SParams:
         return f_start, f_end, n
 
 
-    def _interpolated_fn(self, name, fn, min_size=1, type_str: str='.interp', enforce_real: bool=False, number_type: NumberType = None):
-        sps = self.interpolate().sps
-        assert min_size >= 1
-        if len(sps) < min_size:
-            return SParams(sps=[])
-        f = sps[0].f
-        if number_type is None:
-            number_type = sps[0].number_type
+    def _get_grid_groups(self) -> "tuple[np.ndarray,dict[tuple,list[int]]]":
+        """
+        Returns the common frequency grid for the statistics functions, plus the indices of the parameters grouped by
+        their frequency grid and by how they are interpolated. If all parameters already share a grid, that grid is used.
+        """
+        groups: dict[tuple,list[int]] = {}
+        for i,sp in enumerate(self.sps):
+            groups.setdefault((GridAlignment.fingerprint(sp.f), sp._interpolate_polar()), []).append(i)
+        if len(set([fingerprint for fingerprint,_ in groups.keys()])) == 1:
+            return self.sps[0].f, groups
+        f_start, f_end, n = self._fill_interpolation_params()
+        return np.linspace(f_start, f_end, n), groups
+
+
+    def _stack_on_grid(self, f: np.ndarray, groups: "dict[tuple,list[int]]", enforce_real: bool) -> np.ndarray:
+        """Returns the data of all parameters on the given grid, as one array of shape (n_parameters, n_frequencies)"""
+        plans: list[tuple[list[int],InterpolationPlan,bool]] = []
+        failed: list[int] = []
+        for (_, polar), indices in groups.items():
+            try:
+                plans.append((indices, GridAlignment.get_plan(self.sps[indices[0]].f, f), polar))
+            except Exception as ex:
+                for i in indices:
+                    logging.warning(f'Interpolating <{self.sps[i].name}> failed ({ex}), ignoring')
+                failed.extend(indices)
         
-        s_input = []
+        is_complex = any([np.iscomplexobj(self.sps[i].s) or (polar and not plan.is_identity) for indices,plan,polar in plans for i in indices])
+        s_all = np.empty([len(self.sps), len(f)], dtype=float if enforce_real or not is_complex else complex)
         list_of_abs = []
-        for sp in sps:
-            if enforce_real and np.iscomplexobj(sp.s):
-                s_input.append(np.abs(sp.s).astype(float))
-                list_of_abs.append(sp.name)
+        for indices,plan,polar in plans:
+            if plan.is_identity:
+                s_group = [np.ravel(self.sps[i].s) for i in indices]
             else:
-                s_input.append(sp.s)
+                s_group = plan.apply(np.stack([np.ravel(self.sps[i].s) for i in indices], axis=-1), polar=polar).T
+            for i,s_sp in zip(indices, s_group):
+                if enforce_real and np.iscomplexobj(s_sp):
+                    np.abs(s_sp, out=s_all[i])
+                    list_of_abs.append(self.sps[i].name)
+                else:
+                    s_all[i] = s_sp
         if list_of_abs and Settings.verbose:
             logging.debug(f'Took absolute of S-parameters {list_of_abs}')
-        s = fn([s for s in s_input])
+        
+        if len(failed) > 0:
+            return np.delete(s_all, failed, axis=0)
+        return s_all
+
+
+    def _iter_on_grid(self, f: np.ndarray, groups: "dict[tuple,list[int]]", enforce_real: bool) -> "Iterator[np.ndarray]":
+        """Yields the data of each parameter on the given grid, one at a time"""
+        plans: dict[int,InterpolationPlan|Exception] = {}
+        for indices in groups.values():
+            try:
+                plan = GridAlignment.get_plan(self.sps[indices[0]].f, f)
+            except Exception as ex:
+                plan = ex
+            plans.update({i: plan for i in indices})
+        
+        list_of_abs = []
+        for i,sp in enumerate(self.sps):
+            plan = plans[i]
+            if isinstance(plan, Exception):
+                logging.warning(f'Interpolating <{sp.name}> failed ({plan}), ignoring')
+                continue
+            s = np.ravel(sp.s) if plan.is_identity else plan.apply(np.ravel(sp.s), polar=sp._interpolate_polar())
+            if enforce_real and np.iscomplexobj(s):
+                s = np.abs(s)
+                list_of_abs.append(sp.name)
+            yield s
+        if list_of_abs and Settings.verbose:
+            logging.debug(f'Took absolute of S-parameters {list_of_abs}')
+
+
+    def _interpolated_fn(self, name, fn, min_size=1, type_str: str='.interp', enforce_real: bool=False, number_type: NumberType = None, streaming: bool = False):
+        """
+        Calculates a statistic over all parameters, after bringing them onto a common frequency grid. If <streaming> is False,
+        <fn> gets all parameters as one array of shape (n_parameters, n_frequencies); otherwise, <fn> gets an iterator over
+        the parameters, so that only one of them has to be held on the common grid at a time.
+        """
+        assert min_size >= 1
+        if len(self.sps) < min_size:
+            return SParams(sps=[])
+        f, groups = self._get_grid_groups()
+        if number_type is None:
+            number_type = self.sps[0].number_type
+        
+        if streaming:
+            s_iter = self._iter_on_grid(f, groups, enforce_real)
+            s_first = list(itertools.islice(s_iter, min_size))  # parameters that fail to interpolate are skipped
+            if len(s_first) < min_size:
+                return SParams(sps=[])
+            s = fn(itertools.chain(s_first, s_iter))
+        else:
+            s_all = self._stack_on_grid(f, groups, enforce_real)
+            if len(s_all) < min_size:
+                return SParams(sps=[])
+            s = fn(s_all)
         return SParams(sps=[SParam(name, f, s, math.nan, param_type=type_str, number_type=number_type)])
 
 
@@ -582,12 +679,30 @@ class SParams:
     def _wrap_calc_in_db(fn):
         return lambda x: db2v(fn(v2db(x)))
     
+
+    @staticmethod
+    def _wrap_streaming_calc_in_db(fn):
+        return lambda xs: db2v(fn(v2db(x) for x in xs))
+    
+
+    @staticmethod
+    def _running_stats(xs, min_size: int = 1) -> RunningStats:
+        stats = RunningStats().add_all(xs)
+        if stats.count < min_size:
+            raise ValueError(f'Expected at least {min_size} parameter(s), got {stats.count}')
+        return stats
+    
     
-    def mean(self, in_db = True):
-        def _mean(s):
-            return np.mean(s,axis=0)
-        fn = SParams._wrap_calc_in_db(_mean) if in_db else _mean
-        return self._interpolated_fn('Mean', fn, type_str='.mean', number_type=NumberType.MagnitudeLike if in_db else NumberType.VectorLike)
+    def mean(self, in_db = True, streaming = False):
+        if streaming:
+            def _mean(xs):
+                return SParams._running_stats(xs).mean
+        else:
+            def _mean(s):
+                return np.mean(s,axis=0)
+        wrap = SParams._wrap_streaming_calc_in_db if streaming else SParams._wrap_calc_in_db
+        fn = wrap(_mean) if in_db else _mean
+        return self._interpolated_fn('Mean', fn, type_str='.mean', number_type=NumberType.MagnitudeLike if in_db else NumberType.VectorLike, streaming=streaming)
 
 
     def median(self, in_db = True):
@@ -597,11 +712,16 @@ class SParams:
         return self._interpolated_fn('Median', fn, type_str='.median', number_type=NumberType.MagnitudeLike if in_db else NumberType.VectorLike)
 
 
-    def sdev(self, ddof=1, in_db = True):
-        def _sdev(s):
-            return np.std(s,axis=0,ddof=ddof)
-        fn = SParams._wrap_calc_in_db(_sdev) if in_db else _sdev
-        return self._interpolated_fn('StdDev', fn, min_size=2, type_str='.sdev', number_type=NumberType.MagnitudeLike if in_db else NumberType.VectorLike)
+    def sdev(self, ddof=1, in_db = True, streaming = False):
+        if streaming:
+            def _sdev(xs):
+                return SParams._running_stats(xs, min_size=2).sdev(ddof)
+        else:
+            def _sdev(s):
+                return np.std(s,axis=0,ddof=ddof)
+        wrap = SParams._wrap_streaming_calc_in_db if streaming else SParams._wrap_calc_in_db
+        fn = wrap(_sdev) if in_db else _sdev
+        return self._interpolated_fn('StdDev', fn, min_size=2, type_str='.sdev', number_type=NumberType.MagnitudeLike if in_db else NumberType.VectorLike, streaming=streaming)
 
 
     def rsdev(self, quantiles=50, in_db = True):
@@ -621,24 +741,39 @@ class SParams:
         return self._interpolated_fn('RStdDev', fn, min_size=2, type_str='.rsdev', enforce_real=True, number_type=NumberType.MagnitudeLike)
 
 
-    def min(self, in_db = True):
-        def _min(s):
-            return np.min(s,axis=0)
-        fn = SParams._wrap_calc_in_db(_min) if in_db else _min
-        return self._interpolated_fn('Min', fn, min_size=1, type_str='.min', enforce_real=True, number_type=NumberType.MagnitudeLike if in_db else NumberType.VectorLike)
-
+    def min(self, in_db = True, streaming = False):
+        if streaming:
+            def _min(xs):
+                return SParams._running_stats(xs).min
+        else:
+            def _min(s):
+                return np.min(s,axis=0)
+        wrap = SParams._wrap_streaming_calc_in_db if streaming else SParams._wrap_calc_in_db
+        fn = wrap(_min) if in_db else _min
+        return self._interpolated_fn('Min', fn, min_size=1, type_str='.min', enforce_real=True, number_type=NumberType.MagnitudeLike if in_db else NumberType.VectorLike, streaming=streaming)
 
-    def max(self, in_db = True):
-        def _max(s):
-            return np.max(s,axis=0)
-        fn = SParams._wrap_calc_in_db(_max) if in_db else _max
-        return self._interpolated_fn('Max', fn, min_size=1, type_str='.max', enforce_real=True, number_type=NumberType.MagnitudeLike if in_db else NumberType.VectorLike)
 
-    def pkpk(self, in_db = True):
-        def _pkpk(s):
-            return np.max(s,axis=0) - np.min(s,axis=0)
-        fn = SParams._wrap_calc_in_db(_pkpk) if in_db else _pkpk
-        return self._interpolated_fn('PkPk', fn, min_size=1, type_str='.pkpk', enforce_real=True, number_type=NumberType.MagnitudeLike if in_db else NumberType.VectorLike)
+    def max(self, in_db = True, streaming = False):
+        if streaming:
+            def _max(xs):
+                return SParams._running_stats(xs).max
+        else:
+            def _max(s):
+                return np.max(s,axis=0)
+        wrap = SParams._wrap_streaming_calc_in_db if streaming else SParams._wrap_calc_in_db
+        fn = wrap(_max) if in_db else _max
+        return self._interpolated_fn('Max', fn, min_size=1, type_str='.max', enforce_real=True, number_type=NumberType.MagnitudeLike if in_db else NumberType.VectorLike, streaming=streaming)
+
+    def pkpk(self, in_db = True, streaming = False):
+        if streaming:
+            def _pkpk(xs):
+                return SParams._running_stats(xs).pkpk
+        else:
+            def _pkpk(s):
+                return np.max(s,axis=0) - np.min(s,axis=0)
+        wrap = SParams._wrap_streaming_calc_in_db if streaming else SParams._wrap_calc_in_db
+        fn = wrap(_pkpk) if in_db else _pkpk
+        return self._interpolated_fn('PkPk', fn, min_size=1, type_str='.pkpk', enforce_real=True, number_type=NumberType.MagnitudeLike if in_db else NumberType.VectorLike, streaming=streaming)
     
 
     def rl_avg(self, f_integrate_start: "float|EllipsisType" = ..., f_integrate_end: "float|EllipsisType" = ..., f_target_start: "float|EllipsisType" = ..., f_target_end: "float|EllipsisType" = ...) -> "SParams":
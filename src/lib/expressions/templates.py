@@ -132,6 +132,11 @@ def get_expression_templates() -> list[ExpressionTemplate|ExpressionTemplateGrou
                     ['sel_nws().losslessness().plot()  # should be 0 for lossless network'],
                     PlotType.Cartesian, YQuantity.Magnitude
                 ),
+                ExpressionTemplate(
+                    'Causality',
+                    ['sel_nws().causality().plot()  # should be 0 for causal network'],
+                    PlotType.Cartesian, YQuantity.Magnitude
+                ),
                 None,
                 ExpressionTemplate(
                     'All of Above',
@@ -140,6 +145,7 @@ def get_expression_templates() -> list[ExpressionTemplate|ExpressionTemplateGrou
                         'sel_nws().symmetry().plot()      # should be 0 for symmetric network',
                         'sel_nws().passivity().plot()     # should be 0 for passive network',
                         'sel_nws().losslessness().plot()  # should be 0 for lossless network',
+                        'sel_nws().causality().plot()     # should be 0 for causal network',
                     ],
                     PlotType.Cartesian, YQuantity.Magnitude
                 ),
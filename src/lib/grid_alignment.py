@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import collections
+import functools
+import numpy as np
+
+
+
+class InterpolationPlan:
+    """
+    Indices and weights to linearly interpolate data on one frequency grid onto another frequency grid.
+
+    The plan only depends on the two grids, so it can be applied to any number of parameters that share the same source grid.
+    Outside of the source grid, the first/last value is held, like np.interp() does.
+    """
+
+
+    def __init__(self, f: np.ndarray, f_new: np.ndarray):
+        f, f_new = np.asarray(f), np.asarray(f_new)
+        if len(f) < 1:
+            raise ValueError('Cannot interpolate S-parameters: at least one frequency sample is required')
+        self.n_src, self.n_dst = len(f), len(f_new)
+        self.is_identity = np.array_equal(f, f_new)
+        if self.is_identity:
+            return
+
+        if len(f) == 1:
+            i_lo, weight = np.zeros(len(f_new), dtype=int), np.zeros(len(f_new))
+        else:
+            i_lo = np.clip(np.searchsorted(f, f_new, side='right') - 1, 0, len(f)-2)
+            df = f[i_lo+1] - f[i_lo]
+            weight = np.divide(f_new - f[i_lo], df, out=np.zeros(len(f_new)), where=df!=0)
+            weight = np.clip(weight, 0, 1)  # clipping holds the first/last value, like np.interp()
+
+        # points that coincide with an original point (e.g. when the new grid is the union of two grids) are just copied
+        on_lo, on_hi = weight == 0, weight == 1
+        between = ~(on_lo | on_hi)
+        self.dst_on_lo, self.src_on_lo = np.flatnonzero(on_lo), i_lo[on_lo]
+        self.dst_on_hi, self.src_on_hi = np.flatnonzero(on_hi), i_lo[on_hi] + 1
+        self.dst_between, self.src_between, self.weight_between = np.flatnonzero(between), i_lo[between], weight[between]
+
+
+    def apply(self, s: np.ndarray, polar: bool = True) -> np.ndarray:
+        """
+        Interpolates magnitude and unwrapped phase along the first axis of <s>, which may have any number of further axes
+        (e.g. shape (n_frequencies, n_ports, n_ports)); all parameters are processed at once.
+        If <polar> is False, the values are interpolated linearly instead, and real values stay real (e.g. for dB values,
+        or other derived quantities that may change their sign).
+        """
+        s = np.asarray(s)
+        if len(s) != self.n_src:
+            raise ValueError(f'Expected frequency and S-parameters to have the same length, got {self.n_src} and {len(s)}')
+        dtype = complex if polar or np.iscomplexobj(s) else float
+        if self.is_identity:
+            return np.array(s, dtype=dtype)
+
+        s_new = np.empty([self.n_dst, *s.shape[1:]], dtype=dtype)
+        s_new[self.dst_on_lo] = s[self.src_on_lo]
+        s_new[self.dst_on_hi] = s[self.src_on_hi]
+        if len(self.dst_between) < 1:
+            return s_new
+
+        if not polar:
+            i_lo, weight = self.src_between, self.weight_between.reshape([-1] + [1]*(s.ndim-1))
+            s_new[self.dst_between] = (1-weight)*s[i_lo] + weight*s[i_lo+1]
+            return s_new
+
+        # same as np.unwrap(np.angle(s), axis=0), but faster, because all phase steps are within ±2π
+        pha = np.angle(s)
+        if len(pha) > 1:
+            pha[1:] -= (2*np.pi) * np.cumsum(np.round(np.diff(pha, axis=0) / (2*np.pi)), axis=0)
+        mag = np.abs(s)
+
+        i_lo, weight = self.src_between, self.weight_between.reshape([-1] + [1]*(s.ndim-1))
+        mag_new = (1-weight)*mag[i_lo] + weight*mag[i_lo+1]
+        pha_new = (1-weight)*pha[i_lo] + weight*pha[i_lo+1]
+        s_between = np.empty(mag_new.shape, dtype=complex)
+        s_between.real, s_between.imag = mag_new*np.cos(pha_new), mag_new*np.sin(pha_new)
+        s_new[self.dst_between] = s_between
+        return s_new
+
+
+
+class GridAlignment:
+    """
+    Shared service to bring parameters from different frequency grids onto a common grid.
+
+    Unions/overlaps of grids and interpolation plans are cached by the fingerprints of the involved grids, so that repeated
+    operations on the same grids (e.g. on every plot update, or for hundreds of traces from similar files) only have to
+    apply the plans.
+    """
+
+
+    max_entries: int = 64
+
+    _plans: collections.OrderedDict[tuple,InterpolationPlan] = collections.OrderedDict()
+    _grids: collections.OrderedDict[tuple,np.ndarray] = collections.OrderedDict()
+    hits: int = 0
+    misses: int = 0
+
+
+    @staticmethod
+    def fingerprint(f: np.ndarray) -> tuple:
+        """Key that identifies a frequency grid by its contents"""
+        f = np.asarray(f)
+        if len(f) < 1:
+            return (0,)
+        return (len(f), f.dtype.str, float(f[0]), float(f[-1]), hash(f.tobytes()))
+
+
+    @staticmethod
+    def _lookup(entries: collections.OrderedDict, key: tuple, create_fn):
+        entry = entries.get(key)
+        if entry is not None:
+            entries.move_to_end(key)
+            GridAlignment.hits += 1
+            return entry
+        GridAlignment.misses += 1
+        entry = create_fn()
+        entries[key] = entry
+        while len(entries) > GridAlignment.max_entries:
+            entries.popitem(last=False)
+        return entry
+
+
+    @staticmethod
+    def get_plan(f: np.ndarray, f_new: np.ndarray) -> InterpolationPlan:
+        key = (GridAlignment.fingerprint(f), GridAlignment.fingerprint(f_new))
+        return GridAlignment._lookup(GridAlignment._plans, key, lambda: InterpolationPlan(f, f_new))
+
+
+    @staticmethod
+    def union(*fs: np.ndarray) -> np.ndarray:
+        """Sorted union of all frequencies of the given grids"""
+        if len(fs) < 1:
+            return np.array([])
+        key = ('union', *[GridAlignment.fingerprint(f) for f in fs])
+        f_union = GridAlignment._lookup(GridAlignment._grids, key, lambda: functools.reduce(np.union1d, [np.asarray(f) for f in fs]))
+        return f_union.copy()  # the caller may modify the result
+
+
+    @staticmethod
+    def overlap(*fs: np.ndarray) -> np.ndarray:
+        """Sorted union of all frequencies of the given grids, restricted to the range that is covered by all grids"""
+        if len(fs) < 1 or any([len(f) < 1 for f in fs]):
+            return np.array([])
+        key = ('overlap', *[GridAlignment.fingerprint(f) for f in fs])
+        def create():
+            f_union = GridAlignment.union(*fs)
+            f_min, f_max = max([np.min(f) for f in fs]), min([np.max(f) for f in fs])
+            return f_union[np.searchsorted(f_union, f_min, side='left'):np.searchsorted(f_union, f_max, side='right')]
+        return GridAlignment._lookup(GridAlignment._grids, key, create).copy()
+
+
+    @staticmethod
+    def clear():
+        GridAlignment._plans.clear()
+        GridAlignment._grids.clear()
+        GridAlignment.hits, GridAlignment.misses = 0, 0
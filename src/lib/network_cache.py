@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+from .network_ext import NetworkExt, NetworkExtPort
+from .path_ext import PathExt
+from .apppaths import AppPaths
+from .settings import Settings
+
+import os
+import json
+import hashlib
+import logging
+import threading
+import numpy as np
+
+
+
+class NetworkCache:
+    """
+    Persistent on-disk cache of parsed networks.
+
+    Each entry is stored as an uncompressed .npz-file, containing f, s and z0 as binary arrays, plus
+    comments, name, ports and metadata. An entry is only valid as long as the modification time and size
+    of the original file (or the archive that contains it) have not changed. When the total size of the
+    cache exceeds the limit, the least recently used entries are removed.
+    """
+
+
+    FORMAT_VERSION = 1
+    EXTENSION = '.npz'
+
+    directory: str|None = None  # if None, the default directory from AppPaths is used
+    max_size_bytes: int|None = None  # if None, the limit from the settings is used
+
+    _lock = threading.Lock()
+    _total_size_bytes: int|None = None
+    _evict: bool = True  # False in worker processes; their process of origin enforces the limit (see enforce_limit())
+
+
+    @staticmethod
+    def _get_dir() -> str:
+        if NetworkCache.directory is not None:
+            return NetworkCache.directory
+        return AppPaths.get_network_cache_dir()
+
+
+    @staticmethod
+    def _get_max_size_bytes() -> int:
+        if NetworkCache.max_size_bytes is not None:
+            return NetworkCache.max_size_bytes
+        return Settings.network_cache_maxsize_mb * 1024 * 1024
+
+
+    @staticmethod
+    def _get_key(path: PathExt) -> tuple[str,str]:
+        abs_path = os.path.abspath(str(path))
+        arch_path = path.arch_path or ''
+        stat = os.stat(abs_path)
+        name = hashlib.sha1(f'{abs_path}\n{arch_path}'.encode('utf8')).hexdigest()
+        key = f'{abs_path}\n{arch_path}\n{stat.st_mtime_ns}\n{stat.st_size}'
+        return name, key
+
+
+    @staticmethod
+    def get_worker_config() -> tuple[str|None,int|None]:
+        """Configuration to pass to init_worker(); spawned worker processes do not inherit the class attributes"""
+        return NetworkCache.directory, NetworkCache.max_size_bytes
+
+
+    @staticmethod
+    def init_worker(config: tuple[str|None,int|None]):
+        """
+        Initializer for worker processes, so that they use the same cache as the process that started them. The workers do
+        not keep track of the size of the cache, because each of them would only see its own entries; instead, the process
+        that started them is expected to call enforce_limit() after they have written to the cache.
+        """
+        NetworkCache.directory, NetworkCache.max_size_bytes = config
+        NetworkCache._evict = False
+
+
+    @staticmethod
+    def _get_entry_path(name: str) -> str:
+        return os.path.join(NetworkCache._get_dir(), name + NetworkCache.EXTENSION)
+
+
+    @staticmethod
+    def get(path: PathExt) -> tuple[NetworkExt,str|None]|None:
+        """Returns (network, metadata) from the cache, or None if there is no valid entry"""
+        try:
+            name, key = NetworkCache._get_key(path)
+            entry_path = NetworkCache._get_entry_path(name)
+            if not os.path.exists(entry_path):
+                return None
+
+            with np.load(entry_path, allow_pickle=False) as data:
+                info = json.loads(str(data['info']))
+                if info.get('version') != NetworkCache.FORMAT_VERSION or info.get('key') != key:
+                    return None  # outdated
+                f, s, z0 = data['f'], data['s'], data['z0']
+
+            nw = NetworkExt(s=s, f=f, f_unit='Hz', z0=z0, comments=info['comments'], name=info['name'])
+            if info['ports']:
+                nw._ports = [NetworkExtPort.parse(port, index) for index,port in enumerate(info['ports'])]
+
+            os.utime(entry_path)  # mark as recently used
+            return nw, info['metadata']
+
+        except Exception as ex:
+            logging.debug(f'Unable to read <{path}> from network cache ({ex})')
+            return None
+
+
+    @staticmethod
+    def put(path: PathExt, nw: NetworkExt, metadata: str|None):
+        try:
+            name, key = NetworkCache._get_key(path)
+            entry_path = NetworkCache._get_entry_path(name)
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+
+            info = dict(
+                version=NetworkCache.FORMAT_VERSION,
+                key=key,
+                name=nw.name,
+                comments=nw.comments,
+                ports=[str(port) for port in nw._ports],
+                metadata=metadata,
+            )
+
+            # write to a temporary file first, so that a concurrent reader never sees a partial entry
+            temp_path = f'{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temp_path, 'wb') as fp:
+                np.savez(fp, f=nw.f, s=nw.s, z0=nw.z0, info=np.array(json.dumps(info)))
+            old_size = os.path.getsize(entry_path) if os.path.exists(entry_path) else 0
+            os.replace(temp_path, entry_path)
+
+            NetworkCache._add_to_size(os.path.getsize(entry_path) - old_size)
+
+        except Exception as ex:
+            logging.debug(f'Unable to write <{path}> to network cache ({ex})')
+
+
+    @staticmethod
+    def clear():
+        with NetworkCache._lock:
+            for entry_path, _, _ in NetworkCache._list_entries():
+                try:
+                    os.remove(entry_path)
+                except Exception as ex:
+                    logging.debug(f'Unable to remove <{entry_path}> from network cache ({ex})')
+            NetworkCache._total_size_bytes = None
+
+
+    @staticmethod
+    def _list_entries() -> list[tuple[str,int,float]]:
+        """Returns a list of (path, size, last use)"""
+        dir = NetworkCache._get_dir()
+        if not os.path.exists(dir):
+            return []
+        result = []
+        with os.scandir(dir) as it:
+            for entry in it:
+                if not entry.is_file() or not entry.name.endswith(NetworkCache.EXTENSION):
+                    continue
+                stat = entry.stat()
+                result.append((entry.path, stat.st_size, stat.st_mtime))
+        return result
+
+
+    @staticmethod
+    def enforce_limit():
+        """Determines the size of the cache again (e.g. after worker processes wrote to it), and evicts entries if required"""
+        with NetworkCache._lock:
+            NetworkCache._total_size_bytes = None
+        NetworkCache._add_to_size(0)
+
+
+    @staticmethod
+    def _add_to_size(delta_bytes: int):
+        if not NetworkCache._evict:
+            return
+        with NetworkCache._lock:
+            if NetworkCache._total_size_bytes is None:
+                NetworkCache._total_size_bytes = sum([size for _,size,_ in NetworkCache._list_entries()])
+            else:
+                NetworkCache._total_size_bytes += delta_bytes
+
+            max_size_bytes = NetworkCache._get_max_size_bytes()
+            if NetworkCache._total_size_bytes <= max_size_bytes:
+                return
+
+            # evict least recently used entries, until the cache is 10% below its limit
+            target_size = max_size_bytes * 0.9
+            entries = sorted(NetworkCache._list_entries(), key=lambda entry: entry[2])
+            total_size = sum([size for _,size,_ in entries])
+            for entry_path, size, _ in entries:
+                if total_size <= target_size:
+                    break
+                try:
+                    os.remove(entry_path)
+                    total_size -= size
+                except Exception as ex:
+                    logging.debug(f'Unable to remove <{entry_path}> from network cache ({ex})')
+            NetworkCache._total_size_bytes = total_size
@@ -1,7 +1,7 @@
 from .si import SiValue, SiFormat
 from .plot_data import PlotData, PlotDataQuantity
 from .shortstr import shorten_string_list
-from .utils import natural_sort_key
+from .utils import natural_sort_key, decimate_minmax, get_db_trace_summary
 from .settings import Settings, LogNegativeHandling, LegendPos
 
 import math
@@ -19,6 +19,142 @@ from dataclasses import dataclass
 from typing import Optional
 
 
+class TraceIndex:
+    """
+    Accelerates the search for the point of a trace that is closest to given coordinates.
+
+    If only X (or only Y) is given, a binary search over the sorted values is used; if both are given, a KD-tree over
+    the scaled coordinates is used, which is re-built only when the scaling changes.
+    """
+
+
+    def __init__(self, x: np.ndarray, y: np.ndarray):
+        self._x_source, self._y_source = x, y
+        x, y = np.asarray(x), np.asarray(y)
+        self._complex = np.iscomplexobj(x) or np.iscomplexobj(y)
+        if self._complex:
+            self._x, self._y = x, y
+            return
+        # NaNs can never be the closest point, so they are not indexed
+        self._valid = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+        self._x, self._y = x[self._valid].astype(float), y[self._valid].astype(float)
+        self._orders: dict[str,np.ndarray|None] = {}  # sort order of X and Y, built on demand
+        self._tree = None
+        self._tree_scale: tuple[float,float]|None = None
+
+
+    def matches(self, x: np.ndarray, y: np.ndarray) -> bool:
+        return x is self._x_source and y is self._y_source
+
+
+    def find_closest(self, x: float|None, y: float|None, width: float = 1, height: float = 1) -> tuple[int,float]|tuple[None,None]:
+        """Returns (index, normalized distance) of the closest point; <x> or <y> may be None to ignore that dimension"""
+        
+        if self._complex:
+            dx = (self._x - x) /  width if x is not None else 0
+            dy = (self._y - y) / height if y is not None else 0
+            dist = np.sqrt(np.abs(dx**2) + np.abs(dy**2))
+            idx = np.argmin(dist)
+            return idx, dist[idx]
+
+        if len(self._x) < 1:
+            return None, None
+        
+        if x is not None and y is not None:
+            scale = (width, height)
+            if self._tree is None or self._tree_scale != scale:
+                import scipy.spatial
+                self._tree = scipy.spatial.cKDTree(np.stack([self._x / width, self._y / height], axis=-1))
+                self._tree_scale = scale
+            dist, idx = self._tree.query([x / width, y / height])
+        elif x is not None:
+            if 'x' not in self._orders:
+                self._orders['x'] = TraceIndex._get_order(self._x)
+            idx, dist = TraceIndex._find_closest_sorted(self._x, self._orders['x'], x)
+            dist /= width
+        elif y is not None:
+            if 'y' not in self._orders:
+                self._orders['y'] = TraceIndex._get_order(self._y)
+            idx, dist = TraceIndex._find_closest_sorted(self._y, self._orders['y'], y)
+            dist /= height
+        else:
+            idx, dist = 0, 0.0
+        
+        return self._valid[idx], dist
+
+
+    @staticmethod
+    def _get_order(values: np.ndarray) -> np.ndarray|None:
+        """Returns None if the values are already sorted (e.g. frequencies), which is the common case"""
+        if np.all(values[1:] >= values[:-1]):
+            return None
+        return np.argsort(values, kind='stable')
+
+
+    @staticmethod
+    def _find_closest_sorted(values: np.ndarray, order: np.ndarray|None, target: float) -> tuple[int,float]:
+        sorted_values = values if order is None else values[order]
+        i = np.searchsorted(sorted_values, target)
+        candidates = [c for c in (i-1, i) if 0 <= c < len(sorted_values)]
+        best = min(candidates, key=lambda c: abs(sorted_values[c] - target))
+        idx = best if order is None else order[best]
+        return idx, abs(values[idx] - target)
+
+
+
+class TraceSummaries:
+    """
+    Summaries of the Y-values of a trace within X-ranges (see get_db_trace_summary()), for the smart dB scaling.
+
+    Each X-range is only summarized once; with sorted X-values (e.g. frequencies), it is mapped to a window of indices by
+    a binary search, instead of masking the whole trace. The summaries can be taken over by an identical trace of the
+    next plot (see adopt()), so that a plot update only has to combine them. Only the most recently used X-ranges are
+    kept, so that zooming and panning do not accumulate summaries.
+    """
+
+
+    MAX_RANGES = 16
+
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, x_sorted: bool|None = None, summaries: dict[tuple,np.ndarray|None]|None = None):
+        self._x_source, self._y_source = x, y
+        self._x, self._y = np.asarray(x), np.asarray(y)
+        self._x_sorted = x_sorted if x_sorted is not None else bool(np.all(self._x[1:] >= self._x[:-1]))
+        self._summaries: dict[tuple,np.ndarray|None] = summaries if summaries is not None else {}
+
+
+    def matches(self, x: np.ndarray, y: np.ndarray) -> bool:
+        return x is self._x_source and y is self._y_source
+
+
+    def adopt(self, x: np.ndarray, y: np.ndarray) -> "TraceSummaries|None":
+        """Returns summaries for the given data, which re-use the existing ones if the data is the same; None otherwise"""
+        if not (x is self._x_source or np.array_equal(x, self._x)) or not (y is self._y_source or np.array_equal(y, self._y)):
+            return None  # note that data with NaNs is never equal, so it is just summarized again
+        return TraceSummaries(x, y, self._x_sorted, self._summaries)
+
+
+    def get(self, x_start: float = -1e99, x_end: float = +1e99) -> np.ndarray|None:
+        """Returns the summary of all Y-values within the inclusive X-range, or None if there are none"""
+        if self._x_sorted:
+            window = (int(np.searchsorted(self._x, x_start, side='left')), int(np.searchsorted(self._x, x_end, side='right')))
+        else:
+            window = (x_start, x_end)
+        if window in self._summaries:
+            summary = self._summaries.pop(window)  # re-inserted below, to mark it as recently used
+        else:
+            if self._x_sorted:
+                values = self._y[window[0]:window[1]]
+            else:
+                values = self._y[(self._x >= x_start) & (self._x <= x_end)]
+            summary = get_db_trace_summary(values) if len(values) > 0 else None
+            while len(self._summaries) >= TraceSummaries.MAX_RANGES:
+                del self._summaries[next(iter(self._summaries))]
+        self._summaries[window] = summary
+        return summary
+
+
+
 @dataclass
 class ItemToPlot:
     data: PlotData
@@ -29,12 +165,29 @@ class ItemToPlot:
     width: float
     opacity: float
     label: str|None = None
+    index: TraceIndex|None = None
+    summaries: TraceSummaries|None = None
+
+    def get_index(self) -> TraceIndex:
+        """Returns the index for nearest-point queries; it is (re-)built when the data has changed"""
+        if self.index is None or not self.index.matches(self.data.x.values, self.data.y.values):
+            self.index = TraceIndex(self.data.x.values, self.data.y.values)
+        return self.index
+
+    def get_summaries(self) -> TraceSummaries:
+        """Returns the summaries for the smart dB scaling; they are discarded when the data has changed"""
+        if self.summaries is None or not self.summaries.matches(self.data.x.values, self.data.y.values):
+            self.summaries = TraceSummaries(self.data.x.values, self.data.y.values)
+        return self.summaries
 
 
 
 class PlotHelper:
 
 
+    MIN_DECIMATION_BUCKETS = 256
+
+
     class Cursor:
         
         def __init__(self, plot: "PlotHelper", style: str, color: object = None, use_2nd_axis: bool = False):
@@ -152,7 +305,12 @@ class PlotHelper:
     def __init__(self, figure: matplotlib.figure.Figure, smith: bool, polar: bool, x_qty: str, x_fmt: SiFormat, x_log: bool,
         y_qty: "str", y_fmt: SiFormat, y_log: bool, y2_qty: "str", y2_fmt: SiFormat, z_qty: "str" = None, z_fmt: SiFormat = None,
         smith_type: str='z', smith_z=1.0,
-        show_legend: bool = True, hide_single_item_legend: bool = False, shorten_legend: bool = False, max_legend_items: int = -1):
+        show_legend: bool = True, hide_single_item_legend: bool = False, shorten_legend: bool = False, max_legend_items: int = -1,
+        previous: "PlotHelper|None" = None):
+        """
+        If <previous> is given, the axes and traces of that plot are re-used during render(), as long as the axes are
+        compatible; only traces that were added or removed are then created or deleted, all other traces are updated in place.
+        """
         
         self._anything_in_plot = False
         
@@ -184,8 +342,14 @@ class PlotHelper:
         self._axes_swapped = None
         self._r_smith = None
         self._preferred_legend_position = LegendPos.Auto
+        self._previous = previous
+        self._axes_reused = False
+        self._artists: dict[tuple,matplotlib.lines.Line2D] = {}
+        self._callback_ids: list[tuple[matplotlib.axes.Axes,int]] = []
+        self._decimated_traces: list[tuple[matplotlib.lines.Line2D,np.ndarray,np.ndarray]] = []  # (line, full-resolution X, full-resolution Y)
         
-        self._figure.clf()
+        if self._previous is None:
+            self._figure.clf()
         
         self._x_range = [+1e99,-1e99]
         self._y_range = [+1e99,-1e99]
@@ -209,7 +373,7 @@ class PlotHelper:
                 lo, hi = axes.get_xlim()
                 callback_fn(lo, hi)
             return wrapped
-        self._plot.callbacks.connect('xlim_changed', make_callback_fn(callback_fn))
+        self._callback_ids.append((self._plot, self._plot.callbacks.connect('xlim_changed', make_callback_fn(callback_fn))))
 
     @property
     def yaxis_range(self) -> tuple[float,float]:
@@ -224,7 +388,7 @@ class PlotHelper:
                 lo, hi = axes.get_ylim()
                 callback_fn(lo, hi)
             return wrapped
-        self._plot.callbacks.connect('ylim_changed', make_callback_fn(callback_fn))
+        self._callback_ids.append((self._plot, self._plot.callbacks.connect('ylim_changed', make_callback_fn(callback_fn))))
     
 
     def show_grid(self, show: bool = True):
@@ -317,11 +481,9 @@ class PlotHelper:
             if plot.currently_used_axis != 1:
                 continue  # tracing cursors on the right axis does not work yet
             
-            dx = (np.array(plot.data.x.values) - x) /  width if x is not None else 0
-            dy = (np.array(plot.data.y.values) - y) / height if y is not None else 0
-            dist = np.sqrt(np.abs(dx**2) + np.abs(dy**2))
-            idx = np.argmin(dist)
-            error = dist[idx]
+            idx, error = plot.get_index().find_closest(x, y, width, height)
+            if idx is None:
+                continue
             if error < best_error:
                 best_error = error
                 best_plot = plot
@@ -398,30 +560,102 @@ class PlotHelper:
         self._use_two_yaxes = False
         self._axes_swapped = False
         self._r_smith = None
-        self._prepare_plots_and_axes()
+        previous, self._previous = self._previous, None
+        if previous is not None:
+            self._adopt_summaries_of(previous)
+        self._axes_reused = previous is not None and self._can_reuse_axes_of(previous)
+        if self._axes_reused:
+            self._reuse_axes_of(previous)
+        else:
+            if previous is not None:
+                self._figure.clf()  # was not cleared in the constructor
+            self._prepare_plots_and_axes()
         self._add_traces_to_plots()
         self._fix_axis_labels()
+        if len(self._decimated_traces) > 0:
+            self._callback_ids.append((self._plot, self._plot.callbacks.connect('xlim_changed', self._on_xlim_changed_for_decimation)))
+
+
+    def _adopt_summaries_of(self, previous: "PlotHelper"):
+        """Traces that did not change since the previous plot keep their summaries"""
+        # names are not necessarily unique, so the n-th trace of the same name is compared to the n-th previous one
+        def get_keys(items: list[ItemToPlot]) -> list[tuple[str,int]]:
+            counts, keys = {}, []
+            for item in items:
+                counts[item.data.name] = counts.get(item.data.name, 0) + 1
+                keys.append((item.data.name, counts[item.data.name]))
+            return keys
+        previous_items = dict(zip(get_keys(previous._items), previous._items))
+        for key, item in zip(get_keys(self._items), self._items):
+            previous_item = previous_items.get(key)
+            if previous_item is not None and previous_item.summaries is not None:
+                item.summaries = previous_item.summaries.adopt(item.data.x.values, item.data.y.values)
+
+
+    def _get_axes_config(self) -> tuple:
+        """Returns everything that determines how the axes are set up (but not the traces in them)"""
+        if self._polar or self._smith:
+            use_two_yaxes = False
+        else:
+            anything_on_primary_yaxis = any([not item.prefer_seconary_yaxis for item in self._items])
+            anything_on_secondary_yaxis = any([item.prefer_seconary_yaxis for item in self._items])
+            use_two_yaxes = anything_on_primary_yaxis and anything_on_secondary_yaxis
+        return (self._smith, self._polar, self._x_qty, self._x_log, self._y_qty, self._y_log, self._y2_qty, use_two_yaxes)
+
+
+    def _can_reuse_axes_of(self, previous: "PlotHelper") -> bool:
+        if previous._figure is not self._figure or previous._plot is None or previous._plot not in self._figure.axes:
+            return False  # figure was cleared, or plot was never rendered
+        if self._smith:
+            return False  # the Smith chart background depends on the data, so it is always re-created
+        return self._get_axes_config() == previous._get_axes_config()
+
+
+    def _reuse_axes_of(self, previous: "PlotHelper"):
+        self._plot, self._plot2 = previous._plot, previous._plot2
+        self._artists = previous._artists
+        previous._artists = {}
+        self._use_two_yaxes = self._get_axes_config()[-1]
+
+        # the new cursors and listeners are attached by the caller
+        for cursor in previous.cursors:
+            for artist in [cursor._hl, cursor._vl, cursor._text]:
+                if artist is not None:
+                    artist.remove()
+            cursor._hl, cursor._vl, cursor._text = None, None, None
+        for axes, callback_id in previous._callback_ids:
+            axes.callbacks.disconnect(callback_id)
+        previous._callback_ids = []
+
+        # behave like freshly created axes
+        for plot in [self._plot, self._plot2]:
+            if plot is not None:
+                plot.set_autoscale_on(True)
+        if self._polar and self._get_r_max() <= 1:
+            self._plot.set_ylim((0,1))
+    
 
+    def _get_r_max(self) -> float:
+        r_max = 0
+        for item in self._items:
+            r_this = max(np.sqrt(np.power(item.data.x.values,2) + np.power(item.data.y.values,2)))
+            r_max = max(r_max, r_this)
+        return r_max
 
-    def _prepare_plots_and_axes(self):
-        def get_r_max():
-            r_max = 0
-            for item in self._items:
-                r_this = max(np.sqrt(np.power(item.data.x.values,2) + np.power(item.data.y.values,2)))
-                r_max = max(r_max, r_this)
-            return r_max
 
+    def _prepare_plots_and_axes(self):
         self._plot2 = None
+        self._artists = {}
         if self._polar:
             self._plot = self._figure.add_subplot(111, projection='polar')
-            r_max = get_r_max()
+            r_max = self._get_r_max()
             if r_max <= 1:
                 self._plot.set_ylim((0,1))
             self._use_two_yaxes = False
         elif self._smith:
             from skrf import plotting
             self._plot = self._figure.add_subplot(111)
-            r_max = get_r_max()
+            r_max = self._get_r_max()
             self._r_smith = 1 if r_max<=1 else r_max*1.05
             plotting.smith(ax=self._plot, chart_type=self._smith_type, ref_imm=self._smith_z, draw_labels=True, smithR=self._r_smith)
             self._use_two_yaxes = False
@@ -492,6 +726,15 @@ class PlotHelper:
         
         self._items = sorted(self._items, key=lambda item: natural_sort_key(item.label))
 
+        # traces that already exist (from a previous plot) are updated in place; whatever is left over afterwards is removed
+        previous_artists, self._artists = self._artists, {}
+        key_counts: dict[tuple,int] = {}
+        legend_handles: list[matplotlib.lines.Line2D] = []
+        color_cycle = PlotHelper._get_color_cycle()
+        next_color_index = {1: 0, 2: 0}
+        self._decimated_traces = []
+        n_decimation_buckets = self._get_decimation_buckets()
+
         for item_index,item in enumerate(self._items):
             try:
                 if item.prefer_seconary_yaxis and self._use_two_yaxes:
@@ -521,9 +764,18 @@ class PlotHelper:
                 if label.startswith('_'):
                     label = ' _' + label[1:]
                 
+                # names are not necessarily unique, so the n-th trace of the same name gets the n-th artist
+                key = (item.data.name, item.currently_used_axis)
+                key_counts[key] = key_counts.get(key, 0) + 1
+                key = (*key, key_counts[key])
+                
+                line = previous_artists.pop(key, None)
+
                 if self._polar:
                     c = x + 1j*y
-                    new_plt = plot.plot(np.angle(c), np.abs(c), style, label=label, color=color, lw=width, alpha=opacity)
+                    color = PlotHelper._get_trace_color(color, color_cycle, next_color_index, item.currently_used_axis)
+                    line = PlotHelper._plot_or_update_line(plot, line, np.angle(c), np.abs(c), style, label, color, width, opacity)
+                    new_plt = [line]
                     self._anything_in_plot = True
                 elif self._smith:
                     c = x + 1j*y
@@ -549,8 +801,21 @@ class PlotHelper:
                             logging.debug(f'Trace "{label}" Y-data has complex type, but no complex values; casting to real')
                         y = np.real(y).astype(float)
 
-                    new_plt = plot.plot(x, y, style, label=item.label, color=color, lw=width, alpha=opacity)
+                    # long traces are decimated for display; the item keeps the full-resolution data (e.g. for cursors and export)
+                    decimate = len(x) > 4*n_decimation_buckets and np.all(np.diff(x) >= 0)
+                    x_plot, y_plot = decimate_minmax(x, y, n_decimation_buckets, log_x=self._x_log) if decimate else (x, y)
+
+                    color = PlotHelper._get_trace_color(color, color_cycle, next_color_index, item.currently_used_axis)
+                    line = PlotHelper._plot_or_update_line(plot, line, x_plot, y_plot, style, item.label, color, width, opacity)
+                    new_plt = [line]
                     self._anything_in_plot = True
+                    if decimate:
+                        self._decimated_traces.append((line, x, y))
+
+                if line is not None:
+                    self._artists[key] = line
+                    if not use_y2 and not line.get_label().startswith('_'):
+                        legend_handles.append(line)
 
                 color = new_plt[0].get_color() if new_plt is not None else None
                 self._items[item_index].data.color = color
@@ -558,6 +823,15 @@ class PlotHelper:
             except Exception as ex:
                 logging.error(f'Unable to plot item ({ex})')
         
+        for line in previous_artists.values():
+            line.remove()
+        if self._axes_reused:
+            # data of re-used traces may have changed, and removed traces must not count anymore
+            for plot in [self._plot, self._plot2]:
+                if plot is not None:
+                    plot.relim()
+                    plot.autoscale_view()
+        
         if self._anything_in_plot and self._smith:
             assert self._r_smith is not None, 'Expected Smith radius to be set'
             if self._r_smith!=1:
@@ -580,7 +854,10 @@ class PlotHelper:
                     case LegendPos.Bottom:      loc = 'lower center'
                     case LegendPos.BottomRight: loc = 'lower right'
                     case _:                     loc = 'best'
-                self._plot.legend(loc=loc)
+                if self._smith:
+                    self._plot.legend(loc=loc)
+                else:
+                    self._plot.legend(handles=legend_handles, loc=loc)  # explicit, so that the order does not depend on which traces were re-used
             else:
                 if self._plot:
                     legend = self._plot.get_legend()
@@ -592,22 +869,72 @@ class PlotHelper:
                         legend2.remove()
     
 
+    def _get_decimation_buckets(self) -> int:
+        width_px = self._plot.get_window_extent().width if self._plot is not None else 0
+        return max(PlotHelper.MIN_DECIMATION_BUCKETS, int(width_px))
+
+
+    def _on_xlim_changed_for_decimation(self, axes: matplotlib.axes.Axes):
+        lo, hi = sorted(axes.get_xlim())
+        n_buckets = self._get_decimation_buckets()
+        for line, x, y in self._decimated_traces:
+            line.set_data(*decimate_minmax(x, y, n_buckets, lo, hi, log_x=self._x_log))
+
+
+    @staticmethod
+    def _get_color_cycle() -> list[str]:
+        prop_cycle = matplotlib.rcParams['axes.prop_cycle'].by_key()
+        return prop_cycle.get('color', [])
+
+
+    @staticmethod
+    def _get_trace_color(color: str|None, color_cycle: list[str], next_color_index: dict[int,int], axis: int) -> str|None:
+        """
+        Colors are assigned explicitly instead of leaving it to matplotlib, because re-used traces would otherwise keep the color
+        they got when they were created, and new traces would get a color depending on what was plotted before.
+        """
+        if color is not None or len(color_cycle) < 1:
+            return color
+        color = color_cycle[next_color_index[axis] % len(color_cycle)]
+        next_color_index[axis] += 1
+        return color
+
+
+    @staticmethod
+    def _plot_or_update_line(plot: matplotlib.axes.Axes, line: matplotlib.lines.Line2D|None, x: np.ndarray, y: np.ndarray,
+        style: str, label: str, color: str|None, width: float|None, opacity: float|None) -> matplotlib.lines.Line2D:
+        
+        if line is None:
+            return plot.plot(x, y, style, label=label, color=color, lw=width, alpha=opacity)[0]
+        
+        line.set_data(x, y)
+        style_kwargs = PlotHelper._style_to_kwargs(style)
+        line.set_linestyle(style_kwargs['linestyle'] or 'None')
+        line.set_marker(style_kwargs['marker'] or 'None')
+        line.set_label(label)
+        if color is not None:
+            line.set_color(color)
+        line.set_linewidth(width if width is not None else matplotlib.rcParams['lines.linewidth'])
+        line.set_alpha(opacity)
+        return line
+
+
     @staticmethod
     def _style_to_kwargs(style: str) -> dict[str,str]:
         """ split e.g. 'o--' into {marker='o', linestyle='--'} """
         MARKERS = ['o', 's', '^', 'v', '<', '>', 'd', 'p', 'h', '*', '+', 'x', '.', ',', '|', '_']
-        LINESTYLES = ['-', '--', '-.', ':']
+        LINESTYLES = ['--', '-.', '-', ':']  # longest first, and before markers, so that e.g. '-.' is not taken as marker '.'
         result = {'marker':'', 'linestyle':''}
-        for m in MARKERS:
-            if m in style:
-                result['marker'] = m
-                style = style.replace(m, '')
-                break
         for ls in LINESTYLES:
             if ls in style:
                 result['linestyle'] = ls
                 style = style.replace(ls, '')
                 break
+        for m in MARKERS:
+            if m in style:
+                result['marker'] = m
+                style = style.replace(m, '')
+                break
         return result
         
 
@@ -668,7 +995,6 @@ class PlotHelper:
                 #return str(Si(value, si_fmt=y2_format))
             self._plot2.yaxis.set_major_formatter(y2_axis_formatter)
 
-        if self._x_log and self._plot is not None:
-            self._plot.set_xscale('log')
-        if y_log and self._plot is not None:
-            self._plot.set_yscale('log')
+        if self._plot is not None:
+            self._plot.set_xscale('log' if self._x_log else 'linear')
+            self._plot.set_yscale('log' if y_log else 'linear')
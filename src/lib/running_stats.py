@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+
+class RunningStats:
+    """
+    Online mean, variance, minimum and maximum of a sequence of arrays (e.g. one array per trace, one value per frequency).
+
+    Each array is only needed while it is added, so the statistics of many traces can be calculated without holding all of
+    them in memory at once. Mean and variance are updated with Welford's algorithm, which is numerically stable. Complex
+    values are supported for mean and variance (like np.std(), the variance is the mean of |x-mean|²), but not for
+    minimum and maximum.
+    """
+
+
+    def __init__(self):
+        self.count = 0
+        self._mean: np.ndarray|None = None
+        self._m2: np.ndarray|None = None
+        self._min: np.ndarray|None = None
+        self._max: np.ndarray|None = None
+
+
+    def add(self, x: np.ndarray):
+        x = np.asarray(x)
+        self.count += 1
+        if self.count == 1:
+            self._mean = x.astype(complex if np.iscomplexobj(x) else float)
+            self._m2 = np.zeros(x.shape)
+            if not np.iscomplexobj(x):
+                self._min, self._max = x.astype(float), x.astype(float)
+            return
+
+        if np.iscomplexobj(x) and not np.iscomplexobj(self._mean):
+            self._mean = self._mean.astype(complex)
+        delta = x - self._mean
+        self._mean += delta / self.count
+        self._m2 += np.real(delta * np.conj(x - self._mean))
+        if self._min is not None:
+            if np.iscomplexobj(x):
+                self._min, self._max = None, None
+            else:
+                np.minimum(self._min, x, out=self._min)
+                np.maximum(self._max, x, out=self._max)
+
+
+    def add_all(self, xs) -> RunningStats:
+        for x in xs:
+            self.add(x)
+        return self
+
+
+    def _ensure_data(self):
+        if self.count < 1:
+            raise ValueError('No data was added')
+
+
+    @property
+    def mean(self) -> np.ndarray:
+        self._ensure_data()
+        return self._mean.copy()
+
+
+    def variance(self, ddof: int = 0) -> np.ndarray:
+        self._ensure_data()
+        if self.count - ddof <= 0:
+            return np.full(self._m2.shape, np.nan)
+        return self._m2 / (self.count - ddof)
+
+
+    def sdev(self, ddof: int = 0) -> np.ndarray:
+        return np.sqrt(self.variance(ddof))
+
+
+    def _ensure_real(self):
+        self._ensure_data()
+        if self._min is None:
+            raise ValueError('Minimum and maximum are undefined for complex values')
+
+
+    @property
+    def min(self) -> np.ndarray:
+        self._ensure_real()
+        return self._min.copy()
+
+
+    @property
+    def max(self) -> np.ndarray:
+        self._ensure_real()
+        return self._max.copy()
+
+
+    @property
+    def pkpk(self) -> np.ndarray:
+        self._ensure_real()
+        return self._max - self._min
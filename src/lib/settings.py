@@ -143,6 +143,8 @@ class SParamViewerAppSettings(AppSettings):
     phase_unit: PhaseUnit = PhaseUnit.Degrees
     export_phase_unit: PhaseUnit = PhaseUnit.Degrees
     extract_zip: bool = True
+    network_cache: bool = True
+    network_cache_maxsize_mb: int = 1024
     plot_mark_points: bool = False
     path_history: list[str] = []
     path_history_maxsize: int = 10
@@ -5,14 +5,18 @@ from .network_ext import NetworkExt
 from .path_ext import PathExt
 from .si import SiValue
 from .citi import CitiReader
-from .utils import ArchiveFileLoader, strip_common
+from .touchstone import TouchstoneReader
+from .utils import ArchiveFileLoader, ArchivePool, strip_common, get_unique_id
 from .file_config import FileConfig
+from .network_cache import NetworkCache
+from .settings import Settings
 
 import numpy as np
 import logging
 import datetime
 import os
 import tempfile
+import threading
 from typing import Callable
 
 
@@ -29,12 +33,14 @@ class SParamFile:
 
         self.path: PathExt = path if isinstance(path,PathExt) else PathExt(path)
         self.tag = tag
+        self.uid = get_unique_id()  # never re-used, unlike id(); a reloaded file is a new object with a new ID
 
         self._nw: NetworkExt = None
         self._error: str = None
         self._name: str = name
         self._short_name: str = short_name
         self._metadata: str = None
+        self._load_lock = threading.Lock()
 
 
     @property
@@ -81,7 +87,40 @@ class SParamFile:
                 self._error = 'aborted by user'
                 raise RuntimeError(f'Loading aborted by user')
 
-        def load(path: str):
+        self._load_data()
+        
+        if SParamFile.after_load:
+            SParamFile.after_load(self.path)
+    
+
+    def _load_data(self, log_errors: bool = True):
+        """Does the actual loading, without calling any hooks; safe to be called from a worker thread (with log_errors=False)"""
+        
+        with self._load_lock:
+            if self._nw is not None:
+                return  # was loaded by another thread in the meantime
+            self._error = None
+            self._load_data_unlocked(log_errors)
+    
+
+    def _set_loaded_data(self, nw: NetworkExt|None, metadata: str|None, error: str|None):
+        """Sets the result of loading that was done elsewhere (e.g. in another process)"""
+        with self._load_lock:
+            if self._nw is not None:
+                return  # was loaded in the meantime
+            self._nw, self._metadata, self._error = nw, metadata, error
+    
+
+    def _load_data_unlocked(self, log_errors: bool):
+
+        if Settings.network_cache:
+            cached = NetworkCache.get(self.path)
+            if cached is not None:
+                self._nw, self._metadata = cached
+                return
+
+        def load(path: str, data: bytes|None = None):
+            # if <data> is given, <path> is just the name of the file inside the archive
             try:
                 metadata = None
                 ext = os.path.splitext(path)[1].lower()
@@ -90,36 +129,25 @@ class SParamFile:
                     nw, metadata = citi.get_network(None, {}, select_default=True)
                 
                 else:
-                    try:
-                        nw = NetworkExt(path)
-                    except ValueError:
-                        # I found this bizarre file in my collection where each line is preceeded with a space... attempt to fix that...
-                        fixed = False
-                        with open(path, 'r') as fp:
-                            lines = fp.readlines()
-                        for i,line in enumerate(lines):
-                            if line.startswith(' '):
-                                if '#' in line or '!' in line:
-                                    lines[i] = line.strip()
-                                    fixed = True
-                        if not fixed:
-                            raise
-                        with tempfile.TemporaryDirectory() as temp_dir:
-                            name = os.path.split(path)[1]
-                            temp_path = os.path.join(temp_dir, name)
-                            with open(temp_path, 'w') as fp:
-                                fp.writelines(lines)
-                            nw = NetworkExt.Network(temp_path)
-
-                    # I think there is a bug in skrf; I only get the 1st comment line
-                    # As a workaround, read the comments manually
-                    comments_lines = []
-                    with open(path, 'r') as fp:
-                        for line in fp.readlines():
-                            if line.startswith('!'):
-                                comments_lines.append(line[1:-1])
-                    if len(comments_lines) > 0:
-                        nw.comments = '\n'.join(strip_common(comments_lines))
+                    nw = None
+                    if TouchstoneReader.is_supported(path):
+                        try:
+                            reader = TouchstoneReader(path, data)
+                            nw = reader.get_network()
+                            if len(reader.comments) > 0:
+                                nw.comments = '\n'.join(strip_common(reader.comments))
+                        except Exception as ex:
+                            # fall back to the scikit-rf reader, which supports more features (e.g. noise data)
+                            if log_errors and Settings.verbose:
+                                logging.debug(f'Native Touchstone reader failed on <{path}> ({ex}), falling back to scikit-rf')
+                            nw = None
+                    
+                    if nw is None:
+                        if data is not None:
+                            with ArchiveFileLoader(str(self.path), self.path.arch_path) as extracted_path:
+                                nw = self._load_with_skrf(extracted_path)
+                        else:
+                            nw = self._load_with_skrf(path)
                 
                 assert nw.number_of_ports >= 1, f'Expected at least one port, got {nw.number_of_ports} ports ({path})'
                 assert len(nw.f) >= 1, f'Expected at least one frequency point, got {len(nw.f)} points ({path})'
@@ -131,23 +159,65 @@ class SParamFile:
                 self._nw = nw
                 self._metadata = metadata
             except Exception as ex:
-                logging.exception(f'Unable to load network from "{path}" ({ex})')
+                if log_errors:
+                    logging.exception(f'Unable to load network from "{path}" ({ex})')
                 self._error = str(ex)
                 self._nw = None
                 self._metadata = None
         
         if self.path.is_in_arch():
-            from .utils import ArchiveFileLoader
             try:
-                with ArchiveFileLoader(str(self.path), self.path.arch_path) as extracted_path:
-                    load(extracted_path)
+                if TouchstoneReader.is_supported(self.path.arch_path):
+                    # parse directly from memory; the file is only extracted if the fallback reader is needed
+                    load(self.path.arch_path, ArchivePool.read(str(self.path), self.path.arch_path))
+                else:
+                    with ArchiveFileLoader(str(self.path), self.path.arch_path) as extracted_path:
+                        load(extracted_path)
             except Exception as ex:
-                logging.warning(f'Unable to extract and load <{self.path.arch_path}> from archive <{str(self.path)}> ({ex})')
+                if log_errors:
+                    logging.warning(f'Unable to extract and load <{self.path.arch_path}> from archive <{str(self.path)}> ({ex})')
+                self._error = str(ex)
         else:
             load(str(self.path))
         
-        if SParamFile.after_load:
-            SParamFile.after_load(self.path)
+        if Settings.network_cache and self._nw is not None:
+            NetworkCache.put(self.path, self._nw, self._metadata)
+
+    
+    @staticmethod
+    def _load_with_skrf(path: str) -> NetworkExt:
+        try:
+            nw = NetworkExt(path)
+        except ValueError:
+            # I found this bizarre file in my collection where each line is preceeded with a space... attempt to fix that...
+            fixed = False
+            with open(path, 'r') as fp:
+                lines = fp.readlines()
+            for i,line in enumerate(lines):
+                if line.startswith(' '):
+                    if '#' in line or '!' in line:
+                        lines[i] = line.strip()
+                        fixed = True
+            if not fixed:
+                raise
+            with tempfile.TemporaryDirectory() as temp_dir:
+                name = os.path.split(path)[1]
+                temp_path = os.path.join(temp_dir, name)
+                with open(temp_path, 'w') as fp:
+                    fp.writelines(lines)
+                nw = NetworkExt.Network(temp_path)
+
+        # I think there is a bug in skrf; I only get the 1st comment line
+        # As a workaround, read the comments manually
+        comments_lines = []
+        with open(path, 'r') as fp:
+            for line in fp.readlines():
+                if line.startswith('!'):
+                    comments_lines.append(line[1:-1])
+        if len(comments_lines) > 0:
+            nw.comments = '\n'.join(strip_common(comments_lines))
+        
+        return nw
 
     
     @property
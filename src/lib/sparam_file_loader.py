@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+from .sparam_file import SParamFile
+from .network_cache import NetworkCache
+from .path_ext import PathExt
+from .settings import Settings
+
+import os
+import math
+import logging
+import multiprocessing
+import concurrent.futures
+from typing import Iterable
+
+
+
+def _load_archive_members(archive_path: str, arch_paths: list[str]) -> dict[str,tuple]:
+    """Runs in a worker process; returns {arch_path: (network, metadata, error)}"""
+    result = {}
+    for arch_path in arch_paths:
+        file = SParamFile(PathExt(archive_path, arch_path=arch_path))
+        file._load_data(log_errors=False)
+        result[arch_path] = (file._nw, file._metadata, file._error)
+    return result
+
+
+
+class SParamFileLoader:
+    """
+    Loads SParamFile objects in a pool of worker threads.
+
+    Files are submitted with submit(); the caller is expected to periodically call poll() from the
+    GUI thread, which returns the files that have finished loading in the meantime. The hooks
+    SParamFile.before_load and SParamFile.after_load are only called from submit(), poll() and cancel(),
+    i.e. never from a worker thread.
+
+    When many members of the same archive are submitted at once, they are decompressed and parsed in
+    a pool of worker processes instead, in batches, so that all CPU cores can be used.
+    """
+
+
+    MIN_ARCHIVE_MEMBERS_FOR_PROCESSES = 32
+    MIN_ARCHIVE_BATCH_SIZE = 8
+
+
+    def __init__(self, max_workers: int|None = None, max_processes: int|None = None):
+        if max_workers is None:
+            max_workers = min(8, os.cpu_count() or 1)
+        if max_processes is None:
+            max_processes = os.cpu_count() or 1
+        self._max_workers = max_workers
+        self._max_processes = max_processes
+        self._executor: concurrent.futures.ThreadPoolExecutor|None = None
+        self._process_executor: concurrent.futures.ProcessPoolExecutor|None = None
+        self._pending: dict[PathExt,tuple[SParamFile,concurrent.futures.Future]] = {}
+
+
+    def submit(self, files: Iterable[SParamFile]):
+        files_to_load = [file for file in files if not file.loaded and not self.is_pending(file)]
+        if len(files_to_load) < 1:
+            return
+        
+        if SParamFile.before_load:
+            if not SParamFile.before_load(files_to_load[0].path):
+                self.cancel()
+                return
+        
+        archive_members: dict[str,list[SParamFile]] = {}
+        for file in files_to_load:
+            if file.path.is_in_arch():
+                archive_members.setdefault(str(file.path), []).append(file)
+        
+        files_for_threads = []
+        for file in files_to_load:
+            if file.path.is_in_arch() and len(archive_members[str(file.path)]) >= SParamFileLoader.MIN_ARCHIVE_MEMBERS_FOR_PROCESSES:
+                continue  # loaded in processes
+            files_for_threads.append(file)
+        
+        for archive_path, members in archive_members.items():
+            if len(members) >= SParamFileLoader.MIN_ARCHIVE_MEMBERS_FOR_PROCESSES:
+                self._submit_archive_members(archive_path, members)
+        
+        if len(files_for_threads) > 0:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='SParamFileLoader')
+            for file in files_for_threads:
+                self._add_pending(file, self._executor.submit(file._load_data, False))
+
+
+    def _submit_archive_members(self, archive_path: str, files: list[SParamFile]):
+        if self._process_executor is None:
+            # spawn instead of fork, because forking a process that already runs threads (Qt, the thread pool) is unsafe
+            self._process_executor = concurrent.futures.ProcessPoolExecutor(max_workers=self._max_processes, mp_context=multiprocessing.get_context('spawn'),
+                initializer=NetworkCache.init_worker, initargs=(NetworkCache.get_worker_config(),))
+        
+        # batches, so that each process gets several of them, but the overhead per task stays low
+        batch_size = max(SParamFileLoader.MIN_ARCHIVE_BATCH_SIZE, math.ceil(len(files) / (self._max_processes*4)))
+        for i in range(0, len(files), batch_size):
+            batch = files[i:i+batch_size]
+            future = self._process_executor.submit(_load_archive_members, archive_path, [file.path.arch_path for file in batch])
+            for file in batch:
+                self._add_pending(file, future)
+
+
+    def _add_pending(self, file: SParamFile, future: concurrent.futures.Future):
+        if file.path in self._pending:
+            # a different object for the same path was submitted before (e.g. before the files were reloaded)
+            _, old_future = self._pending[file.path]
+            self._pending[file.path] = (file, future)
+            # archive members are loaded in batches, so the old future may still be needed for other files
+            if not any(other_future is old_future for _, other_future in self._pending.values()):
+                old_future.cancel()
+            return
+        self._pending[file.path] = (file, future)
+
+
+    def poll(self) -> list[SParamFile]:
+        """Returns the files that have been loaded (or failed to load) since the last call"""
+
+        if len(self._pending) > 0 and SParamFile.before_load:
+            # give the application a chance to abort (or to show progress)
+            first_pending_path = next(iter(self._pending.keys()))
+            if not SParamFile.before_load(first_pending_path):
+                self.cancel()
+
+        finished, loaded_in_processes = [], False
+        for path in list(self._pending.keys()):
+            file, future = self._pending[path]
+            if not future.done():
+                continue
+            del self._pending[path]
+            if future.cancelled():
+                continue
+            try:
+                result = future.result()
+                if result is not None:  # loaded in a worker process
+                    file._set_loaded_data(*result[path.arch_path])
+                    loaded_in_processes = True
+            except Exception as ex:
+                file._set_loaded_data(None, None, str(ex))
+            finished.append(file)
+            if file.error:
+                logging.warning(f'Unable to load network from "{path}" ({file.error_message})')
+            if SParamFile.after_load:
+                SParamFile.after_load(path)
+
+        if loaded_in_processes and Settings.network_cache:
+            NetworkCache.enforce_limit()  # the worker processes do not do that by themselves
+        return finished
+
+
+    def cancel(self):
+        """Cancels all files that are not yet being loaded; files that are currently being loaded will still finish"""
+        for path in list(self._pending.keys()):
+            _, future = self._pending[path]
+            if future.cancel():
+                del self._pending[path]
+                if SParamFile.after_load:
+                    SParamFile.after_load(path)  # so that the application no longer shows the file as loading
+
+
+    def is_pending(self, file: SParamFile|PathExt) -> bool:
+        if isinstance(file, SParamFile):
+            return file.path in self._pending and self._pending[file.path][0] is file
+        return file in self._pending
+
+
+    @property
+    def busy(self) -> bool:
+        return len(self._pending) > 0
+
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+
+    def shutdown(self):
+        self.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._process_executor is not None:
+            self._process_executor.shutdown(wait=False, cancel_futures=True)
+            self._process_executor = None
+        self._pending.clear()
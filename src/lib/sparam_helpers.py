@@ -5,6 +5,7 @@ from typing import Callable, Any
 from .network_ext import NetworkExt
 from .utils import window_has_argument
 from .settings import Settings
+from .grid_alignment import GridAlignment
 
 
 def _get_mixed_port_names(nw: NetworkExt) -> list[tuple[str,int]]:
@@ -49,8 +50,20 @@ def get_port_index(nw: NetworkExt, mode: str, number: int) -> int:
     raise RuntimeError(f'Cannot find port {mode}{number} in network {nw.name}')
 
 
-def irndft(f: np.ndarray, s: np.ndarray, n_samples: int = None, t_total: float = None) -> tuple[np.ndarray,np.ndarray]:
-    """ Inverse real-valued non-equidistant DFT """
+IRNDFT_BLOCK_ELEMENTS = 4*1024*1024  # default memory limit of irndft(), in complex values per block
+
+
+def irndft(f: np.ndarray, s: np.ndarray, n_samples: int = None, t_total: float = None, block_size: int|None = None) -> tuple[np.ndarray,np.ndarray]:
+    """
+    Inverse real-valued non-equidistant DFT.
+
+    The time samples are evaluated in blocks of <block_size> samples, so that at most <block_size>×len(f) complex values are
+    held in memory at once (by default, about √n_samples, but not more than IRNDFT_BLOCK_ELEMENTS values). Because the time
+    samples are equidistant, the matrix e^(2jπ⋅t⋅f) of the first block can be re-used for all other blocks, by shifting the
+    S-parameters in time instead; so each block only costs one matrix-vector product.
+
+    <s> may have further axes (e.g. shape (n_frequencies, n_traces)), which are transformed at once.
+    """
     assert len(f) >= 2 and len(f) == len(s)
     
     if n_samples is None:
@@ -67,10 +80,22 @@ def irndft(f: np.ndarray, s: np.ndarray, n_samples: int = None, t_total: float =
             t_total = 1/f_step_min
     
     t = np.linspace(0, t_total*(n_samples-1)/n_samples, n_samples)
-
-    # IDFT: wave[i] = Σ_j s[j] * e^(2jπ * t[i] * f[j])
-    twopi_t_f = np.tensordot(1j * math.tau * t, f, axes=0)
-    wave = np.sum(s * np.exp(twopi_t_f), axis=1)
+    t_step = t_total / n_samples
+
+    if block_size is None:
+        # the kernel costs block_size×len(f) exponentials, and the time shifts n_samples/block_size×len(f), so √n_samples is optimal
+        block_size = min(round(math.sqrt(n_samples)), IRNDFT_BLOCK_ELEMENTS // len(f))
+    block_size = max(1, min(block_size, n_samples))
+
+    # IDFT: wave[i] = Σ_j s[j] * e^(2jπ * t[i] * f[j]), with t[i] = (i0 + k) * t_step for the k-th sample of a block starting at i0
+    twopi_f = math.tau * np.asarray(f, dtype=float)
+    s = np.asarray(s, dtype=complex)
+    block_kernel = np.exp(1j * np.outer(np.arange(block_size) * t_step, twopi_f))
+    wave = np.empty([n_samples, *s.shape[1:]], dtype=complex)
+    for i_start in range(0, n_samples, block_size):
+        i_end = min(i_start + block_size, n_samples)
+        s_shifted = s * np.exp(1j * (i_start * t_step) * twopi_f).reshape([-1] + [1]*(s.ndim-1))
+        wave[i_start:i_end] = block_kernel[:i_end-i_start] @ s_shifted
     
     return t, np.real(wave).astype(float) / len(wave) * 2
 
@@ -104,8 +129,18 @@ def get_missing_freq_dc_and_equidist(f: np.ndarray, max_rel_error: float = 1e-6)
     return True, np.linspace(0, f_first-f_step, n_steps, dtype=f.dtype)
 
 
+def interpolate_polar(f: np.ndarray, s: np.ndarray, f_new: np.ndarray) -> np.ndarray:
+    """
+    Linear interpolation of magnitude and unwrapped phase along the first axis of <s>, which may have any number of further
+    axes (e.g. shape (n_frequencies, n_ports, n_ports)). Equivalent to calling np.interp() on magnitude and phase of each
+    parameter individually (including holding the first/last value outside of <f>), but the interpolation indices and
+    weights are only calculated once per pair of grids (see GridAlignment), and all parameters are processed at once.
+    """
+    return GridAlignment.get_plan(f, f_new).apply(s)
+
+
 def interpolate_freq(f: np.ndarray, s: np.ndarray, f_new: np.ndarray) -> tuple[np.ndarray,np.ndarray]:
-    mag, pha = np.abs(s), np.unwrap(np.angle(s))
+    mag, pha = np.abs(s), np.unwrap(np.angle(s), axis=0)
 
     pha_fn = scipy.interpolate.make_interp_spline(f, pha, k=3)
     mag_fn = scipy.interpolate.make_interp_spline(f, mag, k=3)
@@ -114,7 +149,8 @@ def interpolate_freq(f: np.ndarray, s: np.ndarray, f_new: np.ndarray) -> tuple[n
     return f_new, s_new
 
 
-def interpolate_equidistant_freq(f: np.ndarray, s: np.ndarray, max_rel_error: float = 1e-6, max_abs_error = 1e-3) -> tuple[np.ndarray,np.ndarray]:
+def get_equidistant_freq(f: np.ndarray, max_rel_error: float = 1e-6, max_abs_error = 1e-3) -> np.ndarray|None:
+    """ Returns an equidistant frequency grid with the same range and number of points, or None if <f> is already equidistant """
 
     f_min, f_max, f_step = f[0], f[-1], f[1]-f[0]
     f_equidistant = np.linspace(f_min, f_max, len(f))
@@ -122,17 +158,26 @@ def interpolate_equidistant_freq(f: np.ndarray, s: np.ndarray, max_rel_error: fl
     error = f - f_equidistant
     max_error = max(np.abs(error))
     if max_error <= f_step*max_rel_error and max_error <= max_abs_error:
-        return f, s # already good enough
+        return None # already good enough
 
     if len(f) < 2:
         raise RuntimeError('Cannot interpolate S-parameters: at least two frequency samples are required')
     
+    return f_equidistant
+
+
+def interpolate_equidistant_freq(f: np.ndarray, s: np.ndarray, max_rel_error: float = 1e-6, max_abs_error = 1e-3) -> tuple[np.ndarray,np.ndarray]:
+
+    f_equidistant = get_equidistant_freq(f, max_rel_error, max_abs_error)
+    if f_equidistant is None:
+        return f, s # already good enough
+    
     f_equidistant, s_equidistant = interpolate_freq(f, s, f_equidistant)
     return f_equidistant, s_equidistant
 
 
 def extrapolate_to_dc_ieee370(f: np.ndarray, s: np.ndarray, f_extrapolate: np.ndarray = None) -> tuple[np.ndarray,np.ndarray]:
-    """ Extrapolation accoridng to IEEE370, Annex T """
+    """ Extrapolation accoridng to IEEE370, Annex T; <s> may have further axes (e.g. shape (n_frequencies, n_traces)) """
     if f_extrapolate is None:
         f_extrapolate = np.array([0])
     assert f[0] > 0 and len(f) >= 2
@@ -145,7 +190,7 @@ def extrapolate_to_dc_ieee370(f: np.ndarray, s: np.ndarray, f_extrapolate: np.nd
     int_re = scipy.interpolate.make_interp_spline(f_re, s_re, k=2)
 
     # real part: assume negative mirrorring across Y-axis (complex conjugate), use 3rd degree polynomial for interpolation
-    f_im, p_im = [-f2, -f1, 0, +f1, +f2], [-s2.imag, -s1.imag, 0, s1.imag, s2.imag]
+    f_im, p_im = [-f2, -f1, 0, +f1, +f2], [-s2.imag, -s1.imag, np.zeros_like(s1.imag), s1.imag, s2.imag]
     int_im = scipy.interpolate.make_interp_spline(f_im, p_im, k=3)
 
     s_int = int_re(f_extrapolate) + 1j*int_im(f_extrapolate)
@@ -2,14 +2,43 @@ import math
 import numpy as np
 import scipy
 import logging
+import collections
+import dataclasses
 from .utils import window_has_argument
-from .sparam_helpers import check_freqs_dc_and_equidist, get_missing_freq_dc_and_equidist, extrapolate_to_dc, interpolate_freq, interpolate_equidistant_freq, irndft
+from .grid_alignment import GridAlignment
+from .sparam_helpers import check_freqs_dc_and_equidist, get_missing_freq_dc_and_equidist, get_equidistant_freq, extrapolate_to_dc, interpolate_freq, irndft
 
 
 
 class TDR:
 
 
+    @dataclasses.dataclass
+    class Plan:
+        """Everything about a transformation that only depends on the frequency grid and the settings, not on the data"""
+        f_extrapolate: np.ndarray|None  # frequencies to extrapolate towards DC, if any
+        f_interpolate: np.ndarray|None  # frequencies to interpolate onto, if any
+        window: np.ndarray
+        n_padding: int
+        padding_factor: float
+        n_prepend: int  # zeros that are prepended to reach DC, so that the FFT can be used
+        use_fft: bool
+        f: np.ndarray  # the final frequency grid
+        t: np.ndarray|None  # the time axis, if the FFT is used
+
+
+    max_plans: int = 32
+    _plans: collections.OrderedDict[tuple,Plan] = collections.OrderedDict()
+
+    # results are cached, so that plot updates that do not change the data or the settings (e.g. moving a cursor) are fast
+    max_results: int = 512
+    max_results_size_bytes: int = 256 * 1024 * 1024
+    _results: collections.OrderedDict[tuple,tuple[tuple[np.ndarray,np.ndarray],int]] = collections.OrderedDict()  # key -> ((t, w), size)
+    _results_size_bytes: int = 0
+    hits: int = 0
+    misses: int = 0
+
+
     def __init__(self):
         self.dc_extrapolation: str|None = 'IEEE370'  # 'IEEE370', 'polar', None
         self.dc_assumption: str = 'auto'  # 'auto', 'zero_pha', 'zero_mag'
@@ -23,52 +52,210 @@ class TDR:
     
 
     def get(self, f: np.ndarray, s: np.ndarray, z0: float = 50) -> tuple[np.ndarray,np.ndarray]:
+        [(t, w)] = self.get_many([(f, s, z0)])
+        return t, w
+
+
+    def get_many(self, traces: list[tuple[np.ndarray,np.ndarray,complex]]) -> list[tuple[np.ndarray,np.ndarray]]:
+        """
+        Same as calling get(f, s, z0) for each of the given traces, but traces that share the same frequency grid are
+        transformed together, i.e. the preparation (window, padding etc.) is only done once per grid, and there is only
+        one FFT per grid. Results are cached until the data or the settings change; the returned arrays are read-only.
+        """
 
         # TODO: check quality metrics? See e.g. Shlepnev, How to Avoid Butchering S-parameters
 
+        for f,s,_ in traces:
+            if len(f) < 2 or len(f) != len(s):
+                raise ValueError('For TDR, at least 2 frequency points are needed')
+        
+        keys = [self._get_result_key(f, s, z0) for f,s,z0 in traces]
+        results: list[tuple[np.ndarray,np.ndarray]|None] = [TDR._get_cached_result(key) for key in keys]
+
+        groups: dict[tuple,list[int]] = {}
+        for i,(f,_,_) in enumerate(traces):
+            if results[i] is None:
+                groups.setdefault(GridAlignment.fingerprint(f), []).append(i)
+        
+        for indices in groups.values():
+            f = traces[indices[0]][0]
+            plan = self._get_plan(f)
+            s = self._interpolate_extrapolate(plan, f, np.stack([traces[i][1] for i in indices], axis=-1))
+            s = self._apply_window(plan, s)
+            s = self._add_padding(plan, s)
+            t, w = self._get_impulse_response(plan, s)
+            t, w = self._shift(t, w)
+            z0 = np.array([traces[i][2] for i in indices])
+            t, w = self._process_step_response(t, w, z0, plan.padding_factor)
+            for j,i in enumerate(indices):
+                results[i] = t, np.ascontiguousarray(w[:,j])
+                TDR._put_cached_result(keys[i], results[i])
+        return results
+
+
+    def get_causality(self, f: np.ndarray, s: np.ndarray, guard_periods: float = 2) -> tuple[np.ndarray,np.ndarray]:
+        """
+        Checks <s> (shape (n_frequencies, ...), e.g. all S-parameters of a network) for causality, via the Kramers-Kronig
+        relations: the spectrum is prepared like for get(), but instead of returning the impulse response, its part at
+        negative times (i.e. the second half of the periodic impulse response) is removed, and the result is transformed
+        back. This is equivalent to reconstructing the imaginary part from the real part with the Hilbert transform.
+
+        Returns the frequencies within the original range, and for each frequency the highest magnitude of the difference
+        between the original and the causal spectrum, i.e. zero if all parameters are causal. A window (e.g. Hann) should
+        be set, otherwise the truncation of the spectrum shows up as non-causal ringing.
+
+        Due to the limited bandwidth, even the impulse response of a causal network is smeared around t=0 (e.g. for an ideal
+        open), so responses within <guard_periods>/f_max before t=0 are tolerated.
+        """
+
+        s = np.asarray(s)
         if len(f) < 2 or len(f) != len(s):
-            raise ValueError('For TDR, at least 2 frequency points are needed')
-        f, s, equidistant_from_dc = self._interpolate_extrapolate(f, s)
-        s = self._apply_window(s)
-        f, s, padding_factor = self._add_padding(f, s, need_power_of_2=equidistant_from_dc)
-        t, w = self._get_impulse_response(f, s, equidistant_from_dc)
-        t, w = self._shift(t, w)
-        t, w = self._process_step_response(t, w, z0, padding_factor)
-        return t, w
+            raise ValueError('For the causality check, at least 2 frequency points are needed')
+        
+        s = s.reshape([len(f), -1])
+        s = s[:,~np.any(np.isnan(s), axis=0)]  # e.g. unused mixed-mode parameters
+        if s.shape[1] < 1:
+            raise ValueError('For the causality check, at least one valid parameter is needed')
 
+        plan = self._get_plan(f)
+        if not plan.use_fft:
+            raise ValueError('For the causality check, the frequencies must be equidistant, or interpolation must be enabled')
+        s = self._interpolate_extrapolate(plan, f, s)
+        s = self._apply_window(plan, s)
+        s = self._add_padding(plan, s)
+        if plan.n_prepend > 0:
+            s = np.concatenate([np.zeros([plan.n_prepend, *s.shape[1:]], dtype=s.dtype), s])
+        
+        w = np.fft.irfft(s, axis=0)
+        n_samples = len(w)
+        t_step = 1 / (2*plan.f[-1])
+        n_guard = min(math.ceil(guard_periods / f[-1] / t_step), n_samples//2 - 1)
+        w[n_samples//2+1:n_samples-n_guard] = 0
+        w[n_samples//2] /= 2  # the sample at the Nyquist time belongs to both halves
+        s_causal = np.fft.rfft(w, axis=0)
 
-    def _interpolate_extrapolate(self, f: np.ndarray, s: np.ndarray) -> tuple[np.ndarray,np.ndarray,bool]:
+        error = np.max(np.abs(s - s_causal), axis=1)
+        in_range = (plan.f >= f[0]) & (plan.f <= f[-1])
+        return plan.f[in_range], error[in_range]
+
+
+    def _get_result_key(self, f: np.ndarray, s: np.ndarray, z0: complex) -> tuple:
+        s = np.asarray(s)
+        data_key = (GridAlignment.fingerprint(f), s.shape, s.dtype.str, hash(s.tobytes()), complex(z0))
+        settings_key = (self.dc_extrapolation, self.dc_assumption, self.interpolation, self.window, tuple(self.window_args),
+            self.padded_length, self.shift_s, self.step_response, self.convert_to_impedance)
+        return data_key + settings_key
+
+
+    @staticmethod
+    def _get_cached_result(key: tuple) -> tuple[np.ndarray,np.ndarray]|None:
+        entry = TDR._results.get(key)
+        if entry is None:
+            TDR.misses += 1
+            return None
+        TDR._results.move_to_end(key)
+        TDR.hits += 1
+        return entry[0]
+
+
+    @staticmethod
+    def _put_cached_result(key: tuple, result: tuple[np.ndarray,np.ndarray]):
+        t, w = result
+        for array in [t, w]:
+            array.flags.writeable = False  # the cached arrays are shared between all callers
+        size_bytes = t.nbytes + w.nbytes
+        if size_bytes > TDR.max_results_size_bytes:
+            return
+        if key in TDR._results:
+            TDR._results_size_bytes -= TDR._results.pop(key)[1]
+        TDR._results[key] = (result, size_bytes)
+        TDR._results_size_bytes += size_bytes
+
+        while len(TDR._results) > TDR.max_results or TDR._results_size_bytes > TDR.max_results_size_bytes:
+            _, (_, evicted_size) = TDR._results.popitem(last=False)
+            TDR._results_size_bytes -= evicted_size
+
+
+    @staticmethod
+    def clear_cache():
+        TDR._results.clear()
+        TDR._results_size_bytes = 0
+        TDR.hits, TDR.misses = 0, 0
+
+
+    @staticmethod
+    def get_cache_stats() -> tuple[int,int,int,int]:
+        """Returns (number of entries, size in bytes, hits, misses) of the result cache"""
+        return len(TDR._results), TDR._results_size_bytes, TDR.hits, TDR.misses
+
+
+    def _get_plan(self, f: np.ndarray) -> Plan:
+        key = (GridAlignment.fingerprint(f), self.dc_extrapolation, self.interpolation, self.window, tuple(self.window_args), self.padded_length)
+        plan = TDR._plans.get(key)
+        if plan is not None:
+            TDR._plans.move_to_end(key)
+            return plan
+        
+        plan = self._make_plan(f)
+        TDR._plans[key] = plan
+        while len(TDR._plans) > TDR.max_plans:
+            TDR._plans.popitem(last=False)
+        return plan
+
+
+    def _make_plan(self, f: np.ndarray) -> Plan:
+        f_extrapolate, f_interpolate, equidistant_from_dc = self._plan_interpolate_extrapolate(f)
+        if f_extrapolate is not None:
+            f = np.concatenate([f_extrapolate, f])
+        if f_interpolate is not None:
+            f = f_interpolate
+        window = self._get_window(len(f))
+        f, n_padding, padding_factor = self._plan_padding(f, need_power_of_2=equidistant_from_dc)
+        use_fft, f, n_prepend = self._plan_impulse_response(f, equidistant_from_dc)
+
+        t = None
+        if use_fft:
+            assert check_freqs_dc_and_equidist(f) == (True,True), 'Sanity check failed, expected frequencies to be equidistant from zero'
+            n_samples = 2 * (len(f) - 1)  # length of the result of np.fft.irfft()
+            f_nyq = max(f)
+            f_sa = 2.0 * f_nyq
+            sa_period = 1.0 / f_sa
+            t_tot = (n_samples-1) * sa_period
+            t = np.linspace(0, t_tot, n_samples)
+        
+        return TDR.Plan(f_extrapolate, f_interpolate, window, n_padding, padding_factor, n_prepend, use_fft, f, t)
+
+
+    def _plan_interpolate_extrapolate(self, f: np.ndarray) -> tuple[np.ndarray|None,np.ndarray|None,bool]:
+        """Returns (frequencies to extrapolate, frequencies to interpolate, whether the result is equidistant from DC)"""
 
         starts_at_dc, is_equidistant = check_freqs_dc_and_equidist(f)
         if starts_at_dc and is_equidistant:
             # already DC and equidistant
-            return f, s, True
+            return None, None, True
         
         if starts_at_dc:
             if self.interpolation:
                 # DC OK, interpolating
-                f, s = interpolate_equidistant_freq(f, s)
-                return f, s, True
+                return None, get_equidistant_freq(f), True
             # DC OK, but skipping because interpolation is disabled
-            return f, s, False
+            return None, None, False
         
         if self.dc_extrapolation is None:
             if self.interpolation:
                 # DC missing, only interpolating
-                f, s = interpolate_equidistant_freq(f, s)
-                return f, s, False
+                return None, get_equidistant_freq(f), False
             else:
                 # DC missing, but interpolation is disabled
-                return f, s, False
+                return None, None, False
         
         assert self.dc_extrapolation is not None  # was checked above
 
         can_fix, f_missing = get_missing_freq_dc_and_equidist(f)
         if can_fix:
             # extrapolationg, while interpolation is not needed
-            f, s = extrapolate_to_dc(f, s, f_missing, method=self.dc_extrapolation, dc_assumption=self.dc_assumption)
-            assert check_freqs_dc_and_equidist(f) == (True,True)  # sanity check
-            return f, s, True
+            assert check_freqs_dc_and_equidist(np.concatenate([f_missing, f])) == (True,True)  # sanity check
+            return f_missing, None, True
         
         if not self.interpolation:
             # interpolation disabled, just adding some points towards DC
@@ -76,24 +263,32 @@ class TDR:
             f_first, f_step = f[0], f[1] - f[0]
             n_steps = round(f_first / f_step)
             f_missing = np.linspace(0, f_first-f_step, n_steps, dtype=f.dtype)
-            
-            f, s = extrapolate_to_dc(f, s, f_missing, method=self.dc_extrapolation, dc_assumption=self.dc_assumption)
-
-            return f,s, False
+            return f_missing, None, False
 
         # find a frequency grid, such that it can be extrapolated to DC in an equidistant way
         df_mean = (f[-1] - f[0]) / len(f)
         n_steps = round((f[-1] - 0) / df_mean)
         f_new = np.linspace(0, f[-1], n_steps)
         f_extrap = f_new[f_new < f[0]]
+        assert check_freqs_dc_and_equidist(f_new) == (True,True)  # sanity check
+        return f_extrap, f_new, True
 
-        f, s = extrapolate_to_dc(f, s, f_extrapolate=f_extrap, method=self.dc_extrapolation, dc_assumption=self.dc_assumption)
-        f, s = interpolate_freq(f, s, f_new)
-        assert check_freqs_dc_and_equidist(f) == (True,True)  # sanity check
-        return f, s, True
+
+    def _interpolate_extrapolate(self, plan: Plan, f: np.ndarray, s: np.ndarray) -> np.ndarray:
+        """Applies the interpolation/extrapolation of the plan to <s>, which has shape (n_frequencies, n_traces)"""
+        if plan.f_extrapolate is not None:
+            if self.dc_extrapolation == 'polar':
+                # the polar extrapolation makes individual assumptions about each trace
+                s = np.stack([extrapolate_to_dc(f, s[:,i], f_extrapolate=plan.f_extrapolate, method=self.dc_extrapolation, dc_assumption=self.dc_assumption)[1] for i in range(s.shape[1])], axis=-1)
+                f = np.concatenate([plan.f_extrapolate, f])
+            else:
+                f, s = extrapolate_to_dc(f, s, f_extrapolate=plan.f_extrapolate, method=self.dc_extrapolation, dc_assumption=self.dc_assumption)
+        if plan.f_interpolate is not None:
+            f, s = interpolate_freq(f, s, plan.f_interpolate)
+        return s
 
 
-    def _add_padding(self, f: np.ndarray, s: np.ndarray, need_power_of_2: bool) -> tuple[np.ndarray,np.ndarray,float]:
+    def _plan_padding(self, f: np.ndarray, need_power_of_2: bool) -> tuple[np.ndarray,int,float]:
         
         def get_next_power_of_2(x: int) -> int:
             next_pow_of_2 = 1
@@ -101,84 +296,80 @@ class TDR:
                 next_pow_of_2 *= 2
             return next_pow_of_2
         
-        n_target = max(len(s), self.padded_length)
+        n_target = max(len(f), self.padded_length)
         if need_power_of_2:
             n_target = get_next_power_of_2(n_target)
         
-        n_missing = n_target - len(s)
+        n_missing = n_target - len(f)
         if n_missing < 1:
             # no padding needed
-            return f, s, 1.0
+            return f, 0, 1.0
         
-        padding_factor = n_target / len(s)  # padding increases the highest spectrum frequency!
+        padding_factor = n_target / len(f)  # padding increases the highest spectrum frequency!
         
         # padding with zeros
         f_end, f_step = f[-1], f[-1] - f[-2]
         f = np.concatenate([f, np.linspace(f_end+f_step, f_end+f_step*n_missing, n_missing)])
-        s = np.concatenate([s, np.zeros([n_missing], dtype=s.dtype)])
-        return f, s, padding_factor
+        return f, n_missing, padding_factor
+
 
+    def _add_padding(self, plan: Plan, s: np.ndarray) -> np.ndarray:
+        if plan.n_padding < 1:
+            return s
+        return np.concatenate([s, np.zeros([plan.n_padding, *s.shape[1:]], dtype=s.dtype)])
 
-    def _apply_window(self, s: np.ndarray) -> np.ndarray:
+
+    def _get_window(self, n: int) -> np.ndarray:
         
         if window_has_argument(self.window):
             window_arg = (self.window, *self.window_args)
         else:
             window_arg = (self.window,)
         
-        win_2sided = scipy.signal.get_window(window_arg, 2*len(s))
-        win = win_2sided[len(s):]
-        sp_windowed = s * win
-        return sp_windowed
+        win_2sided = scipy.signal.get_window(window_arg, 2*n)
+        return win_2sided[n:]
 
 
-    def _get_impulse_response(self, f: np.ndarray, s: np.ndarray, use_fft: bool) -> tuple[np.ndarray,np.ndarray]:
+    def _apply_window(self, plan: Plan, s: np.ndarray) -> np.ndarray:
+        return s * plan.window.reshape([-1] + [1]*(s.ndim-1))
 
-        def can_use_fft(f: np.ndarray, s: np.ndarray) -> tuple[bool,np.ndarray,np.ndarray]:
-            
-            starts_at_dc, is_equidistant = check_freqs_dc_and_equidist(f)
-            
-            if not is_equidistant:
-                # not equidistant, cannot use FFT
-                return False, f, s
-            
-            if not starts_at_dc:
-                can_fix, f_missing = get_missing_freq_dc_and_equidist(f)
-                if not can_fix:
-                    # equidistant, but doesn't start at DC, cannot use FFT
-                    return False, f, s
-                
-                # just add zeros, then we are reasonably close to DC and equidistant
-                f = np.concatenate([f_missing, f])
-                s = np.concatenate([np.zeros([len(f_missing)], dtype=s.dtype), s])
-                return True, f, s
-            
-            # data starts at DC and is equidistant, can use FFT
-            return True, f, s
 
-        if not use_fft:
-            use_fft, f, s = can_use_fft(f, s)
+    def _plan_impulse_response(self, f: np.ndarray, use_fft: bool) -> tuple[bool,np.ndarray,int]:
+        """Returns (whether the FFT can be used, the final frequency grid, number of zeros to prepend)"""
         
         if use_fft:
-
-            assert check_freqs_dc_and_equidist(f) == (True,True), 'Sanity check failed, expected frequencies to be equidistant from zero'
-
-            w = np.fft.irfft(s)
-            
-            f_nyq = max(f)
-            f_sa = 2.0 * f_nyq
-            sa_period = 1.0 / f_sa
-            t_tot = (len(w)-1) * sa_period
-            t = np.linspace(0, t_tot, len(w))
-            
-            return t, w
+            return True, f, 0
         
-        else:
+        starts_at_dc, is_equidistant = check_freqs_dc_and_equidist(f)
+        
+        if not is_equidistant:
+            # not equidistant, cannot use FFT
+            return False, f, 0
+        
+        if not starts_at_dc:
+            can_fix, f_missing = get_missing_freq_dc_and_equidist(f)
+            if not can_fix:
+                # equidistant, but doesn't start at DC, cannot use FFT
+                return False, f, 0
             
-            # must use DFT
-            t, w = irndft(f, s)
+            # just add zeros, then we are reasonably close to DC and equidistant
+            return True, np.concatenate([f_missing, f]), len(f_missing)
         
-        return t, w
+        # data starts at DC and is equidistant, can use FFT
+        return True, f, 0
+
+
+    def _get_impulse_response(self, plan: Plan, s: np.ndarray) -> tuple[np.ndarray,np.ndarray]:
+
+        if plan.n_prepend > 0:
+            s = np.concatenate([np.zeros([plan.n_prepend, *s.shape[1:]], dtype=s.dtype), s])
+
+        if plan.use_fft:
+            w = np.fft.irfft(s, axis=0)
+            return plan.t, w
+        
+        # must use DFT
+        return irndft(plan.f, s)
 
 
     def _shift(self, t: np.ndarray, w: np.ndarray) -> tuple[np.ndarray,np.ndarray]:
@@ -188,14 +379,14 @@ class TDR:
         assert len(t) >= 2
         sa_period = t[1] - t[0]
         n_shift = round(self.shift_s / sa_period)
-        w = np.roll(w, n_shift)
+        w = np.roll(w, n_shift, axis=0)
         return t, w
 
 
-    def _process_step_response(self, t: np.ndarray, w: np.ndarray, z0: float, padding_factor: float) -> tuple[np.ndarray,np.ndarray]:
+    def _process_step_response(self, t: np.ndarray, w: np.ndarray, z0: np.ndarray, padding_factor: float) -> tuple[np.ndarray,np.ndarray]:
         
         if self.step_response:
-            w = np.cumsum(w)
+            w = np.cumsum(w, axis=0)
         
         if self.convert_to_impedance:
 
@@ -204,8 +395,8 @@ class TDR:
             w = z0 * (1+w) / (1-w)
             
             # ensure the resulting trace is real-valued
-            if z0.imag != 0:
-                logging.warning(f'TDR: Converting to impedance with complex-valued characteristic impedance ({z0:.3g} Ω), dropping imaginary part of result')
+            for z0_complex in z0[np.imag(z0) != 0]:
+                logging.warning(f'TDR: Converting to impedance with complex-valued characteristic impedance ({z0_complex:.3g} Ω), dropping imaginary part of result')
             w = np.real(w).astype(float)
         
         return t, w
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+from .network_ext import NetworkExt
+
+import numpy as np
+import re
+import os
+import warnings
+
+
+
+class TouchstoneReader:
+    """
+    Reader for Touchstone v1 and v2 files.
+
+    The file is read only once; comments and header are split off, and the numeric data is parsed in bulk. Features that are
+    not supported (e.g. noise data, mixed-mode order, or parameters other than S) raise a NotImplementedError, so that the caller
+    can fall back to another reader.
+    """
+
+
+    FREQ_UNITS = { 'HZ': 1.0, 'KHZ': 1e3, 'MHZ': 1e6, 'GHZ': 1e9, 'THZ': 1e12 }
+
+
+    @staticmethod
+    def is_supported(filename: str) -> bool:
+        return re.search(r'\.(s\d+p|ts)$', filename, re.I) is not None
+
+
+    def __init__(self, filename: str, data: bytes|str|None = None):
+        """
+        Reads a Touchstone file. If <data> is given, it is used as the file contents instead of reading the file; <filename> is
+        then only used to determine the number of ports from the file extension, and to name the network.
+        """
+        self.filename = filename
+        if data is None:
+            with open(filename, 'rb') as fp:
+                data = fp.read()
+        if isinstance(data, bytes):
+            data = data.decode('utf-8', errors='replace')
+
+        self.comments: list[str] = []
+        self.version = 1
+        self.n_ports: int|None = None
+        self.f_unit = 'GHZ'
+        self.param = 'S'
+        self.format = 'MA'
+        self.z0: list[float] = [50.0]
+        self.two_port_order = '21_12'
+        self.matrix_format = 'FULL'
+        self.n_freqs: int|None = None
+
+        m = re.search(r'\.s(\d+)p$', filename, re.I)
+        if m:
+            self.n_ports = int(m.group(1))
+
+        self._f, self._s = self._parse(data)
+
+
+    def _parse(self, text: str) -> tuple[np.ndarray,np.ndarray]:
+
+        data_start = self._parse_header(text)
+        data = text[data_start:]
+
+        # comments may still appear within the data block
+        if '!' in data:
+            self.comments.extend(re.findall(r'^[ \t]*!(.*?)\r?$', data, re.M))
+            data = re.sub(r'![^\n]*', '', data)
+
+        # a v2 file may contain more keywords after the network data
+        if '[' in data:
+            keyword_start = data.index('[')
+            m = re.match(r'\[([^\]]*)\]', data[keyword_start:])
+            keyword = m.group(1).strip().upper() if m else ''
+            if keyword == 'NOISE DATA':
+                raise NotImplementedError('Noise data is not supported')
+            elif keyword != 'END':
+                raise NotImplementedError(f'Unexpected keyword [{keyword}] after network data')
+            data = data[:keyword_start]
+
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('error', DeprecationWarning)  # older versions of numpy only warn about invalid data
+                values = np.fromstring(data, sep=' ')
+        except (ValueError, DeprecationWarning) as ex:
+            raise ValueError(f'Invalid numeric data in <{self.filename}> ({ex})')
+
+        return self._parse_values(values)
+
+
+    def _parse_header(self, text: str) -> int:
+        """Parses the header, and returns the index of the first character of the data block"""
+
+        option_line_found = False
+        in_info_block = False
+        reference_values: list[float]|None = None
+        pos = 0
+
+        while pos < len(text):
+            end = text.find('\n', pos)
+            if end < 0:
+                end = len(text)
+            line = text[pos:end].strip()
+            line_start, pos = pos, end+1
+
+            if not line:
+                continue
+
+            if line.startswith('!'):
+                self.comments.append(line[1:])
+                continue
+            if '!' in line:
+                line = line[:line.index('!')].strip()
+
+            if in_info_block:
+                if line.upper().startswith('[END INFORMATION]'):
+                    in_info_block = False
+                continue
+
+            if line.startswith('#'):
+                if not option_line_found:
+                    self._parse_option_line(line)
+                    option_line_found = True
+                continue
+
+            if line.startswith('['):
+                m = re.match(r'\[([^\]]*)\]\s*(.*)', line)
+                if not m:
+                    raise ValueError(f'Invalid keyword line "{line}" in <{self.filename}>')
+                keyword, arg = m.group(1).strip().upper(), m.group(2).strip()
+                reference_values = None
+                match keyword:
+                    case 'VERSION':
+                        self.version = 2
+                    case 'NUMBER OF PORTS':
+                        self.n_ports = int(arg)
+                    case 'TWO-PORT DATA ORDER':
+                        self.two_port_order = arg.upper()
+                    case 'NUMBER OF FREQUENCIES':
+                        self.n_freqs = int(arg)
+                    case 'NUMBER OF NOISE FREQUENCIES':
+                        if int(arg) > 0:
+                            raise NotImplementedError('Noise data is not supported')
+                    case 'REFERENCE':
+                        reference_values = []
+                        self.z0 = reference_values
+                        reference_values.extend([float(v) for v in arg.split()])
+                    case 'MATRIX FORMAT':
+                        self.matrix_format = arg.upper()
+                    case 'BEGIN INFORMATION':
+                        in_info_block = True
+                    case 'NETWORK DATA':
+                        return pos
+                    case 'MIXED-MODE ORDER':
+                        raise NotImplementedError('Mixed-mode order is not supported')
+                    case 'NOISE DATA':
+                        raise NotImplementedError('Noise data is not supported')
+                    case _:
+                        raise NotImplementedError(f'Keyword [{keyword}] is not supported')
+                continue
+
+            if reference_values is not None and (self.n_ports is None or len(reference_values) < self.n_ports):
+                # [Reference] may continue on the following lines
+                reference_values.extend([float(v) for v in line.split()])
+                continue
+
+            if self.version >= 2:
+                raise ValueError(f'Unexpected data before [Network Data] in <{self.filename}>')
+            return line_start
+
+        return len(text)
+
+
+    def _parse_option_line(self, line: str):
+        tokens = line[1:].upper().split()
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token in TouchstoneReader.FREQ_UNITS:
+                self.f_unit = token
+            elif token in ['S', 'Y', 'Z', 'G', 'H']:
+                self.param = token
+            elif token in ['RI', 'MA', 'DB']:
+                self.format = token
+            elif token == 'R':
+                i += 1
+                self.z0 = [float(tokens[i])]
+            else:
+                raise ValueError(f'Invalid token "{token}" in option line of <{self.filename}>')
+            i += 1
+        if self.param != 'S':
+            raise NotImplementedError(f'Parameter type {self.param} is not supported')
+
+
+    def _parse_values(self, values: np.ndarray) -> tuple[np.ndarray,np.ndarray]:
+
+        n = self.n_ports
+        if n is None:
+            raise ValueError(f'Unable to determine number of ports of <{self.filename}>')
+
+        if self.matrix_format == 'FULL':
+            n_params = n*n
+        elif self.matrix_format in ['UPPER', 'LOWER']:
+            n_params = n*(n+1)//2
+        else:
+            raise ValueError(f'Invalid matrix format "{self.matrix_format}" in <{self.filename}>')
+        values_per_freq = 1 + 2*n_params
+
+        if len(values) % values_per_freq != 0:
+            if n == 2 and self.version == 1:
+                raise NotImplementedError('Noise data is not supported')
+            raise ValueError(f'Expected a multiple of {values_per_freq} values in <{self.filename}>, got {len(values)}')
+        rows = values.reshape([-1, values_per_freq])
+
+        f = rows[:,0] * TouchstoneReader.FREQ_UNITS[self.f_unit]
+        if len(f) > 1 and np.any(np.diff(f) <= 0):
+            if n == 2 and self.version == 1:
+                raise NotImplementedError('Noise data is not supported')  # in v1, noise data starts where the frequency is not increasing anymore
+            raise ValueError(f'Frequencies in <{self.filename}> are not strictly increasing')
+        if self.n_freqs is not None and len(f) != self.n_freqs:
+            raise ValueError(f'Expected {self.n_freqs} frequencies in <{self.filename}>, got {len(f)}')
+
+        a, b = rows[:,1::2], rows[:,2::2]
+        if self.format == 'RI':
+            params = a + 1j*b
+        elif self.format == 'MA':
+            params = a * np.exp(1j*np.deg2rad(b))
+        else:  # DB
+            params = 10**(a/20) * np.exp(1j*np.deg2rad(b))
+
+        if self.matrix_format == 'FULL':
+            s = params.reshape([len(f), n, n])
+            if n == 2 and (self.version == 1 or self.two_port_order == '21_12'):
+                s = s.transpose([0,2,1])  # order is S11, S21, S12, S22
+        else:
+            s = np.empty([len(f), n, n], dtype=complex)
+            rows_idx, cols_idx = np.triu_indices(n) if self.matrix_format == 'UPPER' else np.tril_indices(n)
+            s[:,rows_idx,cols_idx] = params
+            s[:,cols_idx,rows_idx] = params
+
+        return f, s
+
+
+    def get_network(self) -> NetworkExt:
+        n = self.n_ports
+        if len(self.z0) == 1:
+            z0 = self.z0[0]
+        elif len(self.z0) == n:
+            z0 = np.array(self.z0)
+        else:
+            raise ValueError(f'Expected 1 or {n} reference impedances in <{self.filename}>, got {len(self.z0)}')
+
+        name = os.path.splitext(os.path.basename(self.filename))[0]
+        comments = '\n'.join(self.comments) if len(self.comments) > 0 else None
+        return NetworkExt(f=self._f, s=self._s, z0=z0, f_unit='Hz', name=name, comments=comments)
@@ -12,7 +12,9 @@ import zipfile
 import logging
 import tempfile
 import traceback
-from typing import Callable
+import threading
+import contextlib
+from typing import Callable, Generator
 
 
 
@@ -32,10 +34,112 @@ def is_ext_supported(ext: str) -> bool:
     return _rex_filetypes.match(ext) or _rex_archtypes.match(ext)
 
 
+class ArchivePool:
+    """
+    Keeps zip files open, so that many members can be read without re-opening (and re-parsing the directory of) the archive.
+
+    Usage:
+        with ArchivePool.open('/path/arch.zip') as zf:
+            ...
+        data = ArchivePool.read('/path/arch.zip', 'file.ext')
+    
+    Handles are reference-counted; up to MAX_IDLE handles that are not in use are kept open for later re-use, until
+    close_idle() is called. A handle is re-opened if the archive was modified in the meantime.
+    """
+
+    MAX_IDLE = 8
+
+    class _Entry:
+        def __init__(self, path: str):
+            self.stamp = ArchivePool._get_stamp(path)
+            self.zf = zipfile.ZipFile(path, 'r')
+            self.refcount = 0
+            self.stale = False
+
+    _lock = threading.Lock()
+    _entries: dict[str,_Entry] = {}
+    _idle: list[str] = []  # least recently used first
+
+
+    @staticmethod
+    def _get_stamp(path: str) -> tuple[int,int]:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+
+    @staticmethod
+    def _acquire(path: str) -> "ArchivePool._Entry":
+        key = os.path.abspath(path)
+        with ArchivePool._lock:
+            entry = ArchivePool._entries.get(key)
+            if entry is not None and entry.stamp != ArchivePool._get_stamp(key):
+                # archive was modified; the old handle is closed as soon as it is not used anymore
+                entry.stale = True
+                ArchivePool._remove(key, entry)
+                entry = None
+            if entry is None:
+                entry = ArchivePool._Entry(key)
+                ArchivePool._entries[key] = entry
+            if key in ArchivePool._idle:
+                ArchivePool._idle.remove(key)
+            entry.refcount += 1
+            return entry
+
+
+    @staticmethod
+    def _release(path: str, entry: "ArchivePool._Entry"):
+        key = os.path.abspath(path)
+        with ArchivePool._lock:
+            entry.refcount -= 1
+            if entry.refcount > 0:
+                return
+            if entry.stale:
+                entry.zf.close()
+                return
+            ArchivePool._idle.append(key)
+            while len(ArchivePool._idle) > ArchivePool.MAX_IDLE:
+                oldest_key = ArchivePool._idle[0]
+                ArchivePool._remove(oldest_key, ArchivePool._entries[oldest_key])
+
+
+    @staticmethod
+    def _remove(key: str, entry: "ArchivePool._Entry"):
+        del ArchivePool._entries[key]
+        if key in ArchivePool._idle:
+            ArchivePool._idle.remove(key)
+        if entry.refcount <= 0:
+            entry.zf.close()
+        else:
+            entry.stale = True
+
+
+    @staticmethod
+    @contextlib.contextmanager
+    def open(path: str) -> Generator[zipfile.ZipFile,None,None]:
+        entry = ArchivePool._acquire(path)
+        try:
+            yield entry.zf
+        finally:
+            ArchivePool._release(path, entry)
+
+
+    @staticmethod
+    def read(archive_path: str, path_in_archive: str) -> bytes:
+        with ArchivePool.open(archive_path) as zf:
+            return zf.read(path_in_archive)
+
+
+    @staticmethod
+    def close_idle():
+        with ArchivePool._lock:
+            for key in list(ArchivePool._idle):
+                ArchivePool._remove(key, ArchivePool._entries[key])
+
+
 def find_files_in_archive(path: str) -> list[PathExt]:
     result = []
     try:
-        with zipfile.ZipFile(path, 'r') as zf:
+        with ArchivePool.open(path) as zf:
             for internal_name in zf.namelist():
                 ext = os.path.splitext(internal_name)[1]
                 if is_ext_supported_file(ext):
@@ -45,9 +149,34 @@ def find_files_in_archive(path: str) -> list[PathExt]:
     return result
 
 
+def scan_directory(path: str) -> tuple[list[PathExt],list[PathExt],list[PathExt]]:
+    """
+    Returns (supported files, archives, sub-directories) in a directory, each sorted naturally by name. Uses the file type
+    information that os.scandir() provides with each entry, so that there is (usually) no stat() call per entry. Does not
+    log anything, so that it can be called from a worker thread.
+    """
+    files, archives, dirs = [], [], []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir():
+                    dirs.append((natural_sort_key(entry.name), entry.path))
+                elif entry.is_file():
+                    ext = os.path.splitext(entry.name)[1]
+                    if is_ext_supported_file(ext):
+                        files.append((natural_sort_key(entry.name), entry.path))
+                    elif is_ext_supported_archive(ext):
+                        archives.append((natural_sort_key(entry.name), entry.path))
+            except OSError:
+                continue  # e.g. a broken link, or no permission
+    def sorted_paths(entries: list[tuple[list,str]]) -> list[PathExt]:
+        return [PathExt(entry_path) for _,entry_path in sorted(entries, key=lambda entry: entry[0])]
+    return sorted_paths(files), sorted_paths(archives), sorted_paths(dirs)
+
+
 def load_file_from_archive(archive_path: str, path_in_archive: str, target_path: str = None) -> str:
     """ Extracts a file from an archive, returns the path of the extracted file """
-    with zipfile.ZipFile(archive_path, 'r') as zf:
+    with ArchivePool.open(archive_path) as zf:
         return zf.extract(path_in_archive, target_path)
 
 
@@ -58,6 +187,8 @@ class ArchiveFileLoader:
             # The extracted file is at <extracted_path>, in a temporary directory.
             # The directory will be deleted when you exit the context manager.
             ...
+    
+    Only use this for formats that really need a path; otherwise, read the data directly via ArchivePool.read().
     """
 
     def __init__(self, archive_path: str, path_in_archive: str):
@@ -68,7 +199,7 @@ class ArchiveFileLoader:
     def __enter__(self) -> str:
         self._tempdir = tempfile.TemporaryDirectory()
         self._tempdir_path = self._tempdir.__enter__()
-        with zipfile.ZipFile(self._archive_path, 'r') as zf:
+        with ArchivePool.open(self._archive_path) as zf:
             return zf.extract(self._path_in_archive, self._tempdir_path)
 
     def __exit__(self, exc, value, tb):
@@ -346,9 +477,23 @@ def enum_to_string(value, lut: dict):
     return lut[value]
 
 
-def choose_smart_db_scale(all_db_values: list[np.ndarray]) -> tuple[float,float]:
+def get_db_trace_summary(db_values: np.ndarray) -> np.ndarray:
+    """Returns [bottom, foot, head, top] of a trace, as required by choose_smart_db_scale_from_summaries()"""
+    QUANT_FOOT, QUANT_HEAD = 0.25, 0.67
+    this_foot, this_head = np.quantile(db_values, [QUANT_FOOT, QUANT_HEAD])
+    return np.array([np.min(db_values), this_foot, this_head, np.max(db_values)])
+
+
+def choose_smart_db_scale(all_db_values: list[np.ndarray]) -> tuple[bool,float,float]:
+    return choose_smart_db_scale_from_summaries(np.array([get_db_trace_summary(db_values) for db_values in all_db_values]))
+
+
+def choose_smart_db_scale_from_summaries(summaries: np.ndarray) -> tuple[bool,float,float]:
+    """
+    Chooses the Y-range for a set of traces, from the summaries of the individual traces (see get_db_trace_summary()),
+    which are combined in one vectorized step; <summaries> has the shape (n_traces, 4).
+    """
 
-    QUANT_FOOT, QUANT_MIDDLE, QUANT_HEAD = 0.25, 0.5, 0.67
     LONG_TAIL_HEAD_POS_PERCENT = 80
     MAX_LONGTAIL_RANGE_DB = 80
     MIN_RANGE_DB = 15
@@ -377,28 +522,23 @@ def choose_smart_db_scale(all_db_values: list[np.ndarray]) -> tuple[float,float]
         nice_top = math.ceil(top / scale) * scale + margin
         return nice_bottom, nice_top
 
-    # go over each trace, find out how to scale each one of them
-    top, base, bottom = -1e99, +1e99, +1e99
-    for db_values in all_db_values:
-        this_top = np.max(db_values)
-        (this_foot,this_middle,this_head) = np.quantile(db_values, [QUANT_FOOT, QUANT_MIDDLE, QUANT_HEAD])
-        this_bottom = np.min(db_values)
-        this_height = this_top - this_bottom
-        head_pos = (this_head-this_bottom)/this_height
-        
-        top = max(top, this_top)
-        bottom = min(bottom, this_bottom)
-        has_long_tail = head_pos >= LONG_TAIL_HEAD_POS_PERCENT/100
-        if has_long_tail:
-            # baseline lies very high, which may look like having a "long tail" (like many return-loss traces do) -> scale to base to hide the tail
-            if this_foot < this_top - MAX_LONGTAIL_RANGE_DB:
-                this_base = this_top - MAX_LONGTAIL_RANGE_DB  # do not show excessively much
-            else:
-                this_base = this_foot
-            base = min(base, this_base)
-        else:
-            # baseline is not particularly high, which may look like a "flat" trace -> use the bottom
-            base = min(base, this_bottom)
+    summaries = np.asarray(summaries, dtype=float).reshape([-1, 4])
+    if len(summaries) < 1:
+        raise ValueError('Cannot choose a scale without any trace')
+    
+    # find out how to scale each one of the traces
+    these_bottoms, these_feet, these_heads, these_tops = summaries.T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        head_pos = (these_heads-these_bottoms) / (these_tops-these_bottoms)
+    has_long_tail = head_pos >= LONG_TAIL_HEAD_POS_PERCENT/100
+    # baseline lies very high, which may look like having a "long tail" (like many return-loss traces do) -> scale to base
+    #   to hide the tail, but do not show excessively much; otherwise, the baseline is not particularly high, which may look
+    #   like a "flat" trace -> use the bottom
+    these_bases = np.where(has_long_tail, np.maximum(these_feet, these_tops - MAX_LONGTAIL_RANGE_DB), these_bottoms)
+    
+    top = float(np.nanmax(these_tops, initial=-1e99))
+    bottom = float(np.nanmin(these_bottoms, initial=+1e99))
+    base = float(np.nanmin(these_bases, initial=+1e99))
     
     full_height = top - bottom
     if full_height < MIN_RANGE_DB:
@@ -444,6 +584,52 @@ def get_subset(arr, n: int):
         return arr  # all items
 
 
+def decimate_minmax(x: np.ndarray, y: np.ndarray, n_buckets: int, x_lo: float|None = None, x_hi: float|None = None, log_x: bool = False) -> tuple[np.ndarray,np.ndarray]:
+    """
+    Reduces a trace with monotonic X-values for display, preserving its envelope: the visible X-range is split into
+    <n_buckets> buckets (e.g. one per pixel), and from each bucket only the first, last, minimum and maximum point are kept.
+    Points outside of [x_lo,x_hi] are dropped, except for the nearest one on each side, so that the line still continues
+    beyond the edges of the plot. Returns the input unchanged if it has less than 4 points per bucket anyway.
+    """
+    n_all = len(x)
+    if n_all < 1:
+        return x, y
+    i_start = max(0, np.searchsorted(x, x_lo, side='left')-1) if x_lo is not None else 0
+    i_end = min(n_all, np.searchsorted(x, x_hi, side='right')+1) if x_hi is not None else n_all
+    x, y = x[i_start:i_end], y[i_start:i_end]
+    n = len(x)
+    if n <= 4*n_buckets:
+        return x, y
+    if log_x and x[0] <= 0:
+        # a logarithmic axis has no place for these (typically just the DC point), so they are kept as they are
+        i_pos = np.searchsorted(x, 0, side='right')
+        x_pos, y_pos = decimate_minmax(x[i_pos:], y[i_pos:], n_buckets, x_lo, x_hi, log_x)
+        return np.concatenate([x[:i_pos], x_pos]), np.concatenate([y[:i_pos], y_pos])
+
+    # only the range that is actually covered by data is split into buckets
+    pos_lo = max(x_lo, x[0]) if x_lo is not None else x[0]
+    pos_hi = min(x_hi, x[-1]) if x_hi is not None else x[-1]
+    pos = x
+    if log_x:
+        pos, pos_lo, pos_hi = np.log10(pos), np.log10(pos_lo), np.log10(pos_hi)
+    if not pos_hi > pos_lo:
+        return x, y
+    bucket = np.clip(((pos - pos_lo) / (pos_hi - pos_lo) * n_buckets).astype(int), 0, n_buckets-1)
+
+    # X is monotonic, so each bucket is a contiguous slice
+    starts = np.flatnonzero(np.diff(bucket, prepend=-1))
+    ends = np.append(starts[1:], n) - 1
+    counts = ends - starts + 1
+    def first_index_of(mask: np.ndarray) -> np.ndarray:
+        idx = np.flatnonzero(mask)
+        return idx[np.diff(bucket[idx], prepend=-1) != 0]
+    with np.errstate(invalid='ignore'):
+        y_min = np.repeat(np.fmin.reduceat(y, starts), counts)
+        y_max = np.repeat(np.fmax.reduceat(y, starts), counts)
+    idx = np.unique(np.concatenate([starts, ends, first_index_of(y == y_min), first_index_of(y == y_max)]))
+    return x[idx], y[idx]
+
+
 def strip_common(str_or_lines: str|list[str]) -> str|list[str]:
     if isinstance(str_or_lines, str):
         return '\n'.join(strip_common(str_or_lines.splitlines()))
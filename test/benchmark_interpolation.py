@@ -0,0 +1,60 @@
+"""
+Compares the vectorized S-parameter interpolation against the previous per-parameter loop, for different port counts.
+Run from the repository root: `python test/benchmark_interpolation.py`
+"""
+
+import sys, os
+sys.path.extend([os.path.abspath('../src'), os.path.abspath('./src')])
+
+from lib import interpolate_polar
+
+import time
+import numpy as np
+
+
+
+N_REPEAT = 5
+POINT_COUNTS = [201, 1001]
+PORT_COUNTS = [1, 2, 4, 8, 16, 24, 32]
+
+
+
+def benchmark(fn, n_repeat: int = N_REPEAT) -> float:
+    t_best = float('inf')
+    for _ in range(n_repeat):
+        t_start = time.perf_counter()
+        fn()
+        t_best = min(t_best, time.perf_counter() - t_start)
+    return t_best
+
+
+def interpolate_per_param(f: np.ndarray, s: np.ndarray, f_new: np.ndarray) -> np.ndarray:
+    """The previous implementation of Network._get_interpolated_sparams()"""
+    s_new = np.ndarray([len(f_new),*s.shape[1:]], dtype=complex)
+    for ep in range(s.shape[1]):
+        for ip in range(s.shape[2]):
+            mag, pha = np.abs(s[:,ep,ip]), np.unwrap(np.angle(s[:,ep,ip]))
+            s_new[:,ep,ip] = np.interp(f_new, f, mag) * np.exp(1j*np.interp(f_new, f, pha))
+    return s_new
+
+
+def compare(n_ports: int, n_points: int):
+    rng = np.random.default_rng(0)
+    f = np.linspace(10e6, 20e9, n_points)
+    f_new = np.unique(np.concatenate([f, np.linspace(10e6, 20e9, n_points+7)]))  # like a binary operation on mismatched grids
+    s = (rng.normal(size=(n_points,n_ports,n_ports)) + 1j*rng.normal(size=(n_points,n_ports,n_ports))) * 0.1
+
+    assert np.allclose(interpolate_polar(f, s, f_new), interpolate_per_param(f, s, f_new))
+    t_loop = benchmark(lambda: interpolate_per_param(f, s, f_new))
+    t_vectorized = benchmark(lambda: interpolate_polar(f, s, f_new))
+    print(f'{n_ports:>3} port(s)  loop: {t_loop*1e3:8.2f} ms, vectorized: {t_vectorized*1e3:8.2f} ms, speedup: {t_loop/t_vectorized:6.1f}x')
+
+
+
+if __name__ == '__main__':
+    for i,n_points in enumerate(POINT_COUNTS):
+        if i > 0:
+            print()
+        print(f'{n_points} frequency points, interpolated to the union with a {n_points+7}-point grid:')
+        for n_ports in PORT_COUNTS:
+            compare(n_ports, n_points)
@@ -0,0 +1,68 @@
+"""
+Compares the native Touchstone reader against the previous scikit-rf based path.
+Run from the repository root: `python test/benchmark_touchstone.py`
+"""
+
+import sys, os
+sys.path.extend([os.path.abspath('../src'), os.path.abspath('./src')])
+
+from lib import SParamFile, TouchstoneReader
+
+import glob
+import time
+import tempfile
+import numpy as np
+import skrf
+
+
+
+N_REPEAT = 3
+SYNTHETIC_FILES = [  # (ports, points)
+    (4, 100_000),
+    (32, 10_000),
+]
+
+
+
+def benchmark(fn, n_repeat: int = N_REPEAT) -> float:
+    t_best = float('inf')
+    for _ in range(n_repeat):
+        t_start = time.perf_counter()
+        fn()
+        t_best = min(t_best, time.perf_counter() - t_start)
+    return t_best
+
+
+def compare(path: str, n_repeat: int = N_REPEAT):
+    t_skrf = benchmark(lambda: SParamFile._load_with_skrf(path), n_repeat)
+    t_native = benchmark(lambda: TouchstoneReader(path).get_network(), n_repeat)
+    print(f'{os.path.basename(path):<30} skrf: {t_skrf*1e3:10.1f} ms, native: {t_native*1e3:10.1f} ms, speedup: {t_skrf/t_native:6.1f}x')
+
+
+def make_synthetic_file(dir: str, n_ports: int, n_points: int) -> str:
+    path = os.path.join(dir, f'synthetic_{n_ports}port_{n_points}pts.s{n_ports}p')
+    rng = np.random.default_rng(0)
+    f = np.linspace(10e6, 100e9, n_points)
+    s = (rng.normal(size=(n_points,n_ports,n_ports)) + 1j*rng.normal(size=(n_points,n_ports,n_ports))) * 0.1
+    skrf.Network(f=f, f_unit='Hz', s=s, z0=50).write_touchstone(path, form='ri')
+    return path
+
+
+
+if __name__ == '__main__':
+
+    print('Sample files:')
+    for path in sorted(glob.glob(os.path.join('samples', '*.s*p'))):
+        try:
+            TouchstoneReader(path)
+        except NotImplementedError as ex:
+            print(f'{os.path.basename(path):<30} not supported by native reader ({ex})')
+            continue
+        compare(path)
+
+    print()
+    print('Synthetic files:')
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for n_ports, n_points in SYNTHETIC_FILES:
+            path = make_synthetic_file(temp_dir, n_ports, n_points)
+            compare(path, n_repeat=1)
@@ -1,5 +1,10 @@
 from testlib import MyTestCase
-from lib import Lock
+from lib import Lock, SParamFile, SParamFileLoader, NetworkExt, PathExt
+
+import os
+import time
+import zipfile
+import tempfile
 
 
 
@@ -35,3 +40,106 @@ class TestAsync(MyTestCase):
 
         with self.subTest():
             self.assertFalse(lock.locked)
+
+
+    def test_sparamfile_loader(self):
+        files = [SParamFile(str(path)) for path in sorted(self.sample_dir.glob('*.s*p'))]
+        loader = SParamFileLoader(max_workers=4)
+        loader.submit(files)
+
+        finished = []
+        t_start = time.monotonic()
+        while loader.busy and time.monotonic()-t_start < 30:
+            finished.extend(loader.poll())
+            time.sleep(10e-3)
+        loader.shutdown()
+        
+        with self.subTest():
+            self.assertFalse(loader.busy)
+        with self.subTest():
+            self.assertEqual(len(finished), len(files))
+        for file in files:
+            with self.subTest(file=file.name):
+                self.assertTrue(file.loaded)
+                self.assertArrayAlmostEqual(file.nw.s, NetworkExt(str(file.path)).s)
+
+
+    def test_sparamfile_loader_archive(self):
+        with tempfile.TemporaryDirectory() as wdir:
+            zippath = os.path.join(wdir, 'test.zip')
+            n_members = SParamFileLoader.MIN_ARCHIVE_MEMBERS_FOR_PROCESSES + 5
+            with zipfile.ZipFile(zippath, 'w') as zf:
+                for i in range(n_members):
+                    zf.writestr(f'file{i}.s1p', f'# Hz S RI R 50\n1 {i/n_members} 0\n2 0 {i/n_members}\n')
+            
+            files = [SParamFile(PathExt(zippath, arch_path=f'file{i}.s1p')) for i in range(n_members)]
+            loader = SParamFileLoader(max_processes=2)
+            loader.submit(files)
+
+            finished = []
+            t_start = time.monotonic()
+            while loader.busy and time.monotonic()-t_start < 60:
+                finished.extend(loader.poll())
+                time.sleep(10e-3)
+            loader.shutdown()
+
+            with self.subTest():
+                self.assertEqual(len(finished), n_members)
+            for i,file in enumerate(files):
+                with self.subTest(file=file.name):
+                    self.assertTrue(file.loaded)
+                    self.assertArrayAlmostEqual(file.nw.s[:,0,0], [i/n_members, 1j*i/n_members])
+
+
+    def test_sparamfile_loader_archive_resubmit(self):
+        with tempfile.TemporaryDirectory() as wdir:
+            zippath = os.path.join(wdir, 'test.zip')
+            n_members = SParamFileLoader.MIN_ARCHIVE_MEMBERS_FOR_PROCESSES + 5
+            with zipfile.ZipFile(zippath, 'w') as zf:
+                for i in range(n_members):
+                    zf.writestr(f'file{i}.s1p', f'# Hz S RI R 50\n1 {i/n_members} 0\n2 0 {i/n_members}\n')
+            
+            files = [SParamFile(PathExt(zippath, arch_path=f'file{i}.s1p')) for i in range(n_members)]
+            loader = SParamFileLoader(max_processes=1)
+            loader.submit(files)
+            # the same path again, as a new object (e.g. after a reload); the other members of its batch must still load
+            files[-1] = SParamFile(PathExt(zippath, arch_path=f'file{n_members-1}.s1p'))
+            loader.submit([files[-1]])
+
+            finished = []
+            t_start = time.monotonic()
+            while loader.busy and time.monotonic()-t_start < 60:
+                finished.extend(loader.poll())
+                time.sleep(10e-3)
+            loader.shutdown()
+
+            with self.subTest():
+                self.assertEqual(len(finished), n_members)
+            for i,file in enumerate(files):
+                with self.subTest(file=file.name):
+                    self.assertTrue(file.loaded)
+                    self.assertArrayAlmostEqual(file.nw.s[:,0,0], [i/n_members, 1j*i/n_members])
+
+
+    def test_sparamfile_loader_cancel(self):
+        files = [SParamFile(str(path)) for path in sorted(self.sample_dir.glob('*.s*p'))]
+        loader = SParamFileLoader(max_workers=1)
+        loader.submit(files)
+        after_load = SParamFile.after_load
+        try:
+            finished_paths = []
+            SParamFile.after_load = finished_paths.append
+            loader.cancel()
+        finally:
+            SParamFile.after_load = after_load
+
+        with self.subTest():  # the application must be notified about every file that is no longer pending
+            self.assertGreater(len(finished_paths), 0)
+            for file in files:
+                self.assertEqual(file.path in finished_paths, not loader.is_pending(file))
+        
+        loader.shutdown()
+        with self.subTest():
+            self.assertFalse(loader.busy)
+        with self.subTest():  # cancelled files must still be loadable on demand
+            self.assertIsNotNone(files[-1].nw)
@@ -1,9 +1,11 @@
 from testlib import MyTestCase
-from lib import SParamFile, PathExt, CitiWriter
+from lib import SParamFile, PathExt, CitiWriter, NetworkCache, TouchstoneReader, ArchivePool, find_files_in_archive
 import os
 import skrf
 import zipfile
 import tempfile
+import shutil
+import numpy as np
 
 
 
@@ -71,3 +73,124 @@ class TestFileFormats(MyTestCase):
                 self.assertEqual(len(f.nw.f), 3)
                 self.assertArrayAlmostEqual(f.nw.z0_simple, [50])
                 self.assertSequenceEqual(f.nw.port_modes, ['S'])
+
+
+    def test_network_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir, tempfile.TemporaryDirectory() as wdir:
+            NetworkCache.directory = cache_dir
+            try:
+                path = os.path.join(wdir, 'test.s2p')
+                shutil.copy(self.sample_dir.joinpath('line-line-line.s2p'), path)
+
+                self.assertIsNone(NetworkCache.get(PathExt(path)))
+                
+                f_orig = SParamFile(path)
+                NetworkCache.put(f_orig.path, f_orig.nw, f_orig.metadata)
+                cached = NetworkCache.get(PathExt(path))
+                with self.subTest():
+                    self.assertIsNotNone(cached)
+                nw, _ = cached
+                with self.subTest():
+                    self.assertArrayEqual(nw.f, f_orig.nw.f)
+                    self.assertArrayEqual(nw.s, f_orig.nw.s)
+                    self.assertArrayEqual(nw.z0, f_orig.nw.z0)
+                    self.assertEqual(nw.comments, f_orig.nw.comments)
+                
+                # modifying the file must invalidate the entry
+                with open(path, 'a') as fp:
+                    fp.write('! modified\n')
+                with self.subTest():
+                    self.assertIsNone(NetworkCache.get(PathExt(path)))
+                
+                # eviction
+                NetworkCache.max_size_bytes = 1
+                NetworkCache.put(f_orig.path, f_orig.nw, f_orig.metadata)
+                with self.subTest():
+                    self.assertEqual(len(os.listdir(cache_dir)), 0)
+                
+                # worker processes leave the eviction to the process that started them
+                NetworkCache.init_worker(NetworkCache.get_worker_config())
+                NetworkCache.put(f_orig.path, f_orig.nw, f_orig.metadata)
+                with self.subTest():
+                    self.assertEqual(len(os.listdir(cache_dir)), 1)
+                NetworkCache._evict = True
+                NetworkCache.enforce_limit()
+                with self.subTest():
+                    self.assertEqual(len(os.listdir(cache_dir)), 0)
+
+            finally:
+                NetworkCache.directory = None
+                NetworkCache.max_size_bytes = None
+                NetworkCache._total_size_bytes = None
+                NetworkCache._evict = True
+
+
+    def test_touchstone_reader(self):
+        for path in self.sample_dir.glob('*.s?p'):
+            try:
+                reader = TouchstoneReader(str(path))
+            except NotImplementedError:
+                continue  # e.g. noise data, which is handled by the fallback
+            nw = reader.get_network()
+            nw_skrf = skrf.Network(str(path))
+            with self.subTest(path=path.name):
+                self.assertArrayAlmostEqual(nw.f, nw_skrf.f)
+                self.assertArrayAlmostEqual(nw.s, nw_skrf.s)
+                self.assertArrayAlmostEqual(nw.z0, nw_skrf.z0)
+
+
+    def test_touchstone_reader_formats(self):
+        s = np.array([[0.1+0.2j, 0.3-0.4j], [0.5+0.6j, -0.7-0.8j]])
+        def fmt(x, format):
+            if format == 'RI':
+                return f'{x.real} {x.imag}'
+            elif format == 'MA':
+                return f'{abs(x)} {np.angle(x,deg=True)}'
+            else:
+                return f'{20*np.log10(abs(x))} {np.angle(x,deg=True)}'
+        
+        for format in ['RI', 'MA', 'DB']:
+            # v1, with leading whitespace and inline comments; 2-port order is S11 S21 S12 S22
+            text = f'  ! comment\n  # MHz S {format} R 75\n  1 {fmt(s[0,0],format)} {fmt(s[1,0],format)} ! inline\n  {fmt(s[0,1],format)} {fmt(s[1,1],format)}\n'
+            nw = TouchstoneReader('test.s2p', text).get_network()
+            with self.subTest(version=1, format=format):
+                self.assertArrayAlmostEqual(nw.f, [1e6])
+                self.assertArrayAlmostEqual(nw.s[0], s)
+                self.assertArrayAlmostEqual(nw.z0_simple, [75,75])
+            
+            # v2, upper matrix, per-port reference spanning two lines
+            s_sym = np.array([[s[0,0], s[0,1]], [s[0,1], s[1,1]]])
+            text = f'[Version] 2.0\n# Hz S {format} R 50\n[Number of Ports] 2\n[Two-Port Data Order] 12_21\n[Number of Frequencies] 1\n[Reference] 50\n 100\n[Matrix Format] Upper\n[Network Data]\n10 {fmt(s[0,0],format)} {fmt(s[0,1],format)}\n{fmt(s[1,1],format)}\n[End]\n'
+            nw = TouchstoneReader('test.ts', text).get_network()
+            with self.subTest(version=2, format=format):
+                self.assertArrayAlmostEqual(nw.f, [10])
+                self.assertArrayAlmostEqual(nw.s[0], s_sym)
+                self.assertArrayAlmostEqual(nw.z0_simple, [50,100])
+
+
+    def test_archive_pool(self):
+        with tempfile.TemporaryDirectory() as wdir:
+            zippath = os.path.join(wdir, 'test.zip')
+            with zipfile.ZipFile(zippath, 'w') as zf:
+                zf.writestr('a.s1p', '# Hz S RI R 50\n1 0.5 0\n')
+            
+            with ArchivePool.open(zippath) as zf1:
+                with ArchivePool.open(zippath) as zf2:
+                    with self.subTest():
+                        self.assertIs(zf1, zf2)
+            with self.subTest():
+                self.assertEqual(ArchivePool.read(zippath, 'a.s1p'), b'# Hz S RI R 50\n1 0.5 0\n')
+            
+            # modifying the archive must re-open it
+            with zipfile.ZipFile(zippath, 'a') as zf:
+                zf.writestr('b.s1p', '# Hz S RI R 50\n1 0.25 0\n')
+            with self.subTest():
+                self.assertEqual([p.arch_path for p in find_files_in_archive(zippath)], ['a.s1p', 'b.s1p'])
+            
+            f = SParamFile(PathExt(zippath, arch_path='b.s1p'))
+            with self.subTest():
+                self.assertArrayAlmostEqual(f.nw.s[:,0,0], [0.25])
+            
+            ArchivePool.close_idle()
+            with self.subTest():
+                self.assertEqual(len(ArchivePool._entries), 0)
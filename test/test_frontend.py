@@ -1,10 +1,13 @@
 from testlib import MyTestCase
 from lib import NetworkExt, ExpressionParser, SParamFile
 from lib.expressions.sparams import SParam, SParams
-from lib.expressions.networks import Network, Networks
+from lib.expressions.networks import Network, Networks, PostponedNetwork
+from lib.expressions.components import Components as Comp
+from lib.expressions.operation_cache import OperationCache
 import math
 import logging
 import numpy as np
+from typing import Callable
 
 
 
@@ -203,3 +206,377 @@ class TestPlotting(MyFrontendTestCase):
     def test_networks_plot_multiple(self):
         nw = self.get_dummy_networks(3)
         nw.s(2,1).plot()
+
+
+
+
+class TestStatistics(MyFrontendTestCase):
+
+
+    def get_dummy_sparams(self, n: int, grids: int = 1, grid_fn: Callable = np.linspace) -> SParams:
+        rng = np.random.default_rng(0)
+        sps = []
+        for i in range(n):
+            f = grid_fn(1e9, 10e9, 101 + i%grids)
+            s = (1 + 0.1*rng.normal(size=len(f))) * np.exp(1j*(rng.normal(size=len(f)) - f/1e9))
+            sps.append(SParam(f'sp{i}', f, s, 50))
+        return SParams(sps=sps)
+
+
+    def test_shared_grid_is_kept(self):
+        sps = self.get_dummy_sparams(8, grid_fn=np.geomspace)
+        self.assertArrayAlmostEqual(sps.mean().sps[0].f, sps.sps[0].f)
+
+
+    def test_same_as_interpolated(self):
+        sps = self.get_dummy_sparams(8, grids=3)
+        s_interpolated = np.stack([sp.s for sp in sps.interpolate().sps])
+        with self.subTest('mean'):
+            self.assertArrayAlmostEqual(sps.mean(in_db=False).sps[0].s, np.mean(s_interpolated, axis=0))
+        with self.subTest('max'):
+            self.assertArrayAlmostEqual(sps.max(in_db=False).sps[0].s, np.max(np.abs(s_interpolated), axis=0))
+
+
+    def test_streaming(self):
+        for grids in [1, 3]:
+            sps = self.get_dummy_sparams(20, grids=grids)
+            for name in ['mean', 'sdev', 'min', 'max', 'pkpk']:
+                for in_db in [True, False]:
+                    with self.subTest(f'{name}, {grids} grid(s), in_db={in_db}'):
+                        expected = getattr(sps, name)(in_db=in_db).sps[0]
+                        actual = getattr(sps, name)(in_db=in_db, streaming=True).sps[0]
+                        self.assertArrayAlmostEqual(actual.f, expected.f)
+                        self.assertArrayAlmostEqual(actual.s, expected.s)
+
+
+    def test_too_few_after_interpolation(self):
+        sps = SParams(sps=[SParam(f'empty{i}', np.array([]), np.array([], dtype=complex), 50, param_type='empty') for i in range(2)])
+        for streaming in [False, True]:
+            for name in ['mean', 'sdev', 'max']:
+                with self.subTest(name, streaming=streaming):
+                    self.assertEqual(len(getattr(sps, name)(streaming=streaming).sps), 0)
+
+
+    def test_real_values_are_interpolated_linearly(self):
+        zero = SParam('zero', np.array([0., 1., 2.]), np.zeros(3), 50, param_type='zero')
+        for s in [[-10., 10.], [170., -170.]]:
+            sp = SParam('sp', np.array([0., 2.]), np.array(s), 50, param_type='sp')
+            with self.subTest(s=s, op='add'):
+                self.assertArrayAlmostEqual((zero + sp).s, [s[0], (s[0]+s[1])/2, s[1]])
+            with self.subTest(s=s, op='interpolate'):
+                self.assertArrayAlmostEqual(SParams(sps=[sp]).interpolate_lin(0, 2, 3).sps[0].s, [s[0], (s[0]+s[1])/2, s[1]])
+        with self.subTest('complex values are still interpolated by magnitude and phase'):
+            sp = SParam('sp', np.array([0., 2.]), np.array([1., 1j]), 50, param_type='sp')
+            self.assertAlmostEqual((SParam('zero', np.array([0., 1., 2.]), np.zeros(3, dtype=complex), 50, param_type='zero') + sp).s[1], np.exp(0.25j*math.pi))
+
+
+
+class TestOperationCache(MyFrontendTestCase):
+
+
+    def setUp(self) -> None:
+        OperationCache.clear()
+        return super().setUp()
+
+
+    def test_repeated_operation_is_cached(self):
+        files = self.get_dummy_sparam_files(2, n_ports=2)
+        result1 = Networks(files).invert()
+        hits_before = OperationCache.hits
+        result2 = Networks(files).invert()
+        with self.subTest('cache hits'):
+            self.assertEqual(OperationCache.hits - hits_before, 2)
+        with self.subTest('same result, but independent objects'):
+            for nw1, nw2 in zip(result1.nws, result2.nws):
+                self.assertIsNot(nw1, nw2)
+                self.assertIs(nw1.nw, nw2.nw)
+                self.assertEqual(nw1.name, nw2.name)
+                self.assertIsNot(nw1.original_files, nw2.original_files)
+
+
+    def test_deembedding_is_cached(self):
+        fixture, dut = self.get_dummy_sparam_files(2, n_ports=2)
+        expression = 'sp = (~Networks([fixture]) ** Networks([dut])).s(2,1)'
+        vars1 = dict(Networks=Networks, fixture=fixture, dut=dut)
+        exec(expression, vars1)
+        misses_before = OperationCache.misses
+        vars2 = dict(Networks=Networks, fixture=fixture, dut=dut)
+        exec(expression, vars2)
+        self.assertEqual(OperationCache.misses, misses_before)
+        self.assertArrayEqual(vars1['sp'].sps[0].s, vars2['sp'].sps[0].s)
+
+
+    def test_different_arguments_or_files_are_not_mixed_up(self):
+        file1, file2 = self.get_dummy_sparam_files(2, n_ports=2)
+        nws1 = Networks([file1])
+        with self.subTest('arguments'):
+            a = nws1.crop_f(1e9, 2e9).nws[0].nw
+            b = nws1.crop_f(1e9, 3e9).nws[0].nw
+            self.assertNotEqual(len(a.f), len(b.f))
+        with self.subTest('files'):
+            a = Networks([file1]).invert().nws[0].nw
+            b = Networks([file2]).invert().nws[0].nw
+            self.assertIsNot(a, b)
+        with self.subTest('reloaded file'):
+            reloaded = SParamFile(file1.path)
+            reloaded._nw = file1._nw.copy()
+            reloaded._nw.s = reloaded._nw.s * 0.5
+            a = Networks([file1]).invert().nws[0].nw
+            b = Networks([reloaded]).invert().nws[0].nw
+            self.assertFalse(np.allclose(a.s, b.s))
+
+
+    def test_cache_is_bounded(self):
+        max_entries = OperationCache.max_entries
+        try:
+            OperationCache.max_entries = 3
+            nws = Networks(self.get_dummy_sparam_files(1, n_ports=2))
+            for f_stop in [2e9, 3e9, 4e9, 5e9, 6e9]:
+                nws.crop_f(1e9, f_stop)
+            self.assertEqual(OperationCache.count(), 3)
+        finally:
+            OperationCache.max_entries = max_entries
+
+
+
+class TestQualityReport(MyFrontendTestCase):
+
+
+    def test_same_in_processes(self):
+        paths = [self.sample_dir.joinpath(name) for name in ['lpf.s2p', 'amp.s2p', 'open.s1p', 'coupler_4port.s4p', 'missing.s2p']]
+        inline = Networks.quality_report([SParamFile(path) for path in paths], max_processes=1)
+        min_files = Networks.MIN_FILES_FOR_QUALITY_REPORT_PROCESSES
+        try:
+            Networks.MIN_FILES_FOR_QUALITY_REPORT_PROCESSES = 1
+            in_processes = Networks.quality_report([SParamFile(path) for path in paths], max_processes=2)
+        finally:
+            Networks.MIN_FILES_FOR_QUALITY_REPORT_PROCESSES = min_files
+        
+        for path, (summary_a, error_a), (summary_b, error_b) in zip(paths, inline, in_processes):
+            with self.subTest(path.name):
+                if path.name == 'missing.s2p':
+                    self.assertIsNone(summary_a)
+                    self.assertIsNotNone(error_a)
+                    self.assertIsNotNone(error_b)
+                    continue
+                self.assertIsNone(error_a)
+                self.assertEqual(list(summary_a.keys()), Network.QUALITY_SUMMARY_METRICS)
+                np.testing.assert_allclose(list(summary_a.values()), list(summary_b.values()))
+        
+        with self.subTest('metrics'):
+            lpf, amp, open_ = inline[0][0], inline[1][0], inline[2][0]
+            self.assertLess(lpf['passivity'], 1e-6)
+            self.assertGreater(amp['passivity'], 1)
+            self.assertTrue(math.isnan(open_['reciprocity']))
+            self.assertLess(lpf['causality'], 0.01)
+
+
+    def test_abort(self):
+        files = [SParamFile(self.sample_dir.joinpath('lpf.s2p')) for _ in range(3)]
+        with self.subTest('inline'):
+            results = Networks.quality_report(files, progress_fn=lambda n_done, n_total: n_done < 1, max_processes=1)
+            self.assertIsNotNone(results[0][0])
+            self.assertEqual(results[1:], [(None, None)]*2)
+        
+        with self.subTest('in processes'):
+            min_files = Networks.MIN_FILES_FOR_QUALITY_REPORT_PROCESSES
+            try:
+                Networks.MIN_FILES_FOR_QUALITY_REPORT_PROCESSES = 1
+                results = Networks.quality_report(files*8, progress_fn=lambda n_done, n_total: False, max_processes=2)
+            finally:
+                Networks.MIN_FILES_FOR_QUALITY_REPORT_PROCESSES = min_files
+            self.assertEqual(len(results), len(files)*8)
+            self.assertIn((None, None), results)
+
+
+
+class TestComponents(MyFrontendTestCase):
+
+
+    def get_networks_on_different_grids(self) -> Networks:
+        files = self.get_dummy_sparam_files(2, n_ports=2)
+        nw = files[1]._nw
+        files[1]._nw = NetworkExt(f=nw.f[::3], s=nw.s[::3], f_unit='Hz', z0=nw.z0[0])
+        return Networks(files)
+
+
+    def test_postponed_operation_on_all_networks(self):
+        nws = self.get_networks_on_different_grids()
+        postponed = nws ** Comp.LSer(1e-9).shunt()
+        direct = nws ** Comp.LShunt(1e-9)
+        for a, b in zip(postponed.nws, direct.nws):
+            with self.subTest(len(a.nw.f)):
+                self.assertArrayAlmostEqual(a.nw.s, b.nw.s)
+
+
+    def test_cascaded_components(self):
+        nws = self.get_networks_on_different_grids()
+        postponed = nws ** (Comp.LSer(1e-9) ** Comp.CShunt(1e-12))
+        direct = (nws ** Comp.LSer(1e-9)) ** Comp.CShunt(1e-12)
+        for a, b in zip(postponed.nws, direct.nws):
+            with self.subTest(len(a.nw.f)):
+                self.assertArrayAlmostEqual(a.nw.s, b.nw.s)
+
+
+    def test_postponed_operations_are_not_copied(self):
+        component = Comp.LSer(1e-9).nws[0]
+        postponed = component.shunt().shunt()
+        self.assertIsInstance(postponed, PostponedNetwork)
+        self.assertIs(postponed._input._input, component)
+
+
+
+class TestBatchedNetworks(MyFrontendTestCase):
+
+
+    def setUp(self) -> None:
+        OperationCache.clear()
+        return super().setUp()
+
+
+    def get_dummy_networks(self, n: int, n_ports: int|None = None, z0: "list[float]|None" = None) -> "Networks":
+        files = self.get_dummy_sparam_files(n, n_ports)
+        for i,file in enumerate(files):
+            file._nw.name = f'nw{i}'  # some operations name their result after the underlying network
+            if z0 is not None:
+                file._nw.z0 = z0
+        return Networks(nws=files)
+
+
+    def evaluate(self, fn: "Callable[[],Networks|SParams]", batched: bool) -> "list[tuple]":
+        OperationCache.clear()
+        min_networks, batched_op = Networks.MIN_NETWORKS_FOR_BATCHING, Networks._batched_op
+        self.batched_op_count = 0
+        def counting_batched_op(*args, **kwargs):
+            result = batched_op(*args, **kwargs)
+            if result is not None:
+                self.batched_op_count += 1
+            return result
+        try:
+            Networks._batched_op = staticmethod(counting_batched_op)
+            if not batched:
+                Networks.MIN_NETWORKS_FOR_BATCHING = 1_000_000
+            result = fn()
+        finally:
+            Networks.MIN_NETWORKS_FOR_BATCHING, Networks._batched_op = min_networks, staticmethod(batched_op)
+        if isinstance(result, Networks):
+            return [(nw.name, nw.nw.f, nw.nw.s, nw.nw.z0, nw.original_files) for nw in result.nws]
+        return [(sp.name, sp.f, sp.s, sp.z0, sp.original_files) for sp in result.sps]
+
+
+    def assertSameAsUnbatched(self, fn: "Callable[[],Networks|SParams]", expect_batched: bool = True):
+        batched = self.evaluate(fn, True)
+        self.assertEqual(self.batched_op_count > 0, expect_batched)
+        unbatched = self.evaluate(fn, False)
+        self.assertEqual(len(batched), len(unbatched))
+        for (name_b, f_b, s_b, z0_b, files_b), (name_u, f_u, s_u, z0_u, files_u) in zip(batched, unbatched):
+            self.assertEqual(name_b, name_u)
+            self.assertEqual(files_b, files_u)
+            self.assertArrayEqual(f_b, f_u)
+            np.testing.assert_allclose(s_b, s_u, rtol=1e-9, atol=1e-12)
+            np.testing.assert_allclose(z0_b, z0_u)
+
+
+    def test_unary_operations(self):
+        nws = self.get_dummy_networks(8, n_ports=2)
+        for name, fn in [
+            ('invert', lambda: ~nws),
+            ('flip', lambda: nws.flip()),
+            ('renorm', lambda: nws.renorm(25)),
+            ('k', lambda: nws.k()),
+            ('delta', lambda: nws.delta()),
+            ('b1', lambda: nws.b1()),
+            ('mu', lambda: nws.mu(2)),
+            ('mag', lambda: nws.mag()),
+            ('msg', lambda: nws.msg()),
+            ('u', lambda: nws.u()),
+        ]:
+            with self.subTest(name):
+                self.assertSameAsUnbatched(fn)
+
+
+    def test_different_port_impedances(self):
+        nws = self.get_dummy_networks(8, n_ports=2, z0=[50, 75])
+        with self.subTest('flip'):
+            self.assertSameAsUnbatched(lambda: nws.flip())
+        with self.subTest('cascade'):
+            others = self.get_dummy_networks(8, n_ports=2, z0=[50, 75])
+            self.assertSameAsUnbatched(lambda: nws ** others, expect_batched=False)
+        with self.subTest('cascade with uniform impedance'):
+            nws_75, others_75 = self.get_dummy_networks(8, n_ports=2, z0=[75, 75]), self.get_dummy_networks(8, n_ports=2, z0=[75, 75])
+            self.assertSameAsUnbatched(lambda: nws_75 ** others_75)
+
+
+    def test_binary_operations(self):
+        nws_a, nws_b = self.get_dummy_networks(8, n_ports=2), self.get_dummy_networks(8, n_ports=2)
+        fixture = self.get_dummy_networks_single(n_ports=2)
+        for name, fn in [
+            ('add', lambda: nws_a + nws_b),
+            ('sub', lambda: nws_a - nws_b),
+            ('mul', lambda: nws_a * nws_b),
+            ('div', lambda: nws_a / nws_b),
+            ('matmul', lambda: nws_a @ nws_b),
+            ('cascade', lambda: nws_a ** nws_b),
+            ('scalar', lambda: nws_a * 2.0),
+            ('de-embed broadcast fixture', lambda: ~fixture ** nws_a),
+        ]:
+            with self.subTest(name):
+                self.assertSameAsUnbatched(fn)
+
+
+    def test_fallback(self):
+        with self.subTest('different frequency grids'):
+            nws = self.get_dummy_networks(8, n_ports=2)
+            nws.nws[3] = nws.nws[3].crop_f(1e9, 5e9)
+            self.assertSameAsUnbatched(lambda: ~nws, expect_batched=False)
+        with self.subTest('different number of ports'):
+            nws = Networks([*self.get_dummy_sparam_files(4, n_ports=2), *self.get_dummy_sparam_files(4, n_ports=4)])
+            self.assertSameAsUnbatched(lambda: nws.flip(), expect_batched=False)
+        with self.subTest('errors are reported per network'):
+            nws = self.get_dummy_networks(8, n_ports=3)
+            self.assertEqual(len((nws.k()).sps), 0)
+
+
+    def test_quality_metrics(self):
+        for n_ports in [1, 2, 4]:
+            nws = self.get_dummy_networks(8, n_ports=n_ports) * 1.5  # scaled, so that the networks are not passive
+            metrics = [('passivity', lambda: nws.passivity()), ('losslessness', lambda: nws.losslessness())]
+            if n_ports >= 2:
+                metrics += [('reciprocity', lambda: nws.reciprocity()), ('symmetry', lambda: nws.symmetry())]
+            for name, fn in metrics:
+                with self.subTest(f'{name}, {n_ports} port(s)'):
+                    self.assertSameAsUnbatched(fn)
+
+
+    def test_quality_metrics_same_as_per_frequency(self):
+        nw = self.get_dummy_networks(1, n_ports=4).nws[0] * 1.5
+        s = nw.nw.s
+        with self.subTest('passivity'):
+            expected = [np.max(np.maximum(0, -np.real(np.linalg.eigvals(np.eye(4) - s[i].conj().T @ s[i])))) for i in range(len(s))]
+            np.testing.assert_allclose(nw.passivity().s, expected, atol=1e-12)
+        with self.subTest('losslessness'):
+            expected = [np.max(np.abs(s[i].T @ s[i].conj() - np.eye(4))) for i in range(len(s))]
+            np.testing.assert_allclose(nw.losslessness().s, expected, atol=1e-12)
+        with self.subTest('symmetry'):
+            expected = [np.max(np.abs(s[i].T - s[i])) + max([abs(s[i,p,p]-s[i,q,q]) for p in range(4) for q in range(4)]) for i in range(len(s))]
+            np.testing.assert_allclose(nw.symmetry().s, expected, atol=1e-12)
+
+
+    def test_quality_metrics_in_chunks(self):
+        max_bytes = Networks.MAX_METRICS_STACK_BYTES
+        try:
+            Networks.MAX_METRICS_STACK_BYTES = 1
+            nws = self.get_dummy_networks(8, n_ports=2)
+            self.assertSameAsUnbatched(lambda: nws.passivity())
+        finally:
+            Networks.MAX_METRICS_STACK_BYTES = max_bytes
+
+
+    def test_batched_results_are_cached(self):
+        nws = self.get_dummy_networks(8, n_ports=2)
+        first = ~nws
+        hits_before = OperationCache.hits
+        second = ~nws
+        self.assertEqual(OperationCache.hits - hits_before, 8)
+        for nw1, nw2 in zip(first.nws, second.nws):
+            self.assertIs(nw1.nw, nw2.nw)
@@ -1,7 +1,13 @@
 from testlib import MyTestCase
-from lib import SiFormat, SiValue, SiRange
+from lib import SiFormat, SiValue, SiRange, PlotHelper, TraceIndex, TraceSummaries, choose_smart_db_scale, choose_smart_db_scale_from_summaries
+from gui.helpers.file_watcher import FileWatcher
+from PyQt6.QtCore import QCoreApplication
+import os
+import time
+import tempfile
 import skrf
 import numpy as np
+import matplotlib.figure
 
 
 
@@ -67,3 +73,224 @@ class TestSiRange(MyTestCase):
             SiRange(spec=SiFormat('V')).parse('1kV to 2kv')
         with self.assertRaises(ValueError):
             SiRange(spec=SiFormat('V')).parse('somethinginvalid')
+
+
+
+class TestPlotHelper(MyTestCase):
+
+
+    def make_plot(self, figure: matplotlib.figure.Figure, traces: dict[str,float], previous: PlotHelper|None = None) -> PlotHelper:
+        plot = PlotHelper(figure, False, False, 'Frequency', SiFormat(unit='Hz'), False, 'Magnitude', SiFormat(), False, None, None, previous=previous)
+        f = np.linspace(1e9, 10e9, 11)
+        for name,level in traces.items():
+            plot.add(f, np.full(len(f), level), None, name, '-', None, None, None)
+        plot.render()
+        return plot
+
+
+    def test_incremental_update(self):
+        figure = matplotlib.figure.Figure()
+        plot1 = self.make_plot(figure, {'a': 1, 'c': 3})
+        lines1 = list(plot1._plot.lines)
+        axes1 = plot1._plot
+
+        plot2 = self.make_plot(figure, {'a': 1, 'b': 2, 'c': 5}, previous=plot1)
+        with self.subTest('axes and existing traces are re-used'):
+            self.assertIs(plot2._plot, axes1)
+            self.assertIs(plot2._artists[('a',1,1)], lines1[0])
+            self.assertIs(plot2._artists[('c',1,1)], lines1[1])
+            self.assertEqual(len(axes1.lines), 3)
+        with self.subTest('re-used traces are updated'):
+            self.assertArrayEqual(plot2._artists[('c',1,1)].get_ydata(), np.full(11, 5))
+            self.assertAlmostEqual(plot2.yaxis_range[1], 5, delta=0.5)
+        with self.subTest('colors and legend match a fresh plot'):
+            fresh = self.make_plot(matplotlib.figure.Figure(), {'a': 1, 'b': 2, 'c': 5})
+            self.assertEqual([item.data.color for item in plot2.plot_items], [item.data.color for item in fresh.plot_items])
+            self.assertEqual([t.get_text() for t in plot2._plot.get_legend().get_texts()], ['a', 'b', 'c'])
+
+        plot3 = self.make_plot(figure, {'b': 2}, previous=plot2)
+        with self.subTest('vanished traces are removed'):
+            self.assertIs(plot3._plot, axes1)
+            self.assertEqual(len(axes1.lines), 1)
+            self.assertEqual([line.get_label() for line in axes1.lines], ['b'])
+
+
+    def test_incompatible_axes_are_recreated(self):
+        figure = matplotlib.figure.Figure()
+        plot1 = self.make_plot(figure, {'a': 1})
+        plot2 = PlotHelper(figure, False, True, 'Real', SiFormat(), False, 'Imaginary', SiFormat(), False, None, None, previous=plot1)
+        plot2.add(np.array([0.5]), np.array([0.5]), None, 'a', '-', None, None, None)
+        plot2.render()
+        self.assertIsNot(plot2._plot, plot1._plot)
+        self.assertEqual(len(figure.axes), 1)
+
+
+    def test_decimation(self):
+        figure = matplotlib.figure.Figure()
+        plot = PlotHelper(figure, False, False, 'Frequency', SiFormat(unit='Hz'), False, 'Magnitude', SiFormat(), False, None, None)
+        f = np.linspace(1e9, 10e9, 100_001)
+        plot.add(f, np.sin(f/1e8), None, 'long', '-', None, None, None)
+        plot.render()
+        line = plot._plot.lines[0]
+        n_plotted = len(line.get_xdata())
+        with self.subTest('full resolution is kept for cursors and export'):
+            self.assertEqual(len(plot.plot_items[0].data.x.values), len(f))
+            self.assertLess(n_plotted, len(f)/10)
+        with self.subTest('decimated again after zooming'):
+            plot.set_xaxis_range(2e9, 3e9)
+            x_plotted = line.get_xdata()
+            self.assertLessEqual(len(x_plotted), n_plotted)
+            self.assertLess(np.sum(x_plotted > 3e9), 2)
+            self.assertLess(np.sum(x_plotted < 2e9), 2)
+
+
+    def test_trace_index(self):
+        rng = np.random.default_rng(0)
+        traces = {
+            'sorted': (np.linspace(0, 10, 1000), rng.normal(size=1000)),
+            'unsorted': (rng.uniform(0, 10, 1000), rng.normal(size=1000)),
+            'smith': (np.cos(np.linspace(0, 6, 1000)) * np.linspace(0, 1, 1000), np.sin(np.linspace(0, 6, 1000)) * np.linspace(0, 1, 1000)),
+        }
+        def brute_force(x, y, px, py, w, h):
+            dx = (x - px) / w if px is not None else 0
+            dy = (y - py) / h if py is not None else 0
+            dist = np.sqrt(dx**2 + dy**2)
+            return np.argmin(dist), np.min(dist)
+
+        for name, (x, y) in traces.items():
+            index = TraceIndex(x, y)
+            for px, py in [(3.3, None), (None, 0.5), (0.2, -0.1), (11, None), (-5, 3)]:
+                for w, h in [(1, 1), (10, 2)]:
+                    with self.subTest(trace=name, x=px, y=py, w=w, h=h):
+                        idx, dist = index.find_closest(px, py, w, h)
+                        idx_ref, dist_ref = brute_force(x, y, px, py, w, h)
+                        self.assertAlmostEqual(dist, dist_ref)
+                        self.assertEqual(idx, idx_ref)
+
+
+    def test_trace_index_invalidation(self):
+        figure = matplotlib.figure.Figure()
+        plot = self.make_plot(figure, {'a': 1})
+        item = plot.plot_items[0]
+        index = item.get_index()
+        self.assertIs(item.get_index(), index)
+        item.data.y.values = item.data.y.values + 1
+        self.assertIsNot(item.get_index(), index)
+        data, x, y, _ = plot.get_closest_plot_point(5e9, 2, width=1e10, height=1)
+        self.assertAlmostEqual(y, 2)
+
+
+    def test_trace_summaries(self):
+        rng = np.random.default_rng(0)
+        f = np.linspace(1e9, 10e9, 1001)
+        traces = [-20 + 3*rng.normal(size=len(f)), -60 + 40*np.cos(f/1e9)**20, np.full(len(f), -3.0)]
+        for x_start, x_end in [(-1e99, +1e99), (2e9, 5e9), (f[100], f[100])]:
+            mask = (f >= x_start) & (f <= x_end)
+            summaries = np.array([TraceSummaries(f, y).get(x_start, x_end) for y in traces])
+            with self.subTest(x_start=x_start, x_end=x_end):
+                self.assertEqual(choose_smart_db_scale_from_summaries(summaries), choose_smart_db_scale([y[mask] for y in traces]))
+        with self.subTest('unsorted X-values'):
+            order = rng.permutation(len(f))
+            self.assertArrayAlmostEqual(TraceSummaries(f[order], traces[1][order]).get(2e9, 5e9), TraceSummaries(f, traces[1]).get(2e9, 5e9))
+        with self.subTest('empty range'):
+            self.assertIsNone(TraceSummaries(f, traces[0]).get(20e9, 30e9))
+        with self.subTest('limited number of ranges'):
+            summaries = TraceSummaries(f, traces[0])
+            full_summary = summaries.get()
+            for i in range(100):
+                summaries.get(f[i], f[-1])
+                summaries.get()  # the most recently used range is kept
+            self.assertLessEqual(len(summaries._summaries), TraceSummaries.MAX_RANGES)
+            self.assertIs(summaries.get(), full_summary)
+
+
+    def test_trace_summaries_are_kept(self):
+        figure = matplotlib.figure.Figure()
+        plot1 = self.make_plot(figure, {'a': 1, 'b': 2})
+        summaries = [item.get_summaries() for item in plot1.plot_items]
+        for item in plot1.plot_items:
+            item.get_summaries().get()
+        plot2 = self.make_plot(figure, {'a': 1, 'b': 3}, previous=plot1)
+        with self.subTest('same data'):
+            self.assertIs(plot2.plot_items[0].get_summaries()._summaries, summaries[0]._summaries)
+        with self.subTest('changed data'):
+            self.assertIsNot(plot2.plot_items[1].get_summaries()._summaries, summaries[1]._summaries)
+            self.assertAlmostEqual(plot2.plot_items[1].get_summaries().get()[-1], 3)
+
+
+
+class TestFileWatcher(MyTestCase):
+
+
+    def setUp(self) -> None:
+        self.app = QCoreApplication.instance() or QCoreApplication([])
+        self.debounce_ms, self.poll_interval_ms = FileWatcher.DEBOUNCE_MS, FileWatcher.POLL_INTERVAL_MS
+        FileWatcher.DEBOUNCE_MS, FileWatcher.POLL_INTERVAL_MS = 50, 50
+        return super().setUp()
+
+
+    def tearDown(self) -> None:
+        FileWatcher.DEBOUNCE_MS, FileWatcher.POLL_INTERVAL_MS = self.debounce_ms, self.poll_interval_ms
+        return super().tearDown()
+
+
+    def wait_for_changes(self, watcher: FileWatcher, timeout_s: float = 5) -> set[str]:
+        changed_paths = set()
+        def on_paths_changed(paths: list[str]):
+            changed_paths.update(paths)
+        watcher.pathsChanged.connect(on_paths_changed)
+        t_start = time.monotonic()
+        while len(changed_paths) < 1 and time.monotonic()-t_start < timeout_s:
+            self.app.processEvents()
+            time.sleep(10e-3)
+        # events that belong to the same change may arrive shortly after each other
+        t_start = time.monotonic()
+        while time.monotonic()-t_start < 3*FileWatcher.DEBOUNCE_MS/1000:
+            self.app.processEvents()
+            time.sleep(10e-3)
+        watcher.pathsChanged.disconnect(on_paths_changed)
+        return changed_paths
+
+
+    def check_modify_add_delete(self, watcher: FileWatcher, wdir: str):
+        path_a, path_b = os.path.join(wdir, 'a.s1p'), os.path.join(wdir, 'b.s1p')
+        with open(path_a, 'w') as fp:
+            fp.write('# Hz S RI R 50\n')
+        watcher.set_paths([wdir, path_a])
+        
+        with self.subTest('modify'):
+            time.sleep(10e-3)  # so that the modification time is different, in case it is polled
+            with open(path_a, 'a') as fp:
+                fp.write('1 0 0\n')
+            self.assertIn(path_a, self.wait_for_changes(watcher))
+        
+        with self.subTest('add'):
+            with open(path_b, 'w') as fp:
+                fp.write('# Hz S RI R 50\n')
+            self.assertEqual(self.wait_for_changes(watcher), {wdir})
+        
+        with self.subTest('delete'):
+            os.remove(path_a)
+            self.assertIn(path_a, self.wait_for_changes(watcher))
+        
+        with self.subTest('unwatched'):
+            watcher.set_paths([])
+            os.remove(path_b)
+            self.assertEqual(self.wait_for_changes(watcher, timeout_s=0.5), set())
+
+
+    def test_watch(self):
+        with tempfile.TemporaryDirectory() as wdir:
+            watcher = FileWatcher()
+            self.check_modify_add_delete(watcher, wdir)
+            self.assertEqual(len(watcher._polled_paths), 0)
+            watcher.clear()
+
+
+    def test_polling_fallback(self):
+        with tempfile.TemporaryDirectory() as wdir:
+            watcher = FileWatcher()
+            watcher._watcher.addPaths = lambda paths: list(paths)  # as if the OS ran out of watches
+            self.check_modify_add_delete(watcher, wdir)
+            watcher.clear()
+            self.assertFalse(watcher._poll_timer.isActive())
@@ -1,5 +1,7 @@
 from testlib import MyTestCase
-from lib import NetworkExt, TDR
+from lib import NetworkExt, TDR, interpolate_polar, GridAlignment, BodeFano, BodeFanoIntegrator
+from lib.sparam_helpers import irndft
+import math
 import skrf
 import numpy as np
 
@@ -104,6 +106,67 @@ class TestTdr(MyTestCase):
         self.assertAlmostEqual(dut_length, tdr.shift_s + 3*LINE_LEN, delta=LINE_LEN/10)
 
 
+    def test_get_many(self):
+        nw = skrf.Network(self.sample_dir.joinpath('line-line-line.s2p'))
+        nw_cropped = nw.cropped(nw.f[3], nw.f[-1])
+        traces = [
+            (nw.f, nw.s[:,0,0], nw.z0[0,0]),
+            (nw_cropped.f, nw_cropped.s[:,1,0], nw_cropped.z0[0,1]),
+            (nw.f, nw.s[:,1,1], nw.z0[0,1]),
+            (nw.f, nw.s[:,1,0], nw.z0[0,0]),
+        ]
+        for dc_extrapolation in ['IEEE370', 'polar']:
+            for interpolation in [True, False]:
+                tdr = TDR()
+                tdr.dc_extrapolation = dc_extrapolation
+                tdr.interpolation = interpolation
+                tdr.shift_s = 100e-12
+                tdr.window = 'blackman'
+                tdr.step_response = True
+                tdr.convert_to_impedance = True
+                for (t_many, w_many), (f, s, z0) in zip(tdr.get_many(traces), traces):
+                    with self.subTest(dc_extrapolation=dc_extrapolation, interpolation=interpolation):
+                        t, w = tdr.get(f, s, z0)
+                        self.assertArrayAlmostEqual(t_many, t)
+                        self.assertArrayAlmostEqual(w_many, w)
+
+
+    def test_result_cache(self):
+        nw = skrf.Network(self.sample_dir.joinpath('line-line-line.s2p'))
+        TDR.clear_cache()
+        tdr = TDR()
+        t1, w1 = tdr.get(nw.f, nw.s[:,0,0], nw.z0[0,0])
+        t2, w2 = tdr.get(nw.f, nw.s[:,0,0].copy(), nw.z0[0,0])
+        with self.subTest('same data is cached'):
+            self.assertEqual((TDR.hits, TDR.misses), (1, 1))
+            self.assertIs(w1, w2)
+            self.assertFalse(w1.flags.writeable)
+        with self.subTest('different settings'):
+            tdr.step_response = True
+            tdr.get(nw.f, nw.s[:,0,0], nw.z0[0,0])
+            self.assertEqual((TDR.hits, TDR.misses), (1, 2))
+        with self.subTest('different data'):
+            tdr.get(nw.f, nw.s[:,1,1], nw.z0[0,0])
+            tdr.get(nw.f, nw.s[:,0,0], nw.z0[0,1])
+            self.assertEqual((TDR.hits, TDR.misses), (1, 4))
+
+
+
+    def test_causality(self):
+        nw = skrf.Network(self.sample_dir.joinpath('line-line-line.s2p'))
+        tdr = TDR()
+        tdr.window = 'hann'
+        with self.subTest('causal'):
+            f, error = tdr.get_causality(nw.f, nw.s)
+            self.assertEqual(len(f), len(error))
+            self.assertTrue(f[0] >= nw.f[0] and f[-1] <= nw.f[-1])
+            self.assertLess(np.max(error), 0.01)
+        with self.subTest('time-advanced'):
+            t_advance = 20 / nw.f[-1]  # well beyond the tolerance around t=0
+            _, error = tdr.get_causality(nw.f, nw.s * np.exp(2j*np.pi*nw.f*t_advance).reshape([-1,1,1]))
+            self.assertGreater(np.max(error), 0.1)
+
+
 
 class TestSeMixed(MyTestCase):
 
@@ -171,3 +234,114 @@ class TestSeMixed(MyTestCase):
         self.assertArrayAlmostEqual(nw.f, nw_roundtrip.f)
         self.assertArrayAlmostEqual(nw.s, nw_roundtrip.s)
         self.assertArrayAlmostEqual(nw.z0, nw_roundtrip.z0)
+
+
+
+
+class TestInterpolation(MyTestCase):
+
+
+    @staticmethod
+    def interpolate_per_param(f: np.ndarray, s: np.ndarray, f_new: np.ndarray) -> np.ndarray:
+        s_new = np.ndarray([len(f_new),*s.shape[1:]], dtype=complex)
+        for ep in range(s.shape[1]):
+            for ip in range(s.shape[2]):
+                mag, pha = np.abs(s[:,ep,ip]), np.unwrap(np.angle(s[:,ep,ip]))
+                s_new[:,ep,ip] = np.interp(f_new, f, mag) * np.exp(1j*np.interp(f_new, f, pha))
+        return s_new
+
+
+    def test_same_as_per_param(self):
+        rng = np.random.default_rng(0)
+        f = np.sort(rng.uniform(1e9, 10e9, 101))
+        s = rng.normal(size=(len(f),4,4)) + 1j*rng.normal(size=(len(f),4,4))
+        f_new = np.concatenate([[0.5e9], np.linspace(1e9, 10e9, 333), f[10:20], [11e9]])  # includes extrapolation and exact points
+        with self.subTest():
+            self.assertArrayAlmostEqual(interpolate_polar(f, s, f_new), TestInterpolation.interpolate_per_param(f, s, f_new))
+        with self.subTest():
+            self.assertArrayAlmostEqual(interpolate_polar(f, s[:,0,1], f_new), TestInterpolation.interpolate_per_param(f, s, f_new)[:,0,1])
+        with self.subTest():
+            self.assertArrayAlmostEqual(interpolate_polar(f[:1], s[:1], f_new), TestInterpolation.interpolate_per_param(f[:1], s[:1], f_new))
+
+
+    def test_grid_alignment(self):
+        f_a = np.linspace(1e9, 10e9, 10)
+        f_b = np.linspace(0.5e9, 8e9, 16)
+        f_union = np.array(sorted(list(set([*f_a, *f_b]))))
+        with self.subTest():
+            self.assertArrayAlmostEqual(GridAlignment.union(f_a, f_b), f_union)
+        with self.subTest():
+            self.assertArrayAlmostEqual(GridAlignment.overlap(f_a, f_b), np.array([f for f in f_union if 1e9<=f<=8e9]))
+        with self.subTest():
+            self.assertEqual(len(GridAlignment.overlap(f_a, f_b+20e9)), 0)
+        with self.subTest():
+            self.assertTrue(GridAlignment.get_plan(f_a, f_union) is GridAlignment.get_plan(f_a.copy(), f_union.copy()))
+        with self.subTest():
+            self.assertTrue(GridAlignment.get_plan(f_a, f_a.copy()).is_identity)
+
+
+
+class TestIrndft(MyTestCase):
+
+
+    @staticmethod
+    def irndft_full_matrix(f: np.ndarray, s: np.ndarray, n_samples: int, t_total: float) -> np.ndarray:
+        t = np.linspace(0, t_total*(n_samples-1)/n_samples, n_samples)
+        wave = np.sum(s * np.exp(np.tensordot(1j * math.tau * t, f, axes=0)), axis=1)
+        return np.real(wave).astype(float) / len(wave) * 2
+
+
+    def test_same_as_full_matrix(self):
+        rng = np.random.default_rng(0)
+        f = np.sort(rng.uniform(10e6, 20e9, 301))
+        s = np.exp(-3j*f/1e9) * (1 - f/40e9)
+        t, w = irndft(f, s)
+        w_expected = TestIrndft.irndft_full_matrix(f, s, len(t), t[1]*len(t))
+        for block_size in [None, 1, 7, len(t), 10*len(t)]:
+            with self.subTest(block_size=block_size):
+                self.assertArrayAlmostEqual(irndft(f, s, block_size=block_size)[1], w_expected)
+        with self.subTest('explicit length and duration'):
+            self.assertArrayAlmostEqual(irndft(f, s, n_samples=1000, t_total=50e-9)[1], TestIrndft.irndft_full_matrix(f, s, 1000, 50e-9))
+
+
+
+class TestBodeFano(MyTestCase):
+
+
+    @staticmethod
+    def integrate_cropped(f: np.ndarray, s: np.ndarray, f_min: float, f_max: float) -> float:
+        mask = (f >= f_min) & (f <= f_max)
+        return np.trapezoid(np.log(1/np.abs(s[mask])), f[mask]*math.tau)
+
+
+    def test_same_as_cropped(self):
+        rng = np.random.default_rng(0)
+        f = np.linspace(10e6, 20e9, 2001)
+        s = 0.1 + 0.8*rng.uniform(size=len(f)) * np.exp(1j*rng.uniform(0, math.tau, len(f)))
+        integrator = BodeFanoIntegrator(f, s)
+        for f_min, f_max in [(-1e99, +1e99), (1e9, 2e9), (f[10], f[20]), (f[10]+1, f[20]-1), (f[10], f[10]), (3e9, 2e9), (25e9, 30e9)]:
+            with self.subTest(f_min=f_min, f_max=f_max):
+                self.assertAlmostEqual(integrator.integrate(f_min, f_max), TestBodeFano.integrate_cropped(f, s, f_min, f_max), delta=1e-9*abs(integrator.cumulative_integral[-1]))
+        bodefano = BodeFano(f, s, 1e9, 5e9, 2e9, 3e9)
+        with self.subTest('actual range'):
+            self.assertArrayAlmostEqual(bodefano.nw_f_intrange, f[(f >= 1e9) & (f <= 5e9)])
+        with self.subTest('same with precomputed integral'):
+            self.assertAlmostEqual(BodeFano(None, None, 1e9, 5e9, 2e9, 3e9, integrator=integrator).db_achievable, bodefano.db_achievable)
+        with self.subTest('empty range'):
+            self.assertRaises(ValueError, lambda: BodeFano(f, s, 25e9, 30e9, 2e9, 3e9))
+
+
+    def test_perfect_match(self):
+        f = np.linspace(1e9, 10e9, 91)
+        s = np.full(len(f), 0.3+0j)
+        s[np.argmin(np.abs(f-2e9))] = 0  # outside of the integrated range, so it must not matter
+        integrator = BodeFanoIntegrator(f, s)
+        with self.subTest('range without the sample'):
+            expected = TestBodeFano.integrate_cropped(f, s, 3e9, 8e9)
+            self.assertAlmostEqual(integrator.integrate(3e9, 8e9), expected, delta=1e-9*expected)
+            bodefano = BodeFano(f, s, 3e9, 8e9, 4e9, 6e9)
+            self.assertTrue(math.isfinite(bodefano.db_available))
+            self.assertTrue(math.isfinite(bodefano.db_current))
+            self.assertAlmostEqual(bodefano.db_current, 20*math.log10(0.3))
+        with self.subTest('range with the sample'):
+            self.assertEqual(integrator.integrate(1e9, 8e9), math.inf)
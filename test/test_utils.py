@@ -1,14 +1,18 @@
 from testlib import MyTestCase
 from lib import get_unique_short_filename, shorten_path, is_ext_supported, is_ext_supported_file, is_ext_supported_archive
-from lib import group_delay, v2db, db2v, choose_smart_db_scale
+from lib import group_delay, v2db, db2v, choose_smart_db_scale, decimate_minmax
 from lib import get_unique_id, any_common_elements, window_has_argument, factorize_int
 from lib import natural_sort_key, format_minute_seconds, string_to_enum, enum_to_string, strip_common
 from lib import get_next_1_10_100, get_next_1_3_10, get_next_1_2_5_10
-from lib import find_files_in_archive, load_file_from_archive
+from lib import find_files_in_archive, load_file_from_archive, scan_directory
 from lib import make_filename_matcher
-from lib import PathExt
+from lib import RunningStats
+from lib import PathExt, AppSettings, AppPaths
 import os
 import math
+import json
+import tempfile
+import unittest.mock
 import numpy as np
 
 
@@ -42,6 +46,55 @@ class TestUtils(MyTestCase):
         self.assertListEqual(sorted_list, ['A', 'Hello', 'Number10', 'Number100'])
 
 
+    def test_decimate_minmax(self):
+        x = np.linspace(0, 1, 100_001)
+        y = np.sin(2*np.pi*50*x) + 1e-3*np.cos(2*np.pi*3e4*x)
+        y[12345] = 5  # a single spike must survive the decimation
+
+        with self.subTest('envelope is preserved'):
+            xd, yd = decimate_minmax(x, y, 100)
+            self.assertLessEqual(len(xd), 4*100)
+            self.assertEqual(xd[0], x[0])
+            self.assertEqual(xd[-1], x[-1])
+            self.assertAlmostEqual(np.max(yd), np.max(y))
+            self.assertAlmostEqual(np.min(yd), np.min(y))
+            self.assertIn(x[12345], xd)
+            self.assertTrue(np.all(np.diff(xd) > 0))
+
+        with self.subTest('visible range'):
+            xd, yd = decimate_minmax(x, y, 100, 0.25, 0.5)
+            self.assertLessEqual(len(xd), 4*100)
+            self.assertLess(xd[0], 0.25)
+            self.assertGreater(xd[1], 0.25)
+            self.assertGreater(xd[-1], 0.5)
+            self.assertLess(xd[-2], 0.5)
+
+        with self.subTest('short trace is not decimated'):
+            xd, yd = decimate_minmax(x[:300], y[:300], 100)
+            self.assertArrayEqual(xd, x[:300])
+            self.assertArrayEqual(yd, y[:300])
+
+        with self.subTest('NaN'):
+            y_nan = np.copy(y)
+            y_nan[:5000] = np.nan
+            xd, yd = decimate_minmax(x, y_nan, 100)
+            self.assertAlmostEqual(np.nanmax(yd), np.max(y))
+
+        with self.subTest('logarithmic'):
+            x_log = np.logspace(0, 6, 100_000)
+            xd, yd = decimate_minmax(x_log, np.log10(x_log), 100, log_x=True)
+            self.assertLessEqual(len(xd), 4*100)
+            self.assertGreater(np.sum(xd < 10), 20)  # buckets are equidistant on the logarithmic axis
+
+        with self.subTest('logarithmic with DC'):
+            x_dc = np.concatenate([[0], x_log])
+            xd, yd = decimate_minmax(x_dc, np.log10(x_dc+1), 100, log_x=True)
+            self.assertLessEqual(len(xd), 4*100+1)
+            self.assertEqual(xd[0], 0)
+            self.assertGreater(np.sum(xd < 10), 20)
+            self.assertEqual(xd[-1], x_dc[-1])
+
+
     def test_steps(self):
 
         with self.subTest():
@@ -90,6 +143,38 @@ class TestUtils(MyTestCase):
 
 
 
+    def test_scan_directory(self):
+        with tempfile.TemporaryDirectory() as wdir:
+            for name in ['b10.s2p', 'b2.s2p', 'a.s1p', 'notes.txt', 'data.zip']:
+                open(os.path.join(wdir, name), 'w').close()
+            for name in ['sub10', 'sub2']:
+                os.mkdir(os.path.join(wdir, name))
+            files, archives, dirs = scan_directory(wdir)
+            with self.subTest():
+                self.assertListEqual([p.final_name for p in files], ['a.s1p', 'b2.s2p', 'b10.s2p'])
+            with self.subTest():
+                self.assertListEqual([p.final_name for p in archives], ['data.zip'])
+            with self.subTest():
+                self.assertListEqual([p.final_name for p in dirs], ['sub2', 'sub10'])
+
+
+
+    def test_running_stats(self):
+        rng = np.random.default_rng(0)
+        x = rng.normal(size=(50,7)) + 1j*rng.normal(size=(50,7))
+        with self.subTest('complex'):
+            stats = RunningStats().add_all(x)
+            self.assertArrayAlmostEqual(stats.mean, np.mean(x, axis=0))
+            self.assertArrayAlmostEqual(stats.sdev(ddof=1), np.std(x, axis=0, ddof=1))
+            with self.assertRaises(ValueError):
+                stats.min
+        with self.subTest('real'):
+            stats = RunningStats().add_all(x.real)
+            self.assertArrayAlmostEqual(stats.variance(), np.var(x.real, axis=0))
+            self.assertArrayAlmostEqual(stats.min, np.min(x.real, axis=0))
+            self.assertArrayAlmostEqual(stats.pkpk, np.ptp(x.real, axis=0))
+
+
 class TestFilenameMatching(MyTestCase):
 
 
@@ -151,3 +236,63 @@ class TestFilenameMatching(MyTestCase):
 
     def test_specific_path(self):
         self.pattern_test('*/tmp/samples/*', ['/tmp/samples/amp.s2p', '/tmp/samples/diff_amp.s4p', '/tmp/samples/att_10db.s2p'])
+
+
+
+
+class TestAppSettings(MyTestCase):
+
+
+    class DummySettings(AppSettings):
+        value: int = 0
+        paths: list = []
+
+
+    def make_settings(self, wdir: str) -> AppSettings:
+        settings_path = os.path.join(wdir, 'settings.json')
+        with unittest.mock.patch.object(AppPaths, 'get_settings_path', return_value=settings_path):
+            return TestAppSettings.DummySettings(format_version_str='test')
+
+
+    def read_file(self, settings: AppSettings) -> dict:
+        with open(settings.settings_file_path, 'r') as fp:
+            return json.load(fp)
+
+
+    def test_write_behind(self):
+        with tempfile.TemporaryDirectory() as wdir:
+            settings = self.make_settings(wdir)
+            scheduled = []
+            settings.save_scheduler = lambda delay_s, callback: scheduled.append(callback)
+            settings.value = 1
+            settings.value = 2
+            with self.subTest():
+                self.assertEqual(len(scheduled), 1)
+            with self.subTest():
+                self.assertEqual(self.read_file(settings)['value'], 0)
+            scheduled[0]()
+            with self.subTest():
+                self.assertEqual(self.read_file(settings)['value'], 2)
+            settings.value = 3
+            settings.flush()
+            with self.subTest():
+                self.assertEqual(self.read_file(settings)['value'], 3)
+            with self.subTest():
+                self.assertListEqual(os.listdir(wdir), ['settings.json'])
+
+
+    def test_batch(self):
+        with tempfile.TemporaryDirectory() as wdir:
+            settings = self.make_settings(wdir)
+            notifications = []
+            settings.attach(lambda attributes: notifications.append(attributes))
+            with settings.batch():
+                settings.value = 1
+                settings.paths = ['a']
+                settings.value = 2
+                with self.subTest():
+                    self.assertEqual(self.read_file(settings)['value'], 0)
+            with self.subTest():
+                self.assertListEqual(notifications, [['value', 'paths']])
+            with self.subTest():
+                self.assertEqual(self.read_file(settings)['value'], 2)
@@ -1,5 +1,8 @@
+from lib import NetworkCache
+
 import unittest
 import pathlib
+import tempfile
 import numpy as np
 import numbers
 
@@ -13,6 +16,20 @@ class MyTestCase(unittest.TestCase):
         super().__init__(methodName)
 
 
+    def setUp(self) -> None:
+        # never use the cache of the user, so that the tests exercise the parsers, and leave no files behind
+        self._cache_dir = tempfile.TemporaryDirectory()
+        self._orig_cache_dir = NetworkCache.directory
+        NetworkCache.directory = self._cache_dir.name
+        return super().setUp()
+
+
+    def tearDown(self) -> None:
+        NetworkCache.directory = self._orig_cache_dir
+        self._cache_dir.cleanup()
+        return super().tearDown()
+
+
     @property
     def root_dir(self) -> pathlib.Path:
         path = pathlib.Path('.').absolute()